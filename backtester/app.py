@@ -5,30 +5,30 @@ AlgoTest-equivalent backtesting engine
 
 import streamlit as st
 import pandas as pd
+from dataclasses import fields
 from pathlib import Path
 import sys
+import hashlib
+import importlib
+import json
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 
 # Add backtester to path
 sys.path.insert(0, str(Path(__file__).parent))
 
 from data.loader import DataLoader
-from data.resolver import InstrumentResolver
-from engine.leg import Leg, LegConfig, LegAction
-from engine.strategy import Strategy, StrategyConfig, StrategyMode
-from engine.backtest import BacktestEngine
-from engine.backtest_optimized import OptimizedBacktestEngine
+from engine.leg import LegConfig, LegAction
+from engine.backtest import ENGINE_VERSION
 from metrics.calculator import MetricsCalculator
-from metrics.monte_carlo import MonteCarloSimulator
+from ui.styles import APP_CSS
 from ui.components import (
     render_metrics_dashboard, render_leg_builder,
     render_strategy_settings, render_date_range_selector,
     render_cost_settings
 )
-from ui.charts import (
-    create_equity_chart, create_drawdown_chart,
-    create_monthly_heatmap, create_trade_distribution
-)
-from config import DATA_DIR
 
 # Page config
 st.set_page_config(
@@ -37,239 +37,440 @@ st.set_page_config(
     layout="wide"
 )
 
-# Custom CSS for modern, high-contrast styling
-st.markdown("""
-<style>
-    /* Keep sidebar always expanded */
-    [data-testid="stSidebar"][aria-expanded="false"] {
-        display: block !important;
-        min-width: 300px !important;
-    }
-    
-    /* Reduce overall padding and spacing */
-    .block-container {
-        padding-top: 1rem !important;
-        padding-bottom: 0.5rem !important;
-    }
-    
-    /* Compact header */
-    h1 {
-        font-size: 1.8rem !important;
-        margin-bottom: 0.2rem !important;
-        color: #ffffff !important;
-    }
-    
-    h2, h3 {
-        font-size: 1.1rem !important;
-        margin-top: 0.5rem !important;
-        margin-bottom: 0.3rem !important;
-        color: #e0e0e0 !important;
-    }
-    
-    /* HIGH CONTRAST Labels - Bright white */
-    .stSelectbox label, .stNumberInput label, .stDateInput label, 
-    .stTimeInput label, .stCheckbox label, .stRadio label {
-        font-size: 0.9rem !important;
-        margin-bottom: 0.2rem !important;
-        font-weight: 600 !important;
-        color: #ffffff !important;
-    }
-    
-    /* Reduce widget spacing */
-    .stSelectbox, .stNumberInput, .stTextInput, 
-    .stDateInput, .stTimeInput {
-        margin-bottom: 0.5rem !important;
-    }
-    
-    /* HIGH CONTRAST Input fields - Light background with dark text */
-    .stSelectbox > div > div,
-    .stNumberInput > div > div > input,
-    .stTextInput > div > div > input {
-        background-color: #2d2d3d !important;
-        color: #ffffff !important;
-        border: 1px solid #4a4a6a !important;
-        border-radius: 6px !important;
-    }
-    
-    /* Dropdown options - Dark with white text */
-    [data-baseweb="select"] {
-        background-color: #2d2d3d !important;
-    }
-    
-    [data-baseweb="menu"] {
-        background-color: #2d2d3d !important;
-        border: 1px solid #4a4a6a !important;
-    }
-    
-    [data-baseweb="menu"] li {
-        color: #ffffff !important;
-    }
-    
-    [data-baseweb="menu"] li:hover {
-        background-color: #4a4a6a !important;
-    }
-    
-    /* HIGH CONTRAST Metrics styling */
-    .stMetric {
-        background-color: #1e1e2e !important;
-        padding: 1rem !important;
-        border-radius: 8px;
-        border-left: 4px solid #4CAF50 !important;
-    }
-    
-    .stMetric label {
-        font-size: 0.85rem !important;
-        color: #b0b0b0 !important;
-    }
-    
-    .stMetric [data-testid="stMetricValue"] {
-        font-size: 1.4rem !important;
-        font-weight: 700 !important;
-        color: #ffffff !important;
-    }
-    
-    /* Compact dividers */
-    hr {
-        margin: 0.8rem 0 !important;
-        border-color: #4a4a6a !important;
-        opacity: 0.5;
-    }
-    
-    /* HIGH CONTRAST Button styling */
-    .stButton > button {
-        border-radius: 8px !important;
-        font-weight: 600 !important;
-        padding: 0.6rem 1.2rem !important;
-        transition: all 0.2s ease;
-        border: 1px solid #4a4a6a !important;
-        background-color: #2d2d3d !important;
-        color: #ffffff !important;
-    }
-    
-    .stButton > button:hover {
-        background-color: #3d3d5d !important;
-        border-color: #6a6a8a !important;
-    }
-    
-    /* Primary button - Bright green */
-    .stButton > button[kind="primary"] {
-        background-color: #4CAF50 !important;
-        border-color: #4CAF50 !important;
-        color: #ffffff !important;
-    }
-    
-    .stButton > button[kind="primary"]:hover {
-        background-color: #66BB6A !important;
-        border-color: #66BB6A !important;
-    }
-    
-    /* HIGH CONTRAST Expander styling */
-    .streamlit-expanderHeader {
-        font-size: 0.95rem !important;
-        font-weight: 600 !important;
-        background-color: #252538 !important;
-        border: 1px solid #3a3a5a !important;
-        border-radius: 6px !important;
-        padding: 0.6rem 1rem !important;
-        color: #ffffff !important;
-    }
-    
-    .streamlit-expanderContent {
-        background-color: #1e1e2e !important;
-        border: 1px solid #3a3a5a !important;
-        border-top: none !important;
-        border-radius: 0 0 6px 6px !important;
-        padding: 1rem !important;
-    }
-    
-    /* HIGH CONTRAST Sidebar styling */
-    [data-testid="stSidebar"] {
-        background-color: #161625 !important;
-        min-width: 280px !important;
-    }
-    
-    [data-testid="stSidebar"] h2, [data-testid="stSidebar"] h3 {
-        font-size: 1.1rem !important;
-        color: #4CAF50 !important;
-        font-weight: 700 !important;
-    }
-    
-    [data-testid="stSidebar"] label {
-        color: #e0e0e0 !important;
-        font-weight: 500 !important;
-    }
-    
-    /* Tab styling - HIGH CONTRAST */
-    .stTabs [data-baseweb="tab-list"] {
-        gap: 0.5rem;
-        background-color: #1e1e2e !important;
-        border-radius: 8px;
-        padding: 0.3rem;
-    }
-    
-    .stTabs [data-baseweb="tab"] {
-        padding: 0.6rem 1.2rem !important;
-        font-size: 0.95rem !important;
-        font-weight: 500 !important;
-        color: #b0b0b0 !important;
-        background-color: transparent !important;
-        border-radius: 6px !important;
-    }
-    
-    .stTabs [data-baseweb="tab"][aria-selected="true"] {
-        color: #ffffff !important;
-        background-color: #4CAF50 !important;
-    }
-    
-    /* Remove extra margins from columns */
-    [data-testid="column"] {
-        padding: 0 0.4rem !important;
-    }
-    
-    /* Checkbox styling */
-    .stCheckbox label span {
-        color: #ffffff !important;
-    }
-    
-    /* Success/Error messages */
-    .stSuccess {
-        background-color: #1b4332 !important;
-        color: #a7f3d0 !important;
-        padding: 0.8rem 1rem !important;
-        border-radius: 8px !important;
-        border-left: 4px solid #4CAF50 !important;
-    }
-    
-    .stError {
-        background-color: #4a1515 !important;
-        color: #fca5a5 !important;
-        padding: 0.8rem 1rem !important;
-        border-radius: 8px !important;
-        border-left: 4px solid #ef4444 !important;
-    }
-    
-    /* Download button */
-    .stDownloadButton button {
-        width: 100% !important;
-        background-color: #2d2d3d !important;
-        color: #ffffff !important;
-    }
-    
-    /* Date input - HIGH CONTRAST */
-    .stDateInput input {
-        background-color: #2d2d3d !important;
-        color: #ffffff !important;
-        border: 1px solid #4a4a6a !important;
-    }
-    
-    /* Time input - HIGH CONTRAST */
-    .stTimeInput input {
-        background-color: #2d2d3d !important;
-        color: #ffffff !important;
-        border: 1px solid #4a4a6a !important;
-    }
-</style>
-""", unsafe_allow_html=True)
+# Custom CSS - emitted on every run, since Streamlit removes elements
+# a rerun does not repeat
+st.markdown(APP_CSS, unsafe_allow_html=True)
+
+
+@st.cache_resource
+def _get_loader() -> DataLoader:
+    """Shared DataLoader - built once per process, not on every rerun"""
+    return DataLoader()
+
+
+@st.cache_data(ttl=3600)
+def _get_date_range(expiry_type: str) -> tuple:
+    """Available (min, max) dates for an expiry type"""
+    return _get_loader().get_date_range(expiry_type)
+
+
+def _leg_config_to_dict(config: LegConfig) -> dict:
+    """Plain, hashable form of a LegConfig (init fields only, action stored by name)"""
+    return {**{f.name: getattr(config, f.name) for f in fields(config) if f.init},
+            "action": config.action.name}
+
+
+def _warm_engine(loader: DataLoader, first_day: str) -> None:
+    """
+    One-day throwaway backtest so the first real run starts warm.
+    
+    Pulls in the engine code paths and the numba kernels. The engine
+    instance is not kept: a run holds per-run state, so every backtest
+    builds its own.
+    """
+    from engine.backtest_optimized import OptimizedBacktestEngine
+    from engine.batch import build_strategy
+    strategy = build_strategy(
+        {
+            "mode": "INTRADAY",
+            "entry_time": "09:20",
+            "exit_time": "15:15",
+            "no_entry_after": "14:30",
+            "max_loss": None,
+            "max_profit": None
+        },
+        [_leg_config_to_dict(LegConfig(
+            leg_id=1, strike="ATM", option_type=option_type,
+            expiry_type="WEEK", action=LegAction.SELL
+        )) for option_type in ("CE", "PE")]
+    )
+    OptimizedBacktestEngine(loader).run(
+        strategy, first_day, first_day,
+        slippage_pct=0, brokerage_per_lot=0
+    )
+
+
+@st.cache_resource(show_spinner=False)
+def _start_engine_warm_up(first_day: str) -> threading.Thread:
+    """
+    Run _warm_engine on a daemon thread, once per process, so the engine
+    and kernel imports happen after first paint rather than before it
+    """
+    thread = threading.Thread(
+        target=_warm_engine, args=(_get_loader(), first_day),
+        name="engine-warm-up", daemon=True
+    )
+    thread.start()
+    return thread
+
+
+# Most backtest results kept on disk; max_entries only bounds the
+# in-memory layer, Streamlit never deletes persisted entries itself
+MAX_PERSISTED_RESULTS = 32
+# Cache version and argument lists of the persisted results, oldest first
+PERSISTED_RESULTS_INDEX = Path.home() / ".streamlit" / "cache" / "backtest_results.json"
+
+
+@st.cache_data(show_spinner="Running backtest...", max_entries=MAX_PERSISTED_RESULTS,
+               persist="disk")
+def _run_backtest_cached(cache_version: str, strategy_settings: dict, leg_dicts: list,
+                         start_date: str, end_date: str,
+                         slippage_pct: float, brokerage_per_lot: float):
+    """
+    Run a backtest, memoized on the strategy/cost inputs.
+    
+    Emits no elements: Streamlit records any element call made while a
+    cached function runs (even on blocks created outside it) and replays
+    it on cache hits. Progress is the decorator's spinner, shown on
+    misses only.
+    
+    Results persist to disk across restarts. cache_version is only part of
+    the key (see _backtest_cache_version); call through _run_backtest.
+    """
+    from engine.backtest_optimized import OptimizedBacktestEngine
+    from engine.batch import build_strategy
+    
+    strategy = build_strategy(strategy_settings, leg_dicts)
+    engine = OptimizedBacktestEngine(_get_loader())
+    return engine.run(
+        strategy,
+        start_date,
+        end_date,
+        slippage_pct=slippage_pct,
+        brokerage_per_lot=brokerage_per_lot,
+        max_workers=None
+    )
+
+
+def _backtest_cache_version() -> str:
+    """
+    Engine version plus the data files' modification times, hashed.
+    
+    An engine fix or a data refresh changes it, so persisted results from
+    before are not served.
+    """
+    data_dir = _get_loader().data_dir
+    stamps = sorted((str(path.relative_to(data_dir)), path.stat().st_mtime_ns)
+                    for path in data_dir.rglob("*.parquet"))
+    return hashlib.sha1(repr((ENGINE_VERSION, stamps)).encode()).hexdigest()
+
+
+def _run_backtest(strategy_settings: dict, leg_dicts: list,
+                  start_date: str, end_date: str,
+                  slippage_pct: float, brokerage_per_lot: float):
+    """
+    _run_backtest_cached for the current cache version, keeping at most
+    MAX_PERSISTED_RESULTS results on disk.
+    
+    A version change clears every persisted result; otherwise the least
+    recently used ones beyond the limit are cleared.
+    """
+    version = _backtest_cache_version()
+    # Arguments as they read back from the index, so keys match later clears
+    key = json.loads(json.dumps([strategy_settings, leg_dicts, start_date, end_date,
+                                 slippage_pct, brokerage_per_lot]))
+    try:
+        index = json.loads(PERSISTED_RESULTS_INDEX.read_text())
+    except (OSError, ValueError):
+        index = {}
+    
+    if index.get("version") != version:
+        _run_backtest_cached.clear()
+        entries = []
+    else:
+        entries = [entry for entry in index["entries"] if entry != key]
+    entries.append(key)
+    while len(entries) > MAX_PERSISTED_RESULTS:
+        _run_backtest_cached.clear(version, *entries.pop(0))
+    
+    PERSISTED_RESULTS_INDEX.parent.mkdir(parents=True, exist_ok=True)
+    PERSISTED_RESULTS_INDEX.write_text(json.dumps({"version": version, "entries": entries}))
+    return _run_backtest_cached(version, *key)
+
+
+@st.cache_resource
+def _calculator() -> MetricsCalculator:
+    """Shared MetricsCalculator (stateless, so safe across sessions)"""
+    return MetricsCalculator()
+
+
+@st.cache_data(show_spinner=False, max_entries=32)
+def _daily_df(result_key: str, _result) -> pd.DataFrame:
+    """Daily results DataFrame, cached per result"""
+    return _result.to_daily_df()
+
+
+@st.cache_data(show_spinner=False, max_entries=32)
+def _trades_df(result_key: str, _result) -> pd.DataFrame:
+    """Trade log DataFrame, cached per result"""
+    return _result.to_trades_df()
+
+
+@st.cache_data(show_spinner=False, max_entries=32)
+def _trades_csv(result_key: str, _result) -> bytes:
+    """Trade log as CSV bytes for download, cached per result"""
+    return _trades_df(result_key, _result).to_csv(index=False).encode()
+
+
+@st.cache_data(show_spinner=False, max_entries=32)
+def _trades_arrow(result_key: str, _result):
+    """
+    Trade log as an Arrow table for display, cached per result.
+    
+    Float columns stay float64: they are all prices or rupee amounts, and
+    float32 misprints them (paise digits go wrong from about 1e5 up).
+    """
+    import pyarrow as pa
+    return pa.Table.from_pandas(_trades_df(result_key, _result), preserve_index=False)
+
+
+@st.cache_data(show_spinner=False, max_entries=32)
+def _metrics(result_key: str, _result) -> dict:
+    """Performance metrics, cached per result"""
+    return _calculator().calculate(_result)
+
+
+@st.cache_data(show_spinner=False, max_entries=32)
+def _period_pnl(result_key: str, _result) -> tuple:
+    """(yearly, monthly) P&L breakdowns, cached per result"""
+    return _calculator().get_period_pnl(_result)
+
+
+@st.cache_data(show_spinner=False, max_entries=32)
+def _equity_fig(result_key: str, _result):
+    """Equity curve figure, cached per result"""
+    from ui.charts import create_equity_chart
+    return create_equity_chart(_result.equity_curve, _daily_df(result_key, _result))
+
+
+@st.cache_data(show_spinner=False, max_entries=32)
+def _drawdown_fig(result_key: str, _result):
+    """Drawdown figure, cached per result"""
+    from ui.charts import create_drawdown_chart
+    return create_drawdown_chart(_result.equity_curve, _daily_df(result_key, _result))
+
+
+@st.cache_data(show_spinner=False, max_entries=32)
+def _monthly_heatmap_fig(result_key: str, _result):
+    """Monthly P&L heatmap, cached per result"""
+    from ui.charts import create_monthly_heatmap
+    return create_monthly_heatmap(_daily_df(result_key, _result))
+
+
+@st.cache_data(show_spinner=False, max_entries=32)
+def _trade_distribution_fig(result_key: str, _result):
+    """Trade P&L distribution, cached per result"""
+    from ui.charts import create_trade_distribution
+    return create_trade_distribution(_trades_df(result_key, _result))
+
+
+@st.cache_resource
+def _mc_pool() -> ProcessPoolExecutor:
+    """
+    Worker processes for Monte Carlo runs, shared across sessions.
+    
+    Workers are spawned rather than forked since the Streamlit server
+    process is multi-threaded. Each worker imports the Monte Carlo module
+    on startup, which loads the compiled kernel before any job arrives.
+    """
+    return ProcessPoolExecutor(
+        max_workers=2,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=importlib.import_module,
+        initargs=("metrics.monte_carlo",)
+    )
+
+
+@st.cache_resource(max_entries=32)
+def _mc_future(result_key: str, _result, num_simulations: int):
+    """Monte Carlo job for a result, submitted once per simulation count"""
+    from metrics.monte_carlo import run_monte_carlo
+    return _mc_pool().submit(
+        run_monte_carlo, _result.trade_pnl_np(), _result.num_days, num_simulations
+    )
+
+
+def _reset_monte_carlo(broken_pool: bool) -> None:
+    """
+    Drop cached Monte Carlo jobs (cache_resource keeps failed futures too),
+    and the worker pool as well once a worker has died
+    """
+    _mc_future.clear()
+    if broken_pool:
+        _mc_pool.clear()
+
+
+def _start_monte_carlo(result, num_simulations: int):
+    """Monte Carlo job for a result, on a fresh pool if the cached one is broken"""
+    try:
+        return _mc_future(result.result_id, result, num_simulations)
+    except BrokenProcessPool:
+        _reset_monte_carlo(broken_pool=True)
+        return _mc_future(result.result_id, result, num_simulations)
+
+
+@st.fragment
+def _leg_builder_fragment():
+    """
+    Leg builder UI, rerun on its own when legs are edited.
+    
+    The current leg configs are kept in st.session_state.leg_configs.
+    """
+    # Compact header with inline buttons
+    col1, col2, col3 = st.columns([4, 1, 1])
+    with col1:
+        st.markdown("### Build Your Strategy")
+    with col2:
+        if st.button("➕ Add", key="add_leg"):
+            if 'num_legs' not in st.session_state:
+                st.session_state.num_legs = 2
+            st.session_state.num_legs += 1
+    with col3:
+        if st.button("➖ Remove", key="remove_leg"):
+            if 'num_legs' not in st.session_state:
+                st.session_state.num_legs = 2
+            if st.session_state.num_legs > 1:
+                st.session_state.num_legs -= 1
+    
+    # Number of legs
+    if 'num_legs' not in st.session_state:
+        st.session_state.num_legs = 2
+    
+    # Render leg builders in compact cards
+    leg_configs = []
+    for i in range(st.session_state.num_legs):
+        config = render_leg_builder(i + 1)
+        leg_configs.append(config)
+    
+    # Read by the Run button, which lives outside the fragment
+    st.session_state.leg_configs = leg_configs
+
+
+@st.fragment
+def _results_tab():
+    """Results tab - reruns on its own when its widgets change"""
+    if 'result' not in st.session_state:
+        st.info("Run a backtest to see results")
+    else:
+        result = st.session_state.result
+        metrics = _metrics(result.result_id, result)
+        
+        # Metrics dashboard
+        render_metrics_dashboard(metrics)
+        
+        st.divider()
+        
+        # Charts
+        col1, col2 = st.columns(2)
+        
+        with col1:
+            st.plotly_chart(
+                _equity_fig(result.result_id, result),
+                use_container_width=True,
+                key="equity_chart"
+            )
+        
+        with col2:
+            st.plotly_chart(
+                _drawdown_fig(result.result_id, result),
+                use_container_width=True,
+                key="drawdown_chart"
+            )
+        
+        # Monthly heatmap and distribution
+        col1, col2 = st.columns(2)
+        
+        with col1:
+            st.plotly_chart(
+                _monthly_heatmap_fig(result.result_id, result),
+                use_container_width=True,
+                key="monthly_heatmap"
+            )
+        
+        with col2:
+            st.plotly_chart(
+                _trade_distribution_fig(result.result_id, result),
+                use_container_width=True,
+                key="trade_distribution"
+            )
+        
+        # Monte Carlo results
+        mc = None
+        if 'mc_future' in st.session_state:
+            future = st.session_state.mc_future
+            try:
+                if future.done():
+                    mc = future.result()
+                else:
+                    with st.spinner("Running Monte Carlo simulations..."):
+                        mc = future.result()
+            except Exception as e:
+                # Not retried on reruns; the next backtest run resubmits
+                _reset_monte_carlo(broken_pool=isinstance(e, BrokenProcessPool))
+                st.session_state.pop('mc_future', None)
+                st.error(f"Monte Carlo failed: {e}")
+        
+        if mc:
+            st.divider()
+            st.markdown("### 🎲 Monte Carlo Analysis")
+            
+            col1, col2, col3, col4 = st.columns(4)
+            
+            with col1:
+                st.metric("Max DD (95%)", f"₹{mc.max_drawdown_95:,.0f}")
+            with col2:
+                st.metric("Worst Streak (95%)", mc.worst_losing_streak_95)
+            with col3:
+                st.metric("CAGR (Median)", f"{mc.cagr_median:.1f}%")
+            with col4:
+                st.metric("Prob. of Ruin", f"{mc.probability_of_ruin:.1f}%")
+            
+            with st.expander("Full Monte Carlo Stats"):
+                for key, value in mc.to_dict().items():
+                    st.write(f"**{key}**: {value}")
+        
+        # Yearly/Monthly P&L tables
+        st.divider()
+        col1, col2 = st.columns(2)
+        
+        with col1:
+            st.markdown("### Yearly P&L")
+            yearly, monthly = _period_pnl(result.result_id, result)
+            if not yearly.empty:
+                st.dataframe(yearly, use_container_width=True)
+        
+        with col2:
+            st.markdown("### Monthly P&L")
+            if not monthly.empty:
+                st.dataframe(monthly.tail(12), use_container_width=True)
+
+
+@st.fragment
+def _trades_tab():
+    """Trade Log tab - reruns on its own when its widgets change"""
+    if 'result' not in st.session_state:
+        st.info("Run a backtest to see trades")
+    else:
+        result = st.session_state.result
+        trades_df = _trades_df(result.result_id, result)
+        
+        st.markdown(f"### Trade Log ({len(trades_df)} trades)")
+        
+        # Download button
+        st.download_button(
+            "📥 Download CSV",
+            _trades_csv(result.result_id, result),
+            "trades.csv",
+            "text/csv",
+            use_container_width=True
+        )
+        
+        # Display trades
+        st.dataframe(
+            _trades_arrow(result.result_id, result),
+            use_container_width=True,
+            height=500
+        )
 
 
 def main():
@@ -278,8 +479,9 @@ def main():
     
     # Initialize data loader
     try:
-        loader = DataLoader()
-        min_date, max_date = loader.get_date_range("WEEK")
+        _get_loader()
+        min_date, max_date = _get_date_range("WEEK")
+        _start_engine_warm_up(str(min_date))
     except Exception as e:
         st.error(f"Error loading data: {e}")
         st.info("Make sure historical data is in the correct location")
@@ -322,112 +524,34 @@ def main():
     tab1, tab2, tab3 = st.tabs(["🦵 Leg Builder", "📈 Results", "📋 Trade Log"])
     
     with tab1:
-        # Compact header with inline buttons
-        col1, col2, col3 = st.columns([4, 1, 1])
-        with col1:
-            st.markdown("### Build Your Strategy")
-        with col2:
-            if st.button("➕ Add", key="add_leg"):
-                if 'num_legs' not in st.session_state:
-                    st.session_state.num_legs = 2
-                st.session_state.num_legs += 1
-        with col3:
-            if st.button("➖ Remove", key="remove_leg"):
-                if 'num_legs' not in st.session_state:
-                    st.session_state.num_legs = 2
-                if st.session_state.num_legs > 1:
-                    st.session_state.num_legs -= 1
-        
-        # Number of legs
-        if 'num_legs' not in st.session_state:
-            st.session_state.num_legs = 2
-        
-        # Render leg builders in compact cards
-        leg_configs = []
-        for i in range(st.session_state.num_legs):
-            config = render_leg_builder(i + 1)
-            leg_configs.append(config)
+        _leg_builder_fragment()
+        leg_configs = st.session_state.leg_configs
         
         # Run backtest button
         st.markdown("")  # Small spacer
         if st.button("🚀 Run Backtest", type="primary", use_container_width=True):
+            result = None
             try:
-                # Create strategy
-                strategy_config = StrategyConfig(
-                    name="Custom Strategy",
-                    mode=StrategyMode[strategy_settings["mode"]],
-                    entry_time=strategy_settings["entry_time"],
-                    exit_time=strategy_settings["exit_time"],
-                    no_entry_after=strategy_settings["no_entry_after"],
-                    max_loss=strategy_settings["max_loss"],
-                    max_profit=strategy_settings["max_profit"]
-                )
-                
-                strategy = Strategy(config=strategy_config)
-                
-                # Add legs
-                for config in leg_configs:
-                    strategy.add_leg(config)
-                
-                # Run backtest with optimized engine
-                engine = OptimizedBacktestEngine(loader)
-                
-                # Progress tracking
                 import time as time_module
-                progress_bar = st.progress(0)
-                status_text = st.empty()
                 start_time = time_module.time()
                 
-                def update_progress(day_idx, total_days, date):
-                    progress = (day_idx + 1) / total_days
-                    progress_bar.progress(progress)
-                    
-                    elapsed = time_module.time() - start_time
-                    if day_idx > 0:
-                        avg_time_per_day = elapsed / (day_idx + 1)
-                        remaining_days = total_days - day_idx - 1
-                        remaining_time = avg_time_per_day * remaining_days
-                        
-                        elapsed_str = f"{int(elapsed//60)}m {int(elapsed%60)}s"
-                        remaining_str = f"{int(remaining_time//60)}m {int(remaining_time%60)}s"
-                        
-                        status_text.markdown(
-                            f"**Processing:** {date} ({day_idx + 1}/{total_days}) | "
-                            f"**Elapsed:** {elapsed_str} | **Remaining:** {remaining_str}"
-                        )
-                    else:
-                        status_text.markdown(f"**Processing:** {date} ({day_idx + 1}/{total_days})")
-                
-                result = engine.run(
-                    strategy,
+                result = _run_backtest(
+                    strategy_settings,
+                    [_leg_config_to_dict(config) for config in leg_configs],
                     start_date,
                     end_date,
-                    slippage_pct=cost_settings["slippage_pct"],
-                    brokerage_per_lot=cost_settings["brokerage_per_lot"],
-                    progress_callback=update_progress
+                    cost_settings["slippage_pct"],
+                    cost_settings["brokerage_per_lot"]
                 )
                 
-                # Clear progress indicators
-                progress_bar.empty()
-                status_text.empty()
-                
-                # Calculate metrics
-                calculator = MetricsCalculator()
-                metrics = calculator.calculate(result)
+                # Calculate metrics and derived frames once per result
+                _metrics(result.result_id, result)
+                _daily_df(result.result_id, result)
+                _trades_df(result.result_id, result)
                 
                 # Store in session state
                 st.session_state.result = result
-                st.session_state.metrics = metrics
-                st.session_state.daily_df = result.to_daily_df()
-                st.session_state.trades_df = result.to_trades_df()
-                
-                # Run Monte Carlo if enabled
-                if run_monte_carlo:
-                    mc_status = st.empty()
-                    mc_status.markdown("**Running Monte Carlo simulations...**")
-                    mc_sim = MonteCarloSimulator(num_simulations=mc_simulations)
-                    st.session_state.mc_result = mc_sim.simulate(result)
-                    mc_status.empty()
+                st.session_state.pop('mc_future', None)
                 
                 total_time = time_module.time() - start_time
                 st.success(f"✅ Backtest complete! {result.num_trades} trades over {result.num_days} days in {total_time:.1f}s")
@@ -436,116 +560,60 @@ def main():
                 st.error(f"Backtest failed: {e}")
                 import traceback
                 st.code(traceback.format_exc())
-    
-    with tab2:
-        if 'result' not in st.session_state:
-            st.info("Run a backtest to see results")
-        else:
-            result = st.session_state.result
-            metrics = st.session_state.metrics
-            daily_df = st.session_state.daily_df
-            
-            # Metrics dashboard
-            render_metrics_dashboard(metrics)
-            
-            st.divider()
-            
-            # Charts
-            col1, col2 = st.columns(2)
-            
-            with col1:
-                st.plotly_chart(
-                    create_equity_chart(result.equity_curve, daily_df),
-                    use_container_width=True,
-                    key="equity_chart"
-                )
-            
-            with col2:
-                st.plotly_chart(
-                    create_drawdown_chart(result.equity_curve, daily_df),
-                    use_container_width=True,
-                    key="drawdown_chart"
-                )
             
-            # Monthly heatmap and distribution
-            col1, col2 = st.columns(2)
-            
-            with col1:
-                st.plotly_chart(
-                    create_monthly_heatmap(daily_df),
-                    use_container_width=True,
-                    key="monthly_heatmap"
-                )
-            
-            with col2:
-                st.plotly_chart(
-                    create_trade_distribution(st.session_state.trades_df),
-                    use_container_width=True,
-                    key="trade_distribution"
-                )
+            # Start Monte Carlo in the background; Results tab collects it.
+            # Kept apart so a pool failure is not reported as a failed backtest
+            if run_monte_carlo and result is not None:
+                try:
+                    st.session_state.mc_future = _start_monte_carlo(result, mc_simulations)
+                except Exception as e:
+                    _reset_monte_carlo(broken_pool=isinstance(e, BrokenProcessPool))
+                    st.warning(f"Monte Carlo could not start: {e}")
+        
+        # Batch run - same legs and costs, one backtest per entry time
+        with st.expander("📦 Batch Run"):
+            entry_times = st.multiselect(
+                "Entry Times",
+                [f"{h:02d}:{m:02d}" for h in range(9, 15) for m in range(0, 60, 15)
+                 if "09:15" < f"{h:02d}:{m:02d}" <= "14:30"],
+                help="Runs the current strategy once per entry time in parallel"
+            )
             
-            # Monte Carlo results
-            if 'mc_result' in st.session_state and st.session_state.mc_result:
-                st.divider()
-                st.markdown("### 🎲 Monte Carlo Analysis")
+            if st.button("Run Batch", disabled=not entry_times, use_container_width=True):
+                from engine.batch import run_batch
                 
-                mc = st.session_state.mc_result
-                col1, col2, col3, col4 = st.columns(4)
+                leg_dicts = [_leg_config_to_dict(config) for config in leg_configs]
+                configs = [{
+                    "name": f"Entry {entry_time}",
+                    "strategy": {**strategy_settings, "entry_time": entry_time},
+                    "legs": leg_dicts,
+                    "start_date": start_date,
+                    "end_date": end_date,
+                    "slippage_pct": cost_settings["slippage_pct"],
+                    "brokerage_per_lot": cost_settings["brokerage_per_lot"]
+                } for entry_time in entry_times]
                 
-                with col1:
-                    st.metric("Max DD (95%)", f"₹{mc.max_drawdown_95:,.0f}")
-                with col2:
-                    st.metric("Worst Streak (95%)", mc.worst_losing_streak_95)
-                with col3:
-                    st.metric("CAGR (Median)", f"{mc.cagr_median:.1f}%")
-                with col4:
-                    st.metric("Prob. of Ruin", f"{mc.probability_of_ruin:.1f}%")
+                batch_progress = st.progress(0)
                 
-                with st.expander("Full Monte Carlo Stats"):
-                    for key, value in mc.to_dict().items():
-                        st.write(f"**{key}**: {value}")
-            
-            # Yearly/Monthly P&L tables
-            st.divider()
-            col1, col2 = st.columns(2)
-            
-            with col1:
-                st.markdown("### Yearly P&L")
-                calculator = MetricsCalculator()
-                yearly = calculator.get_yearly_pnl(result)
-                if not yearly.empty:
-                    st.dataframe(yearly, use_container_width=True)
+                def update_batch_progress(done, total, name):
+                    batch_progress.progress(done / total, text=f"Finished {name} ({done}/{total})")
+                
+                try:
+                    st.session_state.batch_summary = run_batch(
+                        configs, progress_callback=update_batch_progress
+                    )
+                except Exception as e:
+                    st.error(f"Batch run failed: {e}")
+                batch_progress.empty()
             
-            with col2:
-                st.markdown("### Monthly P&L")
-                monthly = calculator.get_monthly_pnl(result)
-                if not monthly.empty:
-                    st.dataframe(monthly.tail(12), use_container_width=True)
+            if 'batch_summary' in st.session_state:
+                st.dataframe(st.session_state.batch_summary, use_container_width=True)
+    
+    with tab2:
+        _results_tab()
     
     with tab3:
-        if 'trades_df' not in st.session_state:
-            st.info("Run a backtest to see trades")
-        else:
-            trades_df = st.session_state.trades_df
-            
-            st.markdown(f"### Trade Log ({len(trades_df)} trades)")
-            
-            # Download button
-            csv = trades_df.to_csv(index=False)
-            st.download_button(
-                "📥 Download CSV",
-                csv,
-                "trades.csv",
-                "text/csv",
-                use_container_width=True
-            )
-            
-            # Display trades
-            st.dataframe(
-                trades_df,
-                use_container_width=True,
-                height=500
-            )
+        _trades_tab()
 
 
 if __name__ == "__main__":
@@ -1,4 +1,11 @@
 # Data module
+import pandas as pd
+
+# Loaders hand out cached frames without copying. With Copy-on-Write (always
+# on from pandas 3.0) a caller's write copies instead of corrupting the cache.
+if int(pd.__version__.split('.')[0]) < 3:
+    pd.options.mode.copy_on_write = True
+
 from .loader import DataLoader
 from .resolver import InstrumentResolver
 
@@ -0,0 +1,53 @@
+"""
+Hugging Face Download - Fetches the option dataset when no local copy exists
+
+Kept apart from the loader so huggingface_hub (and its HTTP stack) is only
+imported when a download is actually needed.
+"""
+
+from pathlib import Path
+
+from huggingface_hub import snapshot_download
+
+
+def download_dataset(repo_id: str, data_dir: Path):
+    """
+    Download the dataset snapshot into data_dir's parent
+
+    Args:
+        repo_id: Hugging Face dataset repo
+        data_dir: Expected data directory (e.g. .../NIFTY)
+    """
+    print(f"Downloading data from Hugging Face: {repo_id}")
+    print("This may take a few minutes on first run...")
+    
+    try:
+        # Download entire dataset
+        cache_dir = data_dir.parent
+        cache_dir.mkdir(parents=True, exist_ok=True)
+        
+        print(f"Downloading to: {cache_dir}")
+        
+        snapshot_download(
+            repo_id=repo_id,
+            repo_type="dataset",
+            local_dir=cache_dir,
+            local_dir_use_symlinks=False
+        )
+        
+        # Verify download
+        week_dir = data_dir / "WEEK"
+        
+        if week_dir.exists():
+            week_files = list(week_dir.glob("*.parquet"))
+            print(f"Download complete! Found {len(week_files)} WEEK files")
+        else:
+            print(f"WARNING: WEEK directory not found at {week_dir}")
+            # Try to find where files actually are
+            for p in cache_dir.rglob("*.parquet"):
+                print(f"  Found parquet: {p}")
+                break  # Just show first one
+    except Exception as e:
+        print(f"Error downloading from Hugging Face: {e}")
+        print("Please ensure the dataset exists and is accessible.")
+        raise
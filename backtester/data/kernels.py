@@ -0,0 +1,38 @@
+"""
+Numba kernels for underlying-based SL/target checks
+"""
+
+import numpy as np
+from numba import njit
+
+
+# Explicit signatures: compiled (or loaded from the on-disk cache) once at
+# import. Serial loops - numba's parallel threading layer can deadlock when
+# called off the main thread, which is where Streamlit runs scripts.
+@njit("void(float64[:], float64[:], float64[:], float64[:], boolean[:], boolean[:])", cache=True)
+def sl_hit(lows: np.ndarray, highs: np.ndarray, entries: np.ndarray,
+           sl_points: np.ndarray, is_sell: np.ndarray, out: np.ndarray) -> None:
+    """
+    Underlying SL check per row, written into out
+
+    SELL: hit when low <= entry - sl_points
+    BUY: hit when high >= entry + sl_points
+    """
+    for i in range(entries.size):
+        if is_sell[i]:
+            out[i] = lows[i] <= entries[i] - sl_points[i]
+        else:
+            out[i] = highs[i] >= entries[i] + sl_points[i]
+
+
+@njit("void(float64[:], float64[:], float64[:], float64[:], boolean[:])", cache=True)
+def target_hit(lows: np.ndarray, highs: np.ndarray, entries: np.ndarray,
+               target_points: np.ndarray, out: np.ndarray) -> None:
+    """
+    Underlying target check per row, written into out
+
+    Hit when the underlying moves target_points either way from entry
+    """
+    for i in range(entries.size):
+        out[i] = (highs[i] >= entries[i] + target_points[i]
+                  or lows[i] <= entries[i] - target_points[i])
@@ -2,19 +2,22 @@
 Data Loader - Downloads data from Hugging Face and provides cached access
 """
 
+import numpy as np
 import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+from collections import OrderedDict
 from pathlib import Path
-from typing import Dict, List, Optional
-from datetime import datetime, time
+from typing import Dict, List, Optional, Sequence, Tuple
+from datetime import date
+from concurrent.futures import ThreadPoolExecutor
 import os
+import threading
 
-# Try to import huggingface_hub, install if not present
-try:
-    from huggingface_hub import hf_hub_download, snapshot_download
-except ImportError:
-    import subprocess
-    subprocess.check_call(['pip', 'install', 'huggingface_hub'])
-    from huggingface_hub import hf_hub_download, snapshot_download
+from .repack import layout_version, tick_columns, date_keys, IST_OFFSET, TICKS_PER_RUPEE
+from config import STRIKES, OPTION_TYPES
 
 
 class DataLoader:
@@ -24,7 +27,12 @@ class DataLoader:
     # UPDATE THIS with your actual dataset name after uploading
     HF_DATASET_REPO = "artist-23/nifty-options-data"  # Hugging Face dataset
     
-    def __init__(self, data_dir: Path = None):
+    # Columns the backtest engines use; IV/OI/spot etc. are not decoded
+    # unless asked for. 'seconds' and 'date_i32' only exist in repacked files.
+    DEFAULT_COLUMNS = ('datetime', 'date', 'date_i32', 'seconds', 'open', 'high',
+                       'low', 'close', 'volume', 'strike_price')
+    
+    def __init__(self, data_dir: Path = None, max_cached_files: int = 48):
         # Use local cache directory
         if data_dir is None:
             # Check if we're on Streamlit Cloud (no historical_data folder)
@@ -41,7 +49,15 @@ class DataLoader:
             self.data_dir = data_dir / "NIFTY" if "NIFTY" not in str(data_dir) else data_dir
             self.use_hf = not self.data_dir.exists()
         
-        self._cache: Dict[str, pd.DataFrame] = {}
+        # Least recently used frames are evicted past max_cached_files (the
+        # default fits one preloaded expiry: 21 strikes x CE/PE)
+        self._cache: "OrderedDict[tuple, pd.DataFrame]" = OrderedDict()
+        self.max_cached_files = max_cached_files
+        # Column arrays of cached frames for get_day_arrays (same LRU bound)
+        self._array_cache: "OrderedDict[tuple, Dict[str, np.ndarray]]" = OrderedDict()
+        self._datasets: Dict[Path, ds.Dataset] = {}
+        self._trading_days: Dict[str, np.ndarray] = {}
+        self._cache_lock = threading.Lock()
         self._hf_downloaded = False
     
     def _ensure_data_downloaded(self):
@@ -55,42 +71,10 @@ class DataLoader:
             self._hf_downloaded = True
             return
         
-        print(f"Downloading data from Hugging Face: {self.HF_DATASET_REPO}")
-        print("This may take a few minutes on first run...")
-        
-        try:
-            # Download entire dataset
-            cache_dir = self.data_dir.parent
-            cache_dir.mkdir(parents=True, exist_ok=True)
-            
-            print(f"Downloading to: {cache_dir}")
-            
-            snapshot_download(
-                repo_id=self.HF_DATASET_REPO,
-                repo_type="dataset",
-                local_dir=cache_dir,
-                local_dir_use_symlinks=False
-            )
-            
-            # Verify download
-            week_dir = self.data_dir / "WEEK"
-            month_dir = self.data_dir / "MONTH"
-            
-            if week_dir.exists():
-                week_files = list(week_dir.glob("*.parquet"))
-                print(f"Download complete! Found {len(week_files)} WEEK files")
-            else:
-                print(f"WARNING: WEEK directory not found at {week_dir}")
-                # Try to find where files actually are
-                for p in cache_dir.rglob("*.parquet"):
-                    print(f"  Found parquet: {p}")
-                    break  # Just show first one
-            
-            self._hf_downloaded = True
-        except Exception as e:
-            print(f"Error downloading from Hugging Face: {e}")
-            print("Please ensure the dataset exists and is accessible.")
-            raise
+        # Imported here: huggingface_hub is slow to import and rarely needed
+        from .hf_download import download_dataset
+        download_dataset(self.HF_DATASET_REPO, self.data_dir)
+        self._hf_downloaded = True
     
     def _get_file_path(self, strike: str, option_type: str, expiry_type: str) -> Path:
         """Get parquet file path for given parameters"""
@@ -98,7 +82,9 @@ class DataLoader:
         filename = f"{strike}_{option_type}.parquet"
         return self.data_dir / expiry_type / filename
     
-    def load(self, strike: str, option_type: str, expiry_type: str) -> pd.DataFrame:
+    def load(self, strike: str, option_type: str, expiry_type: str,
+             date_range: Optional[Tuple[str, str]] = None,
+             columns: Optional[Sequence[str]] = DEFAULT_COLUMNS) -> pd.DataFrame:
         """
         Load and cache parquet file
         
@@ -106,48 +92,208 @@ class DataLoader:
             strike: 'ATM', 'ATM+1', 'ATM-5', etc.
             option_type: 'CE' or 'PE'
             expiry_type: 'WEEK' or 'MONTH'
+            date_range: Optional ('YYYY-MM-DD', 'YYYY-MM-DD') pushed down to
+                the parquet reader so only matching row groups are decoded
+            columns: Columns to read ('datetime' is always read); None reads
+                every column. Columns missing from the file are skipped.
         
         Returns:
-            DataFrame with option data
+            DataFrame with option data, cached per column set (LRU, up to
+            max_cached_files frames). Reads with
+            date_range bypass the cache. The cached frame is returned as-is
+            and relies on Copy-on-Write (see data/__init__.py) to stay intact.
         """
-        cache_key = f"{expiry_type}_{strike}_{option_type}"
+        if date_range is not None:
+            file_path = self._get_file_path(strike, option_type, expiry_type)
+            if not file_path.exists():
+                raise FileNotFoundError(f"Data file not found: {file_path}")
+            return self._read(file_path, date_range, columns)
+        
+        cache_key = (expiry_type, strike, option_type,
+                     None if columns is None else tuple(columns))
+        
+        with self._cache_lock:
+            df = self._cache.get(cache_key)
+            if df is not None:
+                self._cache.move_to_end(cache_key)
         
-        if cache_key not in self._cache:
+        if df is None:
             file_path = self._get_file_path(strike, option_type, expiry_type)
             
             if not file_path.exists():
                 raise FileNotFoundError(f"Data file not found: {file_path}")
             
-            df = pd.read_parquet(file_path)
-            
+            df = self._read(file_path, columns=columns)
+            # Concurrent loads of one file keep whichever frame landed first
+            with self._cache_lock:
+                df = self._cache.setdefault(cache_key, df)
+                self._cache.move_to_end(cache_key)
+                while len(self._cache) > self.max_cached_files:
+                    self._cache.popitem(last=False)
+        
+        return df
+    
+    def preload_all(self, expiry_types: Tuple[str, ...] = ("WEEK",),
+                    max_workers: Optional[int] = None) -> int:
+        """
+        Load every strike/option file into the cache using a thread pool
+        
+        pyarrow releases the GIL while decoding, so files decode in
+        parallel. Missing files are skipped.
+        
+        Args:
+            expiry_types: Expiry folders to preload
+            max_workers: Reader threads (default: CPU count)
+        
+        Returns:
+            Number of files loaded
+        """
+        # Download (if needed) once, before any reader thread asks for it
+        self._ensure_data_downloaded()
+        
+        instruments = [
+            (strike, option_type, expiry_type)
+            for expiry_type in expiry_types
+            for strike in STRIKES
+            for option_type in OPTION_TYPES
+            if self._get_file_path(strike, option_type, expiry_type).exists()
+        ]
+        if not instruments:
+            return 0
+        
+        with ThreadPoolExecutor(max_workers=max_workers or os.cpu_count()) as executor:
+            list(executor.map(lambda args: self.load(*args), instruments))
+        return len(instruments)
+    
+    def load_arrow(self, strike: str, option_type: str, expiry_type: str,
+                   date_range: Optional[Tuple[str, str]] = None,
+                   columns: Optional[Sequence[str]] = DEFAULT_COLUMNS) -> pa.Table:
+        """
+        Read a parquet file as an Arrow table, skipping pandas entirely
+        
+        Same arguments and normalization as load() (IST datetime, float64
+        prices, 'seconds' column, sorted by datetime), except that 'date'
+        keeps the file's type. Numeric columns convert to NumPy without a
+        copy, e.g. table.column('close').to_numpy(). Not cached.
+        """
+        file_path = self._get_file_path(strike, option_type, expiry_type)
+        if not file_path.exists():
+            raise FileNotFoundError(f"Data file not found: {file_path}")
+        return self._read_table(file_path, date_range, columns)
+    
+    def _read(self, file_path: Path,
+              date_range: Optional[Tuple[str, str]] = None,
+              columns: Optional[Sequence[str]] = None) -> pd.DataFrame:
+        """Read a parquet file (optionally filtered/projected) as a normalized DataFrame"""
+        df = self._read_table(file_path, date_range, columns).to_pandas()
+        
+        # Convert date column to categorical strings for consistent comparison
+        if 'date' in df.columns:
+            df['date'] = self._normalize_dates(df['date'])
+        return df
+    
+    def _read_table(self, file_path: Path,
+                    date_range: Optional[Tuple[str, str]] = None,
+                    columns: Optional[Sequence[str]] = None) -> pa.Table:
+        """Read a parquet file (optionally filtered/projected) and normalize it in Arrow"""
+        dataset = self._dataset(file_path)
+        schema = dataset.schema
+        if columns is not None:
+            columns = [c for c in dict.fromkeys(['datetime', *columns]) if c in schema.names]
+        
+        if date_range is None:
+            # String dates (repacked files) stay dictionary-encoded and become a
+            # categorical in pandas; read_dictionary is a no-op for date32 columns
+            table = pq.read_table(file_path, columns=columns, read_dictionary=['date'])
+        else:
+            start, end = self._date_filter_values(schema, *date_range)
+            expr = (ds.field('date') >= start) & (ds.field('date') <= end)
+            table = dataset.to_table(columns=columns, filter=expr)
+        
+        # Repacked files already store IST
+        if layout_version(schema) < 2:
             # Ensure datetime is properly typed
-            if not pd.api.types.is_datetime64_any_dtype(df['datetime']):
-                df['datetime'] = pd.to_datetime(df['datetime'])
+            utc = table.column('datetime')
+            if not pa.types.is_timestamp(utc.type):
+                utc = utc.cast(pa.timestamp('ns'))
             
             # CRITICAL: Convert UTC to IST (Dhan API provides data in UTC)
             # IST = UTC + 5:30
-            df['datetime'] = df['datetime'] + pd.Timedelta(hours=5, minutes=30)
-            
-            # Convert date column to string format for consistent comparison
-            if 'date' in df.columns:
-                if df['date'].dtype == 'object' and len(df) > 0:
-                    first_val = df['date'].iloc[0]
-                    if hasattr(first_val, 'strftime'):
-                        df['date'] = df['date'].apply(lambda x: x.strftime('%Y-%m-%d') if hasattr(x, 'strftime') else str(x))
-                    elif not isinstance(first_val, str):
-                        df['date'] = df['date'].astype(str)
-                elif df['date'].dtype != 'object':
-                    df['date'] = df['date'].astype(str)
-            
-            # Add time column for filtering (now in IST)
-            df['time'] = df['datetime'].dt.time
-            
-            # Sort by datetime
-            df = df.sort_values('datetime').reset_index(drop=True)
-            
-            self._cache[cache_key] = df
+            ist = pc.add(utc, pa.scalar(IST_OFFSET, pa.duration(utc.type.unit)))
+            table = table.set_column(table.schema.get_field_index('datetime'), 'datetime', ist)
         
-        return self._cache[cache_key].copy()
+        # Repacked prices stored as int32 ticks come back as the exact float64
+        for name in tick_columns(schema):
+            if name in table.column_names:
+                prices = pc.divide(table.column(name).cast(pa.float64()), float(TICKS_PER_RUPEE))
+                table = table.set_column(table.schema.get_field_index(name), name, prices)
+        
+        # Time of day (IST) as int seconds for filtering - repacked files store it
+        if 'seconds' not in table.column_names:
+            ist = table.column('datetime')
+            seconds = pc.add(
+                pc.add(pc.multiply(pc.hour(ist), 3600), pc.multiply(pc.minute(ist), 60)),
+                pc.second(ist)
+            )
+            table = table.append_column('seconds', seconds.cast(pa.int32()))
+        
+        # Trading date as int yyyymmdd for date searches - repacked files store it
+        if 'date' in table.column_names and 'date_i32' not in table.column_names:
+            table = table.append_column('date_i32', date_keys(table.column('date')))
+        
+        # Sort by datetime
+        return table.sort_by([('datetime', 'ascending')])
+    
+    @staticmethod
+    def _normalize_dates(dates: pd.Series) -> pd.Series:
+        """
+        Convert a date column to categorical 'YYYY-MM-DD' strings
+        
+        Only the distinct dates are formatted. Categories are sorted, so on
+        a date-sorted frame the category codes are sorted too.
+        """
+        if isinstance(dates.dtype, pd.CategoricalDtype):
+            # Already dictionary-encoded (string dates from a repacked file)
+            codes, uniques = dates.cat.codes.to_numpy(), dates.cat.categories
+        else:
+            codes, uniques = pd.factorize(dates)
+        labels = pd.Index([
+            d.strftime('%Y-%m-%d') if hasattr(d, 'strftime') else str(d)
+            for d in uniques
+        ], dtype=object)
+        # Sort, and fold duplicate labels (e.g. timestamps within one day)
+        categories = labels.unique().sort_values()
+        codes = np.where(codes >= 0, categories.get_indexer(labels)[codes], -1)
+        return pd.Series(pd.Categorical.from_codes(codes, categories=categories),
+                         index=dates.index, name=dates.name)
+    
+    def _dataset(self, file_path: Path) -> ds.Dataset:
+        """Arrow dataset for a file, kept so its footer is parsed only once"""
+        if file_path not in self._datasets:
+            file_format = ds.ParquetFileFormat(
+                read_options=ds.ParquetReadOptions(dictionary_columns=['date'])
+            )
+            self._datasets[file_path] = ds.dataset(file_path, format=file_format)
+        return self._datasets[file_path]
+    
+    @staticmethod
+    def _date_filter_values(schema: pa.Schema, start_date: str, end_date: str) -> tuple:
+        """Express 'YYYY-MM-DD' bounds in the file's physical date type"""
+        date_type = schema.field('date').type
+        if pa.types.is_date(date_type):
+            return date.fromisoformat(start_date), date.fromisoformat(end_date)
+        if pa.types.is_timestamp(date_type):
+            return pd.Timestamp(start_date), pd.Timestamp(end_date)
+        return start_date, end_date
+    
+    def _read_dates(self, expiry_type: str) -> pd.Series:
+        """Read only the date column of the reference (ATM CE) file"""
+        file_path = self._get_file_path("ATM", "CE", expiry_type)
+        if not file_path.exists():
+            raise FileNotFoundError(f"Data file not found: {file_path}")
+        dates = pq.read_table(file_path, columns=['date'],
+                              read_dictionary=['date']).column('date').to_pandas()
+        return self._normalize_dates(dates)
     
     def slice_by_date(self, df: pd.DataFrame, 
                       start_date: str, end_date: str) -> pd.DataFrame:
@@ -158,9 +304,33 @@ class DataLoader:
             df: Source dataframe
             start_date: 'YYYY-MM-DD'
             end_date: 'YYYY-MM-DD'
+        
+        Frames from load() are sorted by datetime, so the range is found by
+        binary search. Returns a positional slice, not a copy.
         """
-        mask = (df['date'] >= start_date) & (df['date'] <= end_date)
-        return df[mask].copy()
+        if 'date_i32' in df.columns:
+            keys = df['date_i32'].to_numpy()
+            lo = keys.searchsorted(self._date_key(start_date), side='left')
+            hi = keys.searchsorted(self._date_key(end_date), side='right')
+            return df.iloc[lo:hi]
+        
+        dates = df['date']
+        if isinstance(dates.dtype, pd.CategoricalDtype):
+            # Search the small sorted categories, then the int codes
+            categories = dates.cat.categories
+            codes = dates.cat.codes.to_numpy()
+            lo = codes.searchsorted(categories.searchsorted(start_date, side='left'), side='left')
+            hi = codes.searchsorted(categories.searchsorted(end_date, side='right'), side='left')
+        else:
+            dates = dates.to_numpy()
+            lo = dates.searchsorted(start_date, side='left')
+            hi = dates.searchsorted(end_date, side='right')
+        return df.iloc[lo:hi]
+    
+    @staticmethod
+    def _date_key(date_str: str) -> int:
+        """'YYYY-MM-DD' as int yyyymmdd"""
+        return int(date_str.replace('-', ''))
     
     def slice_by_time(self, df: pd.DataFrame,
                       start_time: str = "09:15",
@@ -177,19 +347,21 @@ class DataLoader:
         IST input times to UTC for proper filtering.
         IST = UTC + 5:30, so UTC = IST - 5:30
         """
-        from datetime import timedelta
-        
-        # Parse IST times
-        start_ist = datetime.strptime(start_time, "%H:%M")
-        end_ist = datetime.strptime(end_time, "%H:%M")
+        start_s, end_s = self._window_seconds(start_time, end_time)
+        seconds = df['seconds'].to_numpy()
+        mask = (seconds >= start_s) & (seconds <= end_s)
+        return df[mask]
+    
+    @staticmethod
+    def _window_seconds(start_time: str, end_time: str) -> Tuple[int, int]:
+        """'HH:MM' IST window as seconds since midnight, less the 5:30 UTC offset"""
+        ist_offset = 5 * 3600 + 30 * 60
         
-        # Convert IST to UTC (subtract 5:30)
-        ist_offset = timedelta(hours=5, minutes=30)
-        start_utc = (start_ist - ist_offset).time()
-        end_utc = (end_ist - ist_offset).time()
+        def to_seconds(hhmm: str) -> int:
+            hours, minutes = hhmm.split(':')
+            return (int(hours) * 3600 + int(minutes) * 60 - ist_offset) % 86400
         
-        mask = (df['time'] >= start_utc) & (df['time'] <= end_utc)
-        return df[mask].copy()
+        return to_seconds(start_time), to_seconds(end_time)
     
     def get_day_data(self, strike: str, option_type: str, 
                      expiry_type: str, date: str,
@@ -205,28 +377,130 @@ class DataLoader:
         """
         df = self.load(strike, option_type, expiry_type)
         df = self.slice_by_date(df, date, date)
-        df = self.slice_by_time(df, start_time, end_time)
-        return df
+        
+        # One day is sorted by time, so the window is a binary search
+        start_s, end_s = self._window_seconds(start_time, end_time)
+        seconds = df['seconds'].to_numpy()
+        lo = seconds.searchsorted(start_s, side='left')
+        hi = seconds.searchsorted(end_s, side='right')
+        return df.iloc[lo:hi]
+    
+    def get_day_arrays(self, strike: str, option_type: str,
+                       expiry_type: str, date: str,
+                       start_time: str = "09:15",
+                       end_time: str = "15:30") -> Tuple[Optional[np.ndarray], ...]:
+        """
+        Get a single trading day as NumPy arrays, without building a DataFrame
+        
+        Same rows as get_day_data. The arrays are read-only views of the
+        cached file, found by binary search on its date and time columns.
+        
+        Args:
+            strike, option_type, expiry_type: Instrument params
+            date: 'YYYY-MM-DD'
+            start_time, end_time: Time window
+        
+        Returns:
+            (datetime as int64 ns, open, high, low, close, strike_price),
+            strike_price being None if the file has no such column
+        """
+        arrays = self._file_arrays(strike, option_type, expiry_type)
+        
+        keys = arrays['date_i32']
+        key = self._date_key(date)
+        lo = keys.searchsorted(key, side='left')
+        hi = keys.searchsorted(key, side='right')
+        
+        start_s, end_s = self._window_seconds(start_time, end_time)
+        seconds = arrays['seconds'][lo:hi]
+        hi = lo + seconds.searchsorted(end_s, side='right')
+        lo = lo + seconds.searchsorted(start_s, side='left')
+        
+        strike_price = arrays.get('strike_price')
+        return (arrays['datetime'][lo:hi], arrays['open'][lo:hi], arrays['high'][lo:hi],
+                arrays['low'][lo:hi], arrays['close'][lo:hi],
+                None if strike_price is None else strike_price[lo:hi])
+    
+    def _file_arrays(self, strike: str, option_type: str,
+                     expiry_type: str) -> Dict[str, np.ndarray]:
+        """The cached frame's columns for get_day_arrays, extracted once per file"""
+        cache_key = (expiry_type, strike, option_type)
+        with self._cache_lock:
+            arrays = self._array_cache.get(cache_key)
+            if arrays is not None:
+                self._array_cache.move_to_end(cache_key)
+                return arrays
+        
+        df = self.load(strike, option_type, expiry_type)
+        arrays = {
+            name: df[name].to_numpy()
+            for name in ('date_i32', 'seconds', 'open', 'high', 'low', 'close', 'strike_price')
+            if name in df.columns
+        }
+        arrays['datetime'] = df['datetime'].to_numpy(dtype='datetime64[ns]').view('i8')
+        
+        with self._cache_lock:
+            arrays = self._array_cache.setdefault(cache_key, arrays)
+            self._array_cache.move_to_end(cache_key)
+            while len(self._array_cache) > self.max_cached_files:
+                self._array_cache.popitem(last=False)
+        return arrays
     
     def get_trading_days(self, expiry_type: str = "WEEK",
                          start_date: str = None, 
                          end_date: str = None) -> List[str]:
         """Get unique trading days in range"""
-        # Load any file to get trading days (date is already string from load())
-        df = self.load("ATM", "CE", expiry_type)
+        days = self._all_trading_days(expiry_type)
         
-        if start_date:
-            df = df[df['date'] >= start_date]
-        if end_date:
-            df = df[df['date'] <= end_date]
-        
-        return sorted(df['date'].unique().tolist())
+        lo = days.searchsorted(start_date, side='left') if start_date else 0
+        hi = days.searchsorted(end_date, side='right') if end_date else len(days)
+        return days[lo:hi].tolist()
     
     def get_date_range(self, expiry_type: str = "WEEK") -> tuple:
         """Get min and max dates available"""
-        df = self.load("ATM", "CE", expiry_type)
-        return df['date'].min(), df['date'].max()
+        days = self._all_trading_days(expiry_type)
+        return days[0], days[-1]
+    
+    def _all_trading_days(self, expiry_type: str) -> np.ndarray:
+        """Sorted trading days of the reference file, computed once per expiry"""
+        if expiry_type not in self._trading_days:
+            days = self._row_group_dates(expiry_type)
+            if days is None:
+                # Only the date column is read - no price data is decoded
+                days = self._read_dates(expiry_type).cat.categories.to_numpy()
+            self._trading_days[expiry_type] = np.sort(pd.unique(days))
+        return self._trading_days[expiry_type]
+    
+    def _row_group_dates(self, expiry_type: str) -> Optional[np.ndarray]:
+        """
+        Trading days from row-group statistics of a repacked file.
+        
+        Repacked files hold one row group per day, so the footer alone
+        lists the days. Returns None if the file is not repacked or lacks
+        statistics.
+        """
+        file_path = self._get_file_path("ATM", "CE", expiry_type)
+        if not file_path.exists():
+            raise FileNotFoundError(f"Data file not found: {file_path}")
+        
+        metadata = pq.read_metadata(file_path)
+        schema = metadata.schema.to_arrow_schema()
+        if layout_version(schema) < 1:
+            return None
+        
+        date_idx = schema.get_field_index('date')
+        days = []
+        for i in range(metadata.num_row_groups):
+            stats = metadata.row_group(i).column(date_idx).statistics
+            if stats is None or not stats.has_min_max:
+                return None
+            days.append(stats.min)
+        return self._normalize_dates(pd.Series(days, dtype=object)).to_numpy()
     
     def clear_cache(self):
         """Clear the data cache"""
-        self._cache.clear()
+        with self._cache_lock:
+            self._cache.clear()
+            self._array_cache.clear()
+        self._datasets.clear()
+        self._trading_days.clear()
@@ -0,0 +1,213 @@
+"""
+Parquet Repacker - Rewrites option data files for fast day-level reads
+
+Each file is rewritten sorted by datetime with one row group per trading
+day, so date filters on read are answered from row-group statistics and
+only the matching days are decoded.
+
+Usage:
+    python backtester/data/repack.py [data_dir]
+"""
+
+import os
+import sys
+from datetime import timedelta
+from pathlib import Path
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+
+# Schema metadata key recording a repacked file's layout version:
+#   1 - sorted by datetime, one row group per trading day
+#   2 - datetime stored in IST instead of UTC
+#   3 - int32 'seconds' column: IST time of day in seconds since midnight
+#   4 - prices as int32 ticks where lossless (see TICKS_KEY), counts as int32
+#   5 - 'date' stored as dictionary-encoded 'YYYY-MM-DD' strings
+#   6 - int32 'date_i32' column: the trading date as yyyymmdd
+LAYOUT_KEY = b"option_scan.layout"
+LAYOUT_VERSION = 6
+
+# Comma-separated price columns stored as int32 ticks (price * TICKS_PER_RUPEE)
+TICKS_KEY = b"option_scan.tick_columns"
+TICKS_PER_RUPEE = 100
+PRICE_COLUMNS = ("open", "high", "low", "close")
+COUNT_COLUMNS = ("volume", "oi")
+
+# Dhan timestamps are UTC; India has no DST, so the offset is fixed
+IST_OFFSET = timedelta(hours=5, minutes=30)
+
+
+def layout_version(schema: pa.Schema) -> int:
+    """Layout version of a file's schema (0 if never repacked)"""
+    metadata = schema.metadata or {}
+    return int(metadata.get(LAYOUT_KEY, b"0"))
+
+
+def tick_columns(schema: pa.Schema) -> list:
+    """Price columns a repacked file stores as int32 ticks"""
+    metadata = schema.metadata or {}
+    value = metadata.get(TICKS_KEY, b"").decode()
+    return value.split(",") if value else []
+
+
+def _to_ticks(prices: pa.ChunkedArray):
+    """
+    Convert prices to int32 ticks, only if exact
+    
+    Returns:
+        int32 ticks, or None if any price is not a whole number of ticks
+        (or out of int32 range) and must stay float64
+    """
+    if prices.null_count or not pa.types.is_floating(prices.type):
+        return None
+    prices = prices.cast(pa.float64())
+    ticks = pc.round(pc.multiply(prices, float(TICKS_PER_RUPEE)))
+    if len(ticks) and pc.max(pc.abs(ticks)).as_py() >= 2**31:
+        return None
+    # The loader restores prices as ticks / TICKS_PER_RUPEE; require a bit-exact round trip
+    if not pc.all(pc.equal(pc.divide(ticks, float(TICKS_PER_RUPEE)), prices)).as_py():
+        return None
+    return ticks.cast(pa.int32())
+
+
+def date_keys(dates: pa.ChunkedArray) -> pa.ChunkedArray:
+    """Trading dates (date32, timestamp or 'YYYY-MM-DD' strings) as int32 yyyymmdd"""
+    if pa.types.is_dictionary(dates.type):
+        dates = dates.cast(dates.type.value_type)
+    if pa.types.is_date(dates.type) or pa.types.is_timestamp(dates.type):
+        keys = pc.add(
+            pc.add(pc.multiply(pc.year(dates), 10000), pc.multiply(pc.month(dates), 100)),
+            pc.day(dates)
+        )
+    else:
+        keys = pc.replace_substring(dates.cast(pa.string()), "-", "")
+    return keys.cast(pa.int32())
+
+
+def _to_int32(counts: pa.ChunkedArray):
+    """Narrow integer counts to int32 if they fit, else None"""
+    if not pa.types.is_integer(counts.type) or len(counts) == 0:
+        return None
+    bounds = pc.min_max(counts)
+    if bounds["min"].as_py() is None or bounds["min"].as_py() < -2**31 or bounds["max"].as_py() >= 2**31:
+        return None
+    return counts.cast(pa.int32())
+
+
+def is_repacked(file_path: Path) -> bool:
+    """Check whether a file already has the current repacked layout"""
+    return layout_version(pq.read_schema(file_path)) >= LAYOUT_VERSION
+
+
+def repack_file(file_path: Path, force: bool = False) -> bool:
+    """
+    Rewrite one parquet file with per-day row groups
+
+    Args:
+        file_path: Parquet file to repack in place
+        force: Repack even if the file already has the current layout
+
+    Returns:
+        True if the file was rewritten
+    """
+    if not force and is_repacked(file_path):
+        return False
+
+    table = pq.read_table(file_path)
+    version = layout_version(table.schema)
+
+    if version < 2:
+        # Bake the UTC -> IST conversion into the file
+        utc = table.column("datetime")
+        if not pa.types.is_timestamp(utc.type):
+            utc = utc.cast(pa.timestamp("ns"))
+        ist = pc.add(utc, pa.scalar(IST_OFFSET, pa.duration(utc.type.unit)))
+        table = table.set_column(table.schema.get_field_index("datetime"), "datetime", ist)
+
+    if version < 3:
+        ist = table.column("datetime")
+        seconds = pc.add(
+            pc.add(pc.multiply(pc.hour(ist), 3600), pc.multiply(pc.minute(ist), 60)),
+            pc.second(ist)
+        )
+        table = table.append_column("seconds", seconds.cast(pa.int32()))
+
+    ticked = tick_columns(table.schema)
+    if version < 4:
+        for name in PRICE_COLUMNS:
+            if name not in table.column_names:
+                continue
+            ticks = _to_ticks(table.column(name))
+            if ticks is not None:
+                table = table.set_column(table.schema.get_field_index(name), name, ticks)
+                ticked.append(name)
+        for name in COUNT_COLUMNS:
+            if name not in table.column_names:
+                continue
+            counts = _to_int32(table.column(name))
+            if counts is not None:
+                table = table.set_column(table.schema.get_field_index(name), name, counts)
+
+    if version < 5:
+        dates = table.column("date")
+        if pa.types.is_date(dates.type) or pa.types.is_timestamp(dates.type):
+            dates = pc.strftime(dates, format="%Y-%m-%d")
+        elif not pa.types.is_string(dates.type):
+            dates = dates.cast(pa.string())
+        table = table.set_column(table.schema.get_field_index("date"), "date", dates)
+
+    if version < 6:
+        table = table.append_column("date_i32", date_keys(table.column("date")))
+
+    table = table.sort_by([("datetime", "ascending")])
+
+    metadata = dict(table.schema.metadata or {})
+    metadata[LAYOUT_KEY] = str(LAYOUT_VERSION).encode()
+    metadata[TICKS_KEY] = ",".join(ticked).encode()
+    table = table.replace_schema_metadata(metadata)
+
+    # Row offsets where the trading date changes
+    bounds = [0, len(table)]
+    if len(table) > 1:
+        dates = table.column("date")
+        changes = pc.not_equal(dates.slice(1), dates.slice(0, len(table) - 1))
+        bounds[1:1] = [i + 1 for i in pc.indices_nonzero(changes).to_pylist()]
+
+    tmp_path = file_path.with_suffix(".parquet.tmp")
+    with pq.ParquetWriter(tmp_path, table.schema, compression="zstd",
+                          use_dictionary=["date"], write_statistics=True) as writer:
+        for start, end in zip(bounds[:-1], bounds[1:]):
+            if end > start:
+                writer.write_table(table.slice(start, end - start), row_group_size=end - start)
+
+    os.replace(tmp_path, file_path)
+    return True
+
+
+def repack_all(data_dir: Path = None, force: bool = False) -> int:
+    """
+    Repack every parquet file under data_dir (config.DATA_DIR by default)
+
+    Returns:
+        Number of files rewritten
+    """
+    if data_dir is None:
+        from config import DATA_DIR
+        data_dir = DATA_DIR
+    count = 0
+    for file_path in sorted(Path(data_dir).rglob("*.parquet")):
+        if repack_file(file_path, force=force):
+            count += 1
+            print(f"Repacked {file_path.relative_to(data_dir)}")
+    return count
+
+
+if __name__ == "__main__":
+    # Run as a script, so make backtester/ importable for config. Not done on
+    # import: the loader imports this module for its layout helpers
+    sys.path.append(str(Path(__file__).parent.parent))
+    from config import DATA_DIR
+    data_dir = Path(sys.argv[1]) if len(sys.argv) > 1 else DATA_DIR
+    print(f"Repacked {repack_all(data_dir)} files under {data_dir}")
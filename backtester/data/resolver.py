@@ -4,11 +4,28 @@ Instrument Resolver - Maps strategy intent to data files
 
 from pathlib import Path
 from typing import List, Optional
-import sys
-sys.path.append(str(Path(__file__).parent.parent))
+
 from config import DATA_DIR, STRIKES, EXPIRY_TYPES, OPTION_TYPES
 
 
+def _split_strike(strike_str: str) -> tuple:
+    """Split 'ATM', 'ATM+5', 'ATM-3' into (base, offset)"""
+    if strike_str == "ATM":
+        return ("ATM", 0)
+    elif "+" in strike_str:
+        offset = int(strike_str.split("+")[1])
+        return ("ATM", offset)
+    elif "-" in strike_str:
+        offset = -int(strike_str.split("-")[1])
+        return ("ATM", offset)
+    else:
+        raise ValueError(f"Cannot parse strike: {strike_str}")
+
+
+# Parsed form of every configured strike, so parse_strike is a dict lookup
+_STRIKE_TABLE = {strike: _split_strike(strike) for strike in STRIKES}
+
+
 class InstrumentResolver:
     """Maps strategy intent to correct parquet files"""
     
@@ -79,13 +96,8 @@ class InstrumentResolver:
         Returns:
             (base, offset): ('ATM', 0), ('ATM', 5), ('ATM', -3)
         """
-        if strike_str == "ATM":
-            return ("ATM", 0)
-        elif "+" in strike_str:
-            offset = int(strike_str.split("+")[1])
-            return ("ATM", offset)
-        elif "-" in strike_str:
-            offset = -int(strike_str.split("-")[1])
-            return ("ATM", offset)
-        else:
-            raise ValueError(f"Cannot parse strike: {strike_str}")
+        try:
+            return _STRIKE_TABLE[strike_str]
+        except KeyError:
+            # Strikes outside config.STRIKES are still parsed from the string
+            return _split_strike(strike_str)
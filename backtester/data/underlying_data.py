@@ -4,11 +4,16 @@ Underlying Data Loader - Fetch Nifty 50 data from Yahoo Finance
 
 import pandas as pd
 import numpy as np
+import pyarrow as pa
+import pyarrow.feather as feather
 from pathlib import Path
 from datetime import datetime, timedelta
-from typing import Optional, Dict
+from typing import Optional, Dict, List, Sequence, Tuple, Union
+import os
 import yfinance as yf
 
+from .kernels import sl_hit, target_hit
+
 
 class UnderlyingDataLoader:
     """
@@ -17,6 +22,13 @@ class UnderlyingDataLoader:
     """
     
     NIFTY_SYMBOL = "^NSEI"  # Yahoo Finance symbol for Nifty 50
+    OHLC_COLUMNS = ('open', 'high', 'low', 'close')
+    
+    # One cache file for all requested ranges, grown as new dates are asked for
+    CACHE_FILE = "nifty50_daily.feather"
+    # Schema metadata: 'start,end' date span already downloaded (end exclusive,
+    # as in Yahoo's history()), so holidays at the edges aren't refetched
+    COVERAGE_KEY = b"nifty50.coverage"
     
     def __init__(self, cache_dir: Optional[Path] = None):
         if cache_dir is None:
@@ -26,7 +38,11 @@ class UnderlyingDataLoader:
         
         # In-memory cache
         self._data_cache: Optional[pd.DataFrame] = None
-        self._datetime_index: Dict[datetime, float] = {}
+        # OHLC rows as an (N, 4) array, looked up by 'YYYY-MM-DD' date
+        self._ohlc: np.ndarray = np.empty((0, 4))
+        self._high: np.ndarray = self._ohlc[:, 1]
+        self._low: np.ndarray = self._ohlc[:, 2]
+        self._date_to_row: Dict[str, int] = {}
     
     def download_data(self, start_date: str, end_date: str, 
                       interval: str = "1d") -> pd.DataFrame:
@@ -70,30 +86,85 @@ class UnderlyingDataLoader:
         """
         Load daily Nifty 50 data (preferred for underlying-based SL/Target)
         
+        Only dates outside the span already cached are downloaded; the
+        cache file is then rewritten with the merged data.
+        
         Args:
             start_date: 'YYYY-MM-DD'
-            end_date: 'YYYY-MM-DD'
+            end_date: 'YYYY-MM-DD' (exclusive, as in Yahoo Finance)
         
         Returns:
             DataFrame with daily OHLCV
         """
-        cache_file = self.cache_dir / f"nifty50_daily_{start_date}_{end_date}.parquet"
-        
-        # Check cache
-        if cache_file.exists():
-            df = pd.read_parquet(cache_file)
-            df['datetime'] = pd.to_datetime(df['datetime'])
+        cache_file = self.cache_dir / self.CACHE_FILE
+        cached, coverage = self._read_cache(cache_file)
+        
+        if cached is None:
+            # Download from Yahoo Finance
+            print(f"Downloading Nifty 50 data from {start_date} to {end_date}...")
+            df = self.download_data(start_date, end_date, interval="1d")
+            self._write_cache(cache_file, df, (start_date, end_date))
+            print(f"Cached to {cache_file}")
             return df
         
-        # Download from Yahoo Finance
+        covered_start, covered_end = coverage
+        frames: List[pd.DataFrame] = [cached]
+        if start_date < covered_start:
+            frames.append(self._download_span(start_date, covered_start))
+        if end_date > covered_end:
+            frames.append(self._download_span(covered_end, end_date))
+        
+        if len(frames) > 1:
+            cached = (pd.concat(frames, ignore_index=True)
+                      .drop_duplicates('date', keep='last')
+                      .sort_values('datetime')
+                      .reset_index(drop=True))
+            coverage = (min(start_date, covered_start), max(end_date, covered_end))
+            self._write_cache(cache_file, cached, coverage)
+        
+        in_range = (cached['date'] >= start_date) & (cached['date'] < end_date)
+        return cached[in_range].reset_index(drop=True)
+    
+    def _download_span(self, start_date: str, end_date: str) -> pd.DataFrame:
+        """Download a span missing from the cache (empty if Yahoo has no rows)"""
         print(f"Downloading Nifty 50 data from {start_date} to {end_date}...")
-        df = self.download_data(start_date, end_date, interval="1d")
-        
-        # Save to cache
-        df.to_parquet(cache_file, index=False)
-        print(f"Cached to {cache_file}")
+        try:
+            return self.download_data(start_date, end_date, interval="1d")
+        except ValueError:
+            # e.g. the span only covers a weekend or market holidays
+            return pd.DataFrame()
+    
+    def _read_cache(self, cache_file: Path) -> Tuple[Optional[pd.DataFrame], Optional[Tuple[str, str]]]:
+        """
+        Memory-map the cache file
         
-        return df
+        Returns:
+            (data, (start, end) covered), or (None, None) without a usable cache
+        """
+        if not cache_file.exists():
+            return None, None
+        
+        table = feather.read_table(cache_file, memory_map=True)
+        coverage = (table.schema.metadata or {}).get(self.COVERAGE_KEY)
+        if coverage is None:
+            return None, None
+        
+        df = table.to_pandas()
+        df['datetime'] = pd.to_datetime(df['datetime'])
+        start, end = coverage.decode().split(',')
+        return df, (start, end)
+    
+    def _write_cache(self, cache_file: Path, df: pd.DataFrame,
+                     coverage: Tuple[str, str]):
+        """Atomically replace the cache file with df and its covered span"""
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        metadata = dict(table.schema.metadata or {})
+        metadata[self.COVERAGE_KEY] = ",".join(coverage).encode()
+        table = table.replace_schema_metadata(metadata)
+        
+        tmp_file = cache_file.with_suffix(".feather.tmp")
+        feather.write_feather(table, tmp_file)
+        os.replace(tmp_file, cache_file)
     
     def get_entry_price(self, date: str) -> Optional[float]:
         """
@@ -148,15 +219,11 @@ class UnderlyingDataLoader:
         """
         self._data_cache = self.load_daily_data(start_date, end_date)
         
-        # Build datetime index for fast lookups
-        self._datetime_index = {}
-        for _, row in self._data_cache.iterrows():
-            self._datetime_index[row['date']] = {
-                'open': row['open'],
-                'high': row['high'],
-                'low': row['low'],
-                'close': row['close']
-            }
+        # Build date -> row index for fast lookups
+        self._ohlc = self._data_cache[list(self.OHLC_COLUMNS)].to_numpy(dtype=np.float64)
+        self._high = self._ohlc[:, 1]
+        self._low = self._ohlc[:, 2]
+        self._date_to_row = {d: i for i, d in enumerate(self._data_cache['date'].tolist())}
     
     def get_day_ohlc(self, date: str) -> Optional[Dict[str, float]]:
         """
@@ -168,7 +235,10 @@ class UnderlyingDataLoader:
         Returns:
             Dict with open, high, low, close
         """
-        return self._datetime_index.get(date)
+        i = self._date_to_row.get(date)
+        if i is None:
+            return None
+        return dict(zip(self.OHLC_COLUMNS, self._ohlc[i].tolist()))
     
     def calculate_underlying_sl_hit(self, entry_date: str, entry_underlying: float,
                                      current_date: str, sl_points: Optional[float] = None,
@@ -259,3 +329,90 @@ class UnderlyingDataLoader:
             return ohlc['high'] >= target_up or ohlc['low'] <= target_down
         
         return False
+
+    def _lookup_rows(self, dates: Sequence[str]):
+        """
+        Map dates to OHLC rows
+        
+        Returns:
+            (row indices, found mask); missing dates point at row 0
+        """
+        idx = np.fromiter((self._date_to_row.get(d, -1) for d in dates),
+                          dtype=np.int64, count=len(dates))
+        found = idx >= 0
+        return np.where(found, idx, 0), found
+    
+    def calculate_underlying_sl_hit_batch(self, current_dates: Sequence[str],
+                                          entry_underlyings: np.ndarray,
+                                          sl_points: Union[float, np.ndarray, None] = None,
+                                          sl_percent: Union[float, np.ndarray, None] = None,
+                                          action: Union[str, np.ndarray] = "SELL") -> np.ndarray:
+        """
+        Vectorized calculate_underlying_sl_hit over many dates
+        
+        Args:
+            current_dates: Dates to check ('YYYY-MM-DD')
+            entry_underlyings: Nifty 50 price at entry, per date
+            sl_points: SL in absolute points (scalar or per date)
+            sl_percent: SL in percentage (scalar or per date)
+            action: "BUY"/"SELL", or an array of them per date
+        
+        Returns:
+            Boolean array, True where SL hit (False for dates without data)
+        """
+        entry = np.asarray(entry_underlyings, dtype=np.float64)
+        if (sl_points is None and sl_percent is None) or not self._date_to_row:
+            return np.zeros(len(current_dates), dtype=bool)
+        
+        idx, found = self._lookup_rows(current_dates)
+        n = len(idx)
+        sell = np.asarray(action) == "SELL"
+        
+        if sl_points is not None:
+            hit = np.empty(n, dtype=bool)
+            sl_hit(self._low[idx], self._high[idx],
+                   np.full(n, entry, dtype=np.float64),
+                   np.full(n, sl_points, dtype=np.float64),
+                   np.full(n, sell, dtype=bool), hit)
+        else:
+            pct = np.asarray(sl_percent, dtype=np.float64)
+            sl_price = np.where(sell, entry * (1 - pct / 100), entry * (1 + pct / 100))
+            hit = np.where(sell, self._low[idx] <= sl_price, self._high[idx] >= sl_price)
+        return hit & found
+    
+    def calculate_underlying_target_hit_batch(self, current_dates: Sequence[str],
+                                              entry_underlyings: np.ndarray,
+                                              target_points: Union[float, np.ndarray, None] = None,
+                                              target_percent: Union[float, np.ndarray, None] = None,
+                                              action: Union[str, np.ndarray] = "SELL") -> np.ndarray:
+        """
+        Vectorized calculate_underlying_target_hit over many dates
+        
+        Args:
+            current_dates: Dates to check ('YYYY-MM-DD')
+            entry_underlyings: Nifty 50 price at entry, per date
+            target_points: Target in absolute points (scalar or per date)
+            target_percent: Target in percentage (scalar or per date)
+            action: "BUY"/"SELL" (target is symmetric, kept for parity)
+        
+        Returns:
+            Boolean array, True where target hit (False for dates without data)
+        """
+        entry = np.asarray(entry_underlyings, dtype=np.float64)
+        if (target_points is None and target_percent is None) or not self._date_to_row:
+            return np.zeros(len(current_dates), dtype=bool)
+        
+        idx, found = self._lookup_rows(current_dates)
+        n = len(idx)
+        
+        if target_points is not None:
+            hit = np.empty(n, dtype=bool)
+            target_hit(self._low[idx], self._high[idx],
+                       np.full(n, entry, dtype=np.float64),
+                       np.full(n, target_points, dtype=np.float64),
+                       hit)
+        else:
+            pct = np.asarray(target_percent, dtype=np.float64)
+            target_up, target_down = entry * (1 + pct / 100), entry * (1 - pct / 100)
+            hit = (self._high[idx] >= target_up) | (self._low[idx] <= target_down)
+        return hit & found
@@ -1,12 +1,23 @@
 # Engine module
-from .leg import Leg, LegState, LegAction, LegConfig
+from .leg import Leg, LegState, LegAction, LegConfig, Candle
 from .strategy import Strategy, StrategyConfig, StrategyMode
-from .backtest import BacktestEngine, BacktestResult, Trade, DayResult
-from .backtest_optimized import OptimizedBacktestEngine
+from .backtest import BacktestResult, Trade, TradeBuffer, DayResult
 
 __all__ = [
-    "Leg", "LegState", "LegAction", "LegConfig",
+    "Leg", "LegState", "LegAction", "LegConfig", "Candle",
     "Strategy", "StrategyConfig", "StrategyMode",
     "BacktestEngine", "OptimizedBacktestEngine",
-    "BacktestResult", "Trade", "DayResult"
+    "BacktestResult", "Trade", "TradeBuffer", "DayResult"
 ]
+
+
+def __getattr__(name):
+    # The optimized engine compiles (or loads) its numba kernels at import,
+    # so load the engines only when first requested
+    if name == "BacktestEngine":
+        from .backtest import BacktestEngine
+        return BacktestEngine
+    if name == "OptimizedBacktestEngine":
+        from .backtest_optimized import OptimizedBacktestEngine
+        return OptimizedBacktestEngine
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
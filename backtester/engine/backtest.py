@@ -2,9 +2,12 @@
 Backtest Execution Engine - Candle-by-candle simulation
 """
 
-from dataclasses import dataclass, field
-from typing import List, Dict, Any, Optional
+from dataclasses import dataclass, field, fields
+from operator import attrgetter
+from typing import List, Dict, Any, Iterator, Optional, Sequence, Tuple
 from datetime import datetime, time
+import uuid
+import numpy as np
 import pandas as pd
 from pathlib import Path
 import sys
@@ -12,11 +15,11 @@ import sys
 sys.path.append(str(Path(__file__).parent.parent))
 
 from data.loader import DataLoader
-from .leg import Leg, LegState, LegConfig, LegAction
+from .leg import Leg, LegState, LegConfig, LegAction, Candle, _time_str
 from .strategy import Strategy, StrategyConfig, StrategyMode
 
 
-@dataclass
+@dataclass(slots=True)
 class Trade:
     """Record of a single trade"""
     date: str
@@ -37,7 +40,114 @@ class Trade:
     net_pnl: float
 
 
-@dataclass
+TRADE_COLUMNS = tuple(f.name for f in fields(Trade))
+FLOAT_TRADE_COLUMNS = frozenset(f.name for f in fields(Trade) if f.type is float)
+NUMERIC_TRADE_COLUMNS = frozenset(f.name for f in fields(Trade) if f.type in (int, float))
+_trade_values = attrgetter(*TRADE_COLUMNS)  # Trade -> tuple of its fields
+
+
+class TradeBuffer:
+    """
+    Trades stored column by column (struct of arrays)
+    
+    Numeric fields go into preallocated NumPy arrays that grow by doubling,
+    string fields into lists. Trade objects are only built when the buffer
+    is iterated or indexed.
+    """
+    
+    def __init__(self, capacity: int = 1024):
+        self._capacity = max(capacity, 1)
+        self._size = 0
+        self._columns: Dict[str, Any] = {}
+    
+    def _allocate(self, trade: Trade):
+        """Create the columns, typed from the first trade"""
+        for name in TRADE_COLUMNS:
+            value = getattr(trade, name)
+            if name in NUMERIC_TRADE_COLUMNS and isinstance(value, float):
+                self._columns[name] = np.empty(self._capacity, dtype=np.float64)
+            elif name in NUMERIC_TRADE_COLUMNS and isinstance(value, (int, np.integer)):
+                self._columns[name] = np.empty(self._capacity, dtype=np.int64)
+            else:
+                self._columns[name] = []
+    
+    def _grow(self, needed: int):
+        """Double the array capacity until `needed` rows fit"""
+        capacity = self._capacity
+        while capacity < needed:
+            capacity *= 2
+        for name, column in self._columns.items():
+            if isinstance(column, np.ndarray):
+                grown = np.empty(capacity, dtype=column.dtype)
+                grown[:self._size] = column[:self._size]
+                self._columns[name] = grown
+        self._capacity = capacity
+    
+    def append(self, trade: Trade):
+        """Add one trade"""
+        self.extend((trade,))
+    
+    def extend(self, trades: Sequence[Trade]):
+        """Add a day's trades, a column at a time"""
+        if not trades:
+            return
+        if not self._columns:
+            self._allocate(trades[0])
+        start = self._size
+        stop = start + len(trades)
+        if stop > self._capacity:
+            self._grow(stop)
+        # Rows of field values, transposed to one tuple per column
+        for (name, column), values in zip(list(self._columns.items()),
+                                          zip(*map(_trade_values, trades))):
+            if isinstance(column, np.ndarray):
+                if column.dtype.kind == "i" and not all(isinstance(v, (int, np.integer))
+                                                        for v in values):
+                    # Mixed int/float field: widen to float64 as pandas would
+                    column = self._columns[name] = column.astype(np.float64)
+                column[start:stop] = values
+            else:
+                column.extend(values)
+        self._size = stop
+    
+    def column(self, name: str):
+        """One field for every trade: an array view for numeric fields, else a list"""
+        column = self._columns.get(name)
+        if column is None:
+            return []
+        if isinstance(column, np.ndarray):
+            return column[:self._size]
+        return column
+    
+    def columns(self) -> Dict[str, Any]:
+        """All fields by name, in Trade field order"""
+        return {name: self.column(name) for name in TRADE_COLUMNS}
+    
+    def _row(self, i: int) -> Trade:
+        return Trade(*(column[i].item() if isinstance(column, np.ndarray) else column[i]
+                       for column in self._columns.values()))
+    
+    def __len__(self) -> int:
+        return self._size
+    
+    def __iter__(self) -> Iterator[Trade]:
+        if not self._size:
+            return iter(())
+        values = [column.tolist() if isinstance(column, np.ndarray) else column
+                  for column in self.columns().values()]
+        return (Trade(*row) for row in zip(*values))
+    
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self._row(i) for i in range(*index.indices(self._size))]
+        if index < 0:
+            index += self._size
+        if not 0 <= index < self._size:
+            raise IndexError("trade index out of range")
+        return self._row(index)
+
+
+@dataclass(slots=True)
 class DayResult:
     """Result for a single trading day"""
     date: str
@@ -48,7 +158,7 @@ class DayResult:
     trades: List[Trade] = field(default_factory=list)
 
 
-@dataclass
+@dataclass(slots=True)
 class BacktestResult:
     """Complete backtest results"""
     # Summary
@@ -58,14 +168,26 @@ class BacktestResult:
     num_trades: int
     num_days: int
     
-    # Detailed results
-    trades: List[Trade] = field(default_factory=list)
+    # Detailed results. trades is a TradeBuffer rather than a list: it
+    # supports len(), iteration and indexing/slicing (yielding Trade objects)
+    # plus column access; call list(result.trades) where a real list is needed
+    trades: TradeBuffer = field(default_factory=TradeBuffer)
     daily_results: List[DayResult] = field(default_factory=list)
-    equity_curve: List[float] = field(default_factory=list)
+    equity_curve: np.ndarray = field(default_factory=lambda: np.empty(0))  # Cumulative net P&L per day
+    
+    # Stable identity for caching derived views of this result
+    result_id: str = field(default_factory=lambda: uuid.uuid4().hex)
     
     def to_trades_df(self) -> pd.DataFrame:
         """Convert trades to DataFrame"""
-        return pd.DataFrame([vars(t) for t in self.trades])
+        if not self.trades:
+            return pd.DataFrame()
+        # Copied so edits to the frame never reach the buffer's arrays
+        return pd.DataFrame(self.trades.columns(), copy=True)
+    
+    def trade_pnl_np(self) -> np.ndarray:
+        """Net P&L of every trade as a contiguous float64 array"""
+        return np.array(self.trades.column("net_pnl"), dtype=np.float64)
     
     def to_daily_df(self) -> pd.DataFrame:
         """Convert daily results to DataFrame"""
@@ -78,6 +200,84 @@ class BacktestResult:
         } for d in self.daily_results])
 
 
+# Bump whenever an engine change alters backtest results; the app keys its
+# disk-persisted results on it
+ENGINE_VERSION = 1
+
+# UTC -> IST (+5:30) in ns; India does not use DST, so the offset is fixed
+IST_OFFSET_NS = 19_800 * 10**9
+
+
+def _datetime_ns(df: pd.DataFrame) -> np.ndarray:
+    """
+    A frame's datetime column as int64 nanoseconds, converted UTC -> IST
+    
+    One int64 add on the converted array, rather than a Timedelta added
+    to the frame's column (a second datetime array per leg per day).
+    """
+    ns = df['datetime'].to_numpy(dtype='datetime64[ns]', copy=True).view('i8')
+    ns += IST_OFFSET_NS
+    return ns
+
+
+def _day_totals(daily_results: List[DayResult]) -> Tuple[float, float, np.ndarray]:
+    """
+    Gross P&L and brokerage totals plus the equity curve, as array reductions
+    
+    Sums are read off np.cumsum, which adds in day order like a running
+    Python total, so they match sum() exactly (np.sum adds pairwise).
+    
+    Returns:
+        (total gross P&L, total brokerage, cumulative net P&L per day)
+    """
+    days_n = len(daily_results)
+    if not days_n:
+        return 0.0, 0.0, np.empty(0)
+    gross = np.fromiter((d.gross_pnl for d in daily_results), dtype=np.float64, count=days_n)
+    brokerage = np.fromiter((d.brokerage for d in daily_results), dtype=np.float64, count=days_n)
+    net = np.fromiter((d.net_pnl for d in daily_results), dtype=np.float64, count=days_n)
+    return float(np.cumsum(gross)[-1]), float(np.cumsum(brokerage)[-1]), np.cumsum(net)
+
+
+def _time_us(t: time) -> int:
+    """Time of day in microseconds since midnight"""
+    return ((t.hour * 60 + t.minute) * 60 + t.second) * 1_000_000 + t.microsecond
+
+
+def _time_of_day_us(timeline: np.ndarray) -> np.ndarray:
+    """
+    Time of day of each int64 ns timestamp as microseconds since midnight
+    
+    Microseconds are what datetime.time compares at, so comparisons with
+    _time_us bounds match Timestamp.time() ones without building time objects.
+    """
+    return (timeline // 1000) % 86_400_000_000
+
+
+def _ohlc_columns(df: pd.DataFrame) -> Tuple[np.ndarray, ...]:
+    """A day's open/high/low/close (and strike_price, if present) as arrays"""
+    strike = df['strike_price'].to_numpy() if 'strike_price' in df.columns else None
+    return (df['open'].to_numpy(), df['high'].to_numpy(),
+            df['low'].to_numpy(), df['close'].to_numpy(), strike)
+
+
+def _candle_at(columns: Tuple[np.ndarray, ...], i: int) -> Candle:
+    """Candle for row i of a leg's column arrays"""
+    o, h, l, c, strike = columns
+    return Candle(o[i], h[i], l[i], c[i], None if strike is None else strike[i])
+
+
+def _merge_timelines(ns_arrays: Sequence[np.ndarray]) -> Tuple[List[int], np.ndarray]:
+    """
+    Sorted union of the legs' int64 ns timestamps, merged in C
+    
+    Returns:
+        (ns values as ints for dict lookups and leg times, the same as an array)
+    """
+    timeline = np.unique(np.concatenate(ns_arrays))
+    return timeline.tolist(), timeline
+
+
 class BacktestEngine:
     """
     Candle-by-candle backtest execution.
@@ -91,9 +291,9 @@ class BacktestEngine:
     
     def __init__(self, loader: DataLoader):
         self.loader = loader
-        self.trades: List[Trade] = []
+        self.trades = TradeBuffer()
         self.daily_results: List[DayResult] = []
-        self.equity_curve: List[float] = []
+        self.equity_curve: np.ndarray = np.empty(0)  # Cumulative net P&L per day
     
     def run(self, strategy: Strategy, 
             start_date: str, end_date: str,
@@ -114,16 +314,15 @@ class BacktestEngine:
         Returns:
             BacktestResult with all results
         """
-        self.trades = []
         self.daily_results = []
-        self.equity_curve = []
-        cumulative_pnl = 0.0
+        self.equity_curve = np.empty(0)
         
         # Get trading days
         expiry_type = strategy.legs[0].config.expiry_type if strategy.legs else "WEEK"
         trading_days = self.loader.get_trading_days(expiry_type, start_date, end_date)
         
         total_days = len(trading_days)
+        self.trades = TradeBuffer(total_days * max(len(strategy.legs), 1))
         print(f"Running backtest from {start_date} to {end_date}")
         print(f"Trading days: {total_days}")
         
@@ -141,8 +340,6 @@ class BacktestEngine:
             if day_result:
                 self.daily_results.append(day_result)
                 self.trades.extend(day_result.trades)
-                cumulative_pnl += day_result.net_pnl
-                self.equity_curve.append(cumulative_pnl)
             
             # Reset strategy for next day based on mode
             if strategy.config.mode == StrategyMode.INTRADAY:
@@ -153,8 +350,7 @@ class BacktestEngine:
                 strategy.reset_daily_flags()
         
         # Calculate totals
-        total_pnl = sum(d.gross_pnl for d in self.daily_results)
-        total_brokerage = sum(d.brokerage for d in self.daily_results)
+        total_pnl, total_brokerage, self.equity_curve = _day_totals(self.daily_results)
         
         return BacktestResult(
             total_pnl=total_pnl,
@@ -171,8 +367,10 @@ class BacktestEngine:
                  slippage_pct: float, brokerage_per_lot: float) -> Optional[DayResult]:
         """Run backtest for a single day"""
         
-        # Load data for all legs
-        leg_data: Dict[int, pd.DataFrame] = {}
+        # Load data for all legs: OHLC column arrays plus an int64 ns ->
+        # row position index for O(1) candle lookups
+        leg_columns: Dict[int, Tuple[np.ndarray, ...]] = {}
+        leg_data: Dict[int, Dict[int, int]] = {}
         for leg in strategy.legs:
             try:
                 df = self.loader.get_day_data(
@@ -182,9 +380,10 @@ class BacktestEngine:
                     date
                 )
                 if not df.empty:
-                    # Convert UTC to IST for simulation
-                    df['datetime'] = df['datetime'] + pd.Timedelta(hours=5, minutes=30)
-                    leg_data[leg.config.leg_id] = df
+                    leg_columns[leg.config.leg_id] = _ohlc_columns(df)
+                    leg_data[leg.config.leg_id] = {
+                        ns: i for i, ns in enumerate(_datetime_ns(df).tolist())
+                    }
             except Exception as e:
                 print(f"Error loading data for leg {leg.config.leg_id} on {date}: {e}")
         
@@ -192,38 +391,45 @@ class BacktestEngine:
             return None
         
         # Get common timestamps across all legs
-        all_times = set()
-        for df in leg_data.values():
-            all_times.update(df['datetime'].tolist())
-        timestamps = sorted(all_times)
+        all_ns, timeline = _merge_timelines(
+            [np.fromiter(dt_idx, dtype=np.int64, count=len(dt_idx)) for dt_idx in leg_data.values()]
+        )
         
-        if not timestamps:
+        if not all_ns:
             return None
         
+        # Entry window / exit time per candle, compared as integers
+        config = strategy.config
+        tod_us = _time_of_day_us(timeline)
+        in_entry_window = ((tod_us >= _time_us(config.get_entry_time())) &
+                           (tod_us <= _time_us(config.get_no_entry_after_time()))).tolist()
+        past_exit_time = (tod_us >= _time_us(config.get_exit_time())).tolist()
+        
         day_trades: List[Trade] = []
         
+        # The mode's per-candle branch, resolved once for the day
+        is_intraday = config.mode == StrategyMode.INTRADAY
+        
         # Process each candle
-        for timestamp in timestamps:
-            current_time = timestamp.time()
-            
+        for ns, entry_open, exit_due in zip(all_ns, in_entry_window, past_exit_time):
             # Get current candles for all legs
-            candle_data: Dict[int, pd.Series] = {}
-            for leg_id, df in leg_data.items():
-                candle = df[df['datetime'] == timestamp]
-                if not candle.empty:
-                    candle_data[leg_id] = candle.iloc[0]
+            candle_data: Dict[int, Candle] = {}
+            for leg_id, dt_idx in leg_data.items():
+                i = dt_idx.get(ns)
+                if i is not None:
+                    candle_data[leg_id] = _candle_at(leg_columns[leg_id], i)
             
             if not candle_data:
                 continue
             
             # 1. Check entry
-            if strategy.should_enter(current_time) and not strategy.entered_today:
-                strategy.enter_all_legs(candle_data, timestamp, slippage_pct)
+            if entry_open and strategy.is_active and not strategy.entered_today:
+                strategy.enter_all_legs(candle_data, ns, slippage_pct)
             
             # 2. Skip if no active positions
             # For BTST/Positional, we may have active legs from previous day
-            has_active_positions = strategy.get_active_legs()
-            if strategy.config.mode == StrategyMode.INTRADAY:
+            has_active_positions = strategy.has_active_legs()
+            if is_intraday:
                 # Intraday: Need entry today AND active legs
                 if not strategy.entered_today or not has_active_positions:
                     continue
@@ -233,37 +439,33 @@ class BacktestEngine:
                     continue
             
             # 3. Check strategy-level exits (highest priority)
-            if strategy.check_strategy_sl():
-                strategy.exit_all_legs(candle_data, timestamp, "STRATEGY_SL", slippage_pct)
-                day_trades.extend(self._create_trades(strategy.legs, date, brokerage_per_lot))
-                break
-            
-            if strategy.check_strategy_target():
-                strategy.exit_all_legs(candle_data, timestamp, "STRATEGY_TARGET", slippage_pct)
-                day_trades.extend(self._create_trades(strategy.legs, date, brokerage_per_lot))
+            strategy_exit = strategy.check_strategy_exit()
+            if strategy_exit:
+                strategy.exit_all_legs(candle_data, ns, strategy_exit, slippage_pct)
+                day_trades.extend(self._iter_trades(strategy.legs, date, brokerage_per_lot))
                 break
             
             # 4. Check time-based exit
-            if strategy.should_exit_time(current_time):
-                strategy.exit_all_legs(candle_data, timestamp, "TIME_EXIT", slippage_pct)
-                day_trades.extend(self._create_trades(strategy.legs, date, brokerage_per_lot))
+            if exit_due and strategy.uses_time_exit():
+                strategy.exit_all_legs(candle_data, ns, "TIME_EXIT", slippage_pct)
+                day_trades.extend(self._iter_trades(strategy.legs, date, brokerage_per_lot))
                 break
             
             # 5. Update legs and check individual exits
-            exits = strategy.update_legs(candle_data, timestamp, slippage_pct)
+            exits = strategy.update_legs(candle_data, ns, slippage_pct)
             
             # If all legs exited, we're done for the day (for intraday)
-            if not strategy.get_active_legs() and strategy.config.mode == StrategyMode.INTRADAY:
-                day_trades.extend(self._create_trades(strategy.legs, date, brokerage_per_lot))
+            if not strategy.has_active_legs() and is_intraday:
+                day_trades.extend(self._iter_trades(strategy.legs, date, brokerage_per_lot))
                 break
         
         # Force exit any remaining positions at end of day (for intraday)
-        if strategy.get_active_legs() and strategy.config.mode == StrategyMode.INTRADAY:
-            last_timestamp = timestamps[-1]
-            last_candles = {leg_id: leg_data[leg_id].iloc[-1] 
-                          for leg_id in leg_data if not leg_data[leg_id].empty}
-            strategy.exit_all_legs(last_candles, last_timestamp, "EOD_EXIT", slippage_pct)
-            day_trades.extend(self._create_trades(strategy.legs, date, brokerage_per_lot))
+        if strategy.has_active_legs() and is_intraday:
+            # Each leg's own last candle
+            last_candles = {leg_id: _candle_at(columns, len(columns[3]) - 1)
+                            for leg_id, columns in leg_columns.items()}
+            strategy.exit_all_legs(last_candles, all_ns[-1], "EOD_EXIT", slippage_pct)
+            day_trades.extend(self._iter_trades(strategy.legs, date, brokerage_per_lot))
         
         if not day_trades:
             return None
@@ -280,26 +482,32 @@ class BacktestEngine:
             trades=day_trades
         )
     
-    def _create_trades(self, legs: List[Leg], date: str, 
-                       brokerage_per_lot: float) -> List[Trade]:
-        """Create trade records from exited legs"""
-        trades = []
-        
+    def _iter_trades(self, legs: List[Leg], date: str, 
+                     brokerage_per_lot: float) -> Iterator[Trade]:
+        """Yield trade records for exited legs"""
         for leg in legs:
             if leg.state == LegState.EXITED and leg.exit_time:
                 # Brokerage for entry + exit
                 brokerage = brokerage_per_lot * leg.config.lots * 2
                 
-                trade = Trade(
+                # Generate instrument name with actual strike price (e.g., "NIFTY 13000 CE")
+                # Falls back to ATM notation if actual strike not captured
+                if leg.actual_strike_price:
+                    instrument = f"NIFTY {leg.actual_strike_price} {leg.config.option_type}"
+                else:
+                    instrument = f"NIFTY {leg.config.strike} {leg.config.option_type}"
+                
+                yield Trade(
                     date=date,
                     leg_id=leg.config.leg_id,
+                    instrument=instrument,
                     strike=leg.config.strike,
                     option_type=leg.config.option_type,
-                    action=leg.config.action.value,
+                    action=leg.config.action.name,
                     lots=leg.config.lots,
-                    entry_time=str(leg.entry_time),
+                    entry_time=_time_str(leg.entry_time),
                     entry_price=leg.entry_price,
-                    exit_time=str(leg.exit_time),
+                    exit_time=_time_str(leg.exit_time),
                     exit_price=leg.exit_price,
                     exit_reason=leg.exit_reason,
                     pnl_points=leg.get_realized_pnl_points(),
@@ -307,6 +515,3 @@ class BacktestEngine:
                     brokerage=brokerage,
                     net_pnl=leg.get_realized_pnl() - brokerage
                 )
-                trades.append(trade)
-        
-        return trades
@@ -2,18 +2,22 @@
 Optimized Backtest Engine - Performance-optimized simulation
 
 Key optimizations:
-1. Pre-indexed DataFrames for O(1) timestamp lookups
-2. Avoid repeated DataFrame filtering 
+1. Legs merged onto one sorted int64 ns timeline, rows found by binary search
+2. Each instrument-day read once per run; the next day loads while one simulates
 3. Reduced data copying
-4. NumPy arrays for OHLC access
+4. NumPy arrays for OHLC access (per-leg column arrays, candles as tuples)
+5. Long INTRADAY runs sharded by day across worker processes
+6. Candle loop compiled with numba (engine/kernels.py), all legs per candle in one pass
+7. Day data read as NumPy array views (DataLoader.get_day_arrays), no per-day DataFrames
 
 Maintains exact same logic as original engine for correctness.
 """
 
-from dataclasses import dataclass, field
-from typing import List, Dict, Any, Optional, Tuple
-from datetime import datetime, time
-import pandas as pd
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from functools import lru_cache
+from typing import List, Dict, Iterator, NamedTuple, Optional, Tuple
+import multiprocessing
+import os
 import numpy as np
 from pathlib import Path
 import sys
@@ -21,9 +25,120 @@ import sys
 sys.path.append(str(Path(__file__).parent.parent))
 
 from data.loader import DataLoader
-from .leg import Leg, LegState, LegConfig, LegAction
-from .strategy import Strategy, StrategyConfig, StrategyMode
-from .backtest import Trade, DayResult, BacktestResult
+from .leg import Leg, LegState, LegConfig, LegAction, Candle, _time_str
+from .strategy import Strategy, StrategyMode
+from .backtest import (Trade, TradeBuffer, DayResult, BacktestResult, IST_OFFSET_NS,
+                       _merge_timelines, _candle_at, _day_totals,
+                       _time_us, _time_of_day_us)
+# Compiles (or loads) the kernels at import, so nothing on the app's import
+# path may import this module; engine/__init__.py exports the engine lazily
+from . import kernels
+
+
+# Fewest trading days worth a worker process: each worker spawns, imports
+# the engine and reads its days' parquet files cold
+MIN_DAYS_PER_WORKER = 250
+
+# Per-process loader, so a worker reuses its parquet cache across shards
+_worker_loader: Optional[DataLoader] = None
+
+
+def _run_days_worker(data_dir: Path, strategy: Strategy, days: List[str],
+                     slippage_pct: float, brokerage_per_lot: float) -> List[DayResult]:
+    """
+    Run a shard of INTRADAY days in a worker process (top-level for pickling)
+
+    Returns:
+        DayResults for the shard's days that traded, in date order
+    """
+    global _worker_loader
+    if _worker_loader is None or _worker_loader.data_dir != data_dir:
+        _worker_loader = DataLoader(data_dir=data_dir)
+
+    engine = OptimizedBacktestEngine(_worker_loader)
+    return list(engine._run_days_serial(strategy, days, slippage_pct, brokerage_per_lot))
+
+
+def _leg_grid(legs: List[Leg], leg_ns: Dict[int, np.ndarray],
+              leg_columns: Dict[int, Tuple[np.ndarray, ...]], timeline: np.ndarray
+              ) -> Tuple[np.ndarray, ...]:
+    """
+    Lay each leg's candles out on the day's timeline, one row per leg
+    
+    Returns:
+        (high, low, close, has, rows): (legs x timeline) grids; has marks
+        where a leg has a candle, rows its row in the leg's day arrays
+    """
+    legs_n, times_n = len(legs), len(timeline)
+    high = np.zeros((legs_n, times_n))
+    low = np.zeros((legs_n, times_n))
+    close = np.zeros((legs_n, times_n))
+    has = np.zeros((legs_n, times_n), dtype=np.bool_)
+    rows = np.full((legs_n, times_n), -1, dtype=np.int64)
+    for k, leg in enumerate(legs):
+        leg_id = leg.config.leg_id
+        if leg_id not in leg_ns:
+            continue
+        pos = np.searchsorted(timeline, leg_ns[leg_id])
+        _, h, l, c, _ = leg_columns[leg_id]
+        high[k, pos] = h
+        low[k, pos] = l
+        close[k, pos] = c
+        has[k, pos] = True
+        rows[k, pos] = np.arange(len(pos))
+    return high, low, close, has, rows
+
+
+class _RunParams(NamedTuple):
+    """Strategy timings, limits and per-leg kernel inputs, fixed for a run"""
+    entry_us: int
+    no_entry_us: int
+    exit_us: int
+    max_loss: float           # NaN if not set
+    max_profit: float         # NaN if not set
+    is_buy: np.ndarray
+    lots: np.ndarray
+    lot_size: np.ndarray
+    sl_kind: np.ndarray
+    sl_value: np.ndarray
+    target_kind: np.ndarray
+    target_value: np.ndarray
+    trail: np.ndarray
+    trail_activate: np.ndarray
+    trail_lock: np.ndarray
+
+
+def _run_params(strategy: Strategy) -> _RunParams:
+    """Build a strategy's _RunParams (read-only arrays, one entry per leg)"""
+    config = strategy.config
+    leg_configs = [leg.config for leg in strategy.legs]
+    return _RunParams(
+        entry_us=_time_us(config.get_entry_time()),
+        no_entry_us=_time_us(config.get_no_entry_after_time()),
+        exit_us=_time_us(config.get_exit_time()),
+        max_loss=np.nan if config.max_loss is None else float(config.max_loss),
+        max_profit=np.nan if config.max_profit is None else float(config.max_profit),
+        is_buy=np.array([c.action == LegAction.BUY for c in leg_configs], dtype=np.bool_),
+        lots=np.array([c.lots for c in leg_configs], dtype=np.float64),
+        lot_size=np.array([leg.lot_size for leg in strategy.legs], dtype=np.float64),
+        sl_kind=np.array([kernels.POINTS if c.sl_points is not None
+                          else kernels.PERCENT if c.sl_percent is not None
+                          else kernels.NONE for c in leg_configs], dtype=np.int64),
+        sl_value=np.array([c.sl_points if c.sl_points is not None
+                           else c.sl_percent if c.sl_percent is not None
+                           else 0.0 for c in leg_configs], dtype=np.float64),
+        target_kind=np.array([kernels.POINTS if c.target_points is not None
+                              else kernels.PERCENT if c.target_percent is not None
+                              else kernels.NONE for c in leg_configs], dtype=np.int64),
+        target_value=np.array([c.target_points if c.target_points is not None
+                               else c.target_percent if c.target_percent is not None
+                               else 0.0 for c in leg_configs], dtype=np.float64),
+        trail=np.array([bool(c.trailing_sl and c.trail_activate_points and c.trail_lock_points)
+                        for c in leg_configs], dtype=np.bool_),
+        trail_activate=np.array([c.trail_activate_points or 0.0 for c in leg_configs],
+                                dtype=np.float64),
+        trail_lock=np.array([c.trail_lock_points or 0.0 for c in leg_configs], dtype=np.float64)
+    )
 
 
 class OptimizedBacktestEngine:
@@ -31,24 +146,30 @@ class OptimizedBacktestEngine:
     Performance-optimized backtest execution.
     
     Key optimizations:
-    1. Pre-indexed DataFrames for O(1) timestamp lookups
-    2. Avoid repeated DataFrame filtering
-    3. Batch data loading per day
+    1. Day data as NumPy array views, the legs aligned on one merged timeline
+    2. Instrument-days cached per run, the next day prefetched on a thread
+    3. Candle loop in numba kernels where the strategy allows, Python otherwise
     
     Maintains exact same logic as original engine.
     """
     
     def __init__(self, loader: DataLoader):
         self.loader = loader
-        self.trades: List[Trade] = []
+        self.trades = TradeBuffer()
         self.daily_results: List[DayResult] = []
-        self.equity_curve: List[float] = []
+        self.equity_curve: np.ndarray = np.empty(0)  # Cumulative net P&L per day
+        # One instrument-day's arrays, shared by every leg on that instrument
+        # within a run (cleared when the run ends)
+        self._instrument_day = lru_cache(maxsize=1024)(self._read_instrument_day)
+        # _RunParams per strategy setup within a run (cleared when the run ends)
+        self._params: Dict[Tuple, _RunParams] = {}
     
     def run(self, strategy: Strategy, 
             start_date: str, end_date: str,
             slippage_pct: float = 0.05,
             brokerage_per_lot: float = 20,
-            progress_callback=None) -> BacktestResult:
+            progress_callback=None,
+            max_workers: Optional[int] = 1) -> BacktestResult:
         """
         Run optimized backtest
         
@@ -59,47 +180,49 @@ class OptimizedBacktestEngine:
             slippage_pct: Slippage percentage
             brokerage_per_lot: Brokerage per lot (one-way)
             progress_callback: Optional callback(day_idx, total_days, date)
+            max_workers: Worker processes for INTRADAY runs (None: CPU count),
+                capped at one per MIN_DAYS_PER_WORKER days; 1 runs serially
         
         Returns:
             BacktestResult with all results
         """
-        self.trades = []
         self.daily_results = []
-        self.equity_curve = []
-        cumulative_pnl = 0.0
+        self.equity_curve = np.empty(0)
         
         # Get trading days
         expiry_type = strategy.legs[0].config.expiry_type if strategy.legs else "WEEK"
         trading_days = self.loader.get_trading_days(expiry_type, start_date, end_date)
         
         total_days = len(trading_days)
+        self.trades = TradeBuffer(total_days * max(len(strategy.legs), 1))
         
-        for day_idx, date in enumerate(trading_days):
-            # Call progress callback if provided
-            if progress_callback:
-                progress_callback(day_idx, total_days, date)
-            
-            day_result = self._run_day_optimized(
-                strategy, date, slippage_pct, brokerage_per_lot
+        # INTRADAY days are independent (full reset between days), so they can
+        # be sharded across processes; BTST/Positional carry legs over
+        workers = 1
+        if strategy.config.mode == StrategyMode.INTRADAY:
+            workers = min(max_workers or os.cpu_count() or 1,
+                          total_days // MIN_DAYS_PER_WORKER)
+        
+        if workers > 1:
+            day_results = self._run_days_parallel(
+                strategy, trading_days, workers, slippage_pct,
+                brokerage_per_lot, progress_callback
             )
-            
-            if day_result:
-                self.daily_results.append(day_result)
-                self.trades.extend(day_result.trades)
-                cumulative_pnl += day_result.net_pnl
-                self.equity_curve.append(cumulative_pnl)
-            
-            # Reset strategy for next day based on mode
-            if strategy.config.mode == StrategyMode.INTRADAY:
-                # Intraday: Full reset - new legs each day
-                strategy.reset_for_new_day()
-            else:
-                # BTST/Positional: Keep active legs, only reset daily flags
-                strategy.reset_daily_flags()
+        else:
+            day_results = self._run_days_serial(
+                strategy, trading_days, slippage_pct,
+                brokerage_per_lot, progress_callback
+            )
+        
+        for day_result in day_results:
+            self.daily_results.append(day_result)
+            self.trades.extend(day_result.trades)
+        
+        self._instrument_day.cache_clear()
+        self._params.clear()
         
         # Calculate totals
-        total_pnl = sum(d.gross_pnl for d in self.daily_results)
-        total_brokerage = sum(d.brokerage for d in self.daily_results)
+        total_pnl, total_brokerage, self.equity_curve = _day_totals(self.daily_results)
         
         return BacktestResult(
             total_pnl=total_pnl,
@@ -112,83 +235,215 @@ class OptimizedBacktestEngine:
             equity_curve=self.equity_curve
         )
     
-    def _run_day_optimized(self, strategy: Strategy, date: str,
-                           slippage_pct: float, brokerage_per_lot: float) -> Optional[DayResult]:
-        """Run optimized backtest for a single day"""
-        
-        # Load data for all legs with datetime indexing for O(1) lookups
-        leg_data: Dict[int, pd.DataFrame] = {}
-        leg_datetime_idx: Dict[int, Dict] = {}  # Maps datetime -> row data as dict
-        
-        for leg in strategy.legs:
-            try:
-                df = self.loader.get_day_data(
-                    leg.config.strike,
-                    leg.config.option_type,
-                    leg.config.expiry_type,
-                    date
+    def _run_days_serial(self, strategy: Strategy, trading_days: List[str],
+                         slippage_pct: float, brokerage_per_lot: float,
+                         progress_callback=None):
+        """
+        Run days in order in this process, yielding each DayResult
+        
+        The next day's data is loaded on a background thread while the
+        current day simulates (the legs' configs are fixed across days).
+        """
+        total_days = len(trading_days)
+        if not total_days:
+            return
+        leg_configs = [leg.config for leg in strategy.legs]
+        
+        with ThreadPoolExecutor(max_workers=1) as prefetch:
+            next_day = prefetch.submit(self._load_day, leg_configs, trading_days[0])
+            for day_idx, date in enumerate(trading_days):
+                # Call progress callback if provided
+                if progress_callback:
+                    progress_callback(day_idx, total_days, date)
+                
+                day_data = next_day.result()
+                if day_idx + 1 < total_days:
+                    next_day = prefetch.submit(self._load_day, leg_configs, trading_days[day_idx + 1])
+                
+                day_result = self._run_day_optimized(
+                    strategy, date, slippage_pct, brokerage_per_lot, day_data
                 )
-                if not df.empty:
-                    # Convert UTC to IST for simulation
-                    # India does not use DST, so fixed +5:30 offset is correct year-round
-                    df['datetime'] = df['datetime'] + pd.Timedelta(hours=5, minutes=30)
-                    
-                    leg_data[leg.config.leg_id] = df
-                    # Build datetime -> row dict using vectorized operations (faster than iterrows)
-                    # Use zip with datetime column and records for O(1) lookup
-                    datetimes = df['datetime'].tolist()
-                    records = df.to_dict('records')
-                    leg_datetime_idx[leg.config.leg_id] = dict(zip(datetimes, records))
-            except Exception as e:
-                pass
-        
-        if not leg_data:
+                
+                if day_result:
+                    yield day_result
+                
+                # Reset strategy for next day based on mode
+                if strategy.config.mode == StrategyMode.INTRADAY:
+                    # Intraday: Full reset - new legs each day
+                    strategy.reset_for_new_day()
+                else:
+                    # BTST/Positional: Keep active legs, only reset daily flags
+                    strategy.reset_daily_flags()
+    
+    def _run_days_parallel(self, strategy: Strategy, trading_days: List[str],
+                           workers: int, slippage_pct: float,
+                           brokerage_per_lot: float,
+                           progress_callback=None) -> List[DayResult]:
+        """
+        Run INTRADAY days in contiguous shards, one per worker process
+        
+        Returns:
+            DayResults in date order
+        """
+        n = len(trading_days)
+        shards = [trading_days[i * n // workers:(i + 1) * n // workers] for i in range(workers)]
+        shard_results: List[List[DayResult]] = [[] for _ in shards]
+        days_done = 0
+        # Spawn workers: callers (e.g. the Streamlit server) may be multi-threaded
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context("spawn")
+        ) as executor:
+            futures = {
+                executor.submit(_run_days_worker, self.loader.data_dir, strategy,
+                                shard, slippage_pct, brokerage_per_lot): idx
+                for idx, shard in enumerate(shards)
+            }
+            for future in as_completed(futures):
+                idx = futures[future]
+                shard_results[idx] = future.result()
+                days_done += len(shards[idx])
+                if progress_callback:
+                    progress_callback(days_done - 1, len(trading_days), shards[idx][-1])
+        
+        strategy.reset_for_new_day()
+        return [day_result for results in shard_results for day_result in results]
+    
+    def _load_day(self, leg_configs: List[LegConfig], date: str) -> Tuple[
+            Dict[int, np.ndarray], Dict[int, Tuple[np.ndarray, ...]]]:
+        """
+        Load each leg's candles for a day (no strategy state touched)
+        
+        Returns:
+            (leg_id -> sorted int64 ns timestamps, leg_id -> OHLC column arrays)
+        """
+        leg_ns: Dict[int, np.ndarray] = {}
+        leg_columns: Dict[int, Tuple[np.ndarray, ...]] = {}
+        
+        for config in leg_configs:
+            day = self._instrument_day(config.strike, config.option_type,
+                                       config.expiry_type, date)
+            if day is not None:
+                leg_ns[config.leg_id], leg_columns[config.leg_id] = day
+        
+        return leg_ns, leg_columns
+    
+    def _read_instrument_day(self, strike: str, option_type: str, expiry_type: str,
+                             date: str) -> Optional[Tuple[np.ndarray, Tuple[np.ndarray, ...]]]:
+        """
+        One instrument's candles for a day (read-only, may be shared by legs)
+        
+        Returns:
+            (sorted int64 ns timestamps, OHLC column arrays), or None if the
+            instrument has no data file or no candles that day
+        """
+        try:
+            ns, *columns = self.loader.get_day_arrays(strike, option_type, expiry_type, date)
+        except FileNotFoundError:
+            return None
+        if len(ns):
+            return ns + IST_OFFSET_NS, tuple(columns)
+        return None
+    
+    def _run_day_optimized(self, strategy: Strategy, date: str,
+                           slippage_pct: float, brokerage_per_lot: float,
+                           day_data=None) -> Optional[DayResult]:
+        """
+        Run optimized backtest for a single day
+        
+        Args:
+            day_data: The day's _load_day result, if already loaded
+        """
+        # Load data for all legs: OHLC as column arrays (SoA)
+        if day_data is None:
+            day_data = self._load_day([leg.config for leg in strategy.legs], date)
+        leg_ns, leg_columns = day_data
+        
+        if not leg_ns:
             return None
         
         # Get common timestamps across all legs
-        all_times = set()
-        for df in leg_data.values():
-            all_times.update(df['datetime'].tolist())
-        timestamps = sorted(all_times)
+        all_ns, timeline = _merge_timelines(list(leg_ns.values()))
         
-        if not timestamps:
+        if not all_ns:
             return None
         
+        tod_us = _time_of_day_us(timeline)
+        
+        if self._kernel_eligible(strategy, leg_columns):
+            day_trades = self._simulate_intraday(
+                strategy, date, leg_ns, leg_columns, timeline, tod_us,
+                slippage_pct, brokerage_per_lot
+            )
+            return self._day_result(date, day_trades)
+        
+        # datetime -> row position index for O(1) lookups
+        leg_datetime_idx: Dict[int, Dict[int, int]] = {
+            leg_id: {ns: i for i, ns in enumerate(ns_arr.tolist())}
+            for leg_id, ns_arr in leg_ns.items()
+        }
+        
+        # Entry window / exit time gates for the whole day at once, in place
+        # of Strategy.should_enter / should_exit_time per candle
+        params = self._run_params(strategy)
+        entry_window = (tod_us >= params.entry_us) & (tod_us <= params.no_entry_us)
+        exit_window = tod_us >= params.exit_us
+        
+        if self._scan_eligible(strategy, leg_columns):
+            day_trades = self._scan_day(
+                strategy, date, leg_ns, leg_columns, timeline,
+                entry_window, exit_window, slippage_pct, brokerage_per_lot
+            )
+            return self._day_result(date, day_trades)
+        
+        if self._carry_eligible(strategy, leg_columns):
+            day_trades = self._simulate_carry(
+                strategy, date, leg_ns, leg_columns, timeline, tod_us,
+                slippage_pct, brokerage_per_lot
+            )
+            return self._day_result(date, day_trades)
+        
+        in_entry_window = entry_window.tolist()
+        past_exit_time = exit_window.tolist()
+        
         day_trades: List[Trade] = []
         
+        # The mode's per-candle branches, resolved once for the day
+        is_intraday = strategy.config.mode == StrategyMode.INTRADAY
+        is_btst = strategy.config.mode == StrategyMode.BTST
+        
         # Process each candle - same logic as original but with optimized lookups
-        for timestamp in timestamps:
-            current_time = timestamp.time()
-            
+        for ns, entry_open, exit_due in zip(all_ns, in_entry_window, past_exit_time):
             # Get current candles for all legs using pre-built dict (O(1) lookup)
-            candle_data: Dict[int, pd.Series] = {}
+            candle_data: Dict[int, Candle] = {}
             for leg_id, dt_idx in leg_datetime_idx.items():
-                if timestamp in dt_idx:
-                    candle_data[leg_id] = dt_idx[timestamp]
+                i = dt_idx.get(ns)
+                if i is not None:
+                    candle_data[leg_id] = _candle_at(leg_columns[leg_id], i)
             
             if not candle_data:
                 continue
             
             # 1. Check entry for today's NEW position
-            if strategy.should_enter(current_time) and not strategy.entered_today:
-                strategy.enter_all_legs(candle_data, timestamp, slippage_pct)
+            if entry_open and strategy.is_active and not strategy.entered_today:
+                strategy.enter_all_legs(candle_data, ns, slippage_pct)
             
             # 2. For BTST: Check exit for YESTERDAY's position (pending_exit_legs)
-            if strategy.config.mode == StrategyMode.BTST and strategy.has_pending_exit():
-                if strategy.should_exit_time(current_time):
-                    strategy.exit_pending_legs(candle_data, timestamp, "TIME_EXIT", slippage_pct)
-                    day_trades.extend(self._create_trades(strategy.get_pending_exit_legs(), date, brokerage_per_lot))
+            if is_btst and strategy.has_pending_exit():
+                if exit_due:
+                    strategy.exit_pending_legs(candle_data, ns, "TIME_EXIT", slippage_pct)
+                    day_trades.extend(self._iter_trades(strategy.get_pending_exit_legs(), date, brokerage_per_lot))
                     strategy.clear_pending_exit()
             
             # 3. Skip if no active positions AND no pending exits
-            has_active_positions = strategy.get_active_legs()
+            has_active_positions = strategy.has_active_legs()
             has_pending = strategy.has_pending_exit()
             
-            if strategy.config.mode == StrategyMode.INTRADAY:
+            if is_intraday:
                 # Intraday: Need entry today AND active legs
                 if not strategy.entered_today or not has_active_positions:
                     continue
-            elif strategy.config.mode == StrategyMode.BTST:
+            elif is_btst:
                 # BTST: Need active legs OR pending exit legs
                 if not has_active_positions and not has_pending and not strategy.entered_today:
                     continue
@@ -199,45 +454,43 @@ class OptimizedBacktestEngine:
             
             # 4. Check strategy-level exits (for today's active legs only)
             if has_active_positions:
-                if strategy.check_strategy_sl():
-                    strategy.exit_all_legs(candle_data, timestamp, "STRATEGY_SL", slippage_pct)
-                    day_trades.extend(self._create_trades(strategy.legs, date, brokerage_per_lot))
-                    if strategy.config.mode == StrategyMode.INTRADAY:
-                        break
-                    continue
-                
-                if strategy.check_strategy_target():
-                    strategy.exit_all_legs(candle_data, timestamp, "STRATEGY_TARGET", slippage_pct)
-                    day_trades.extend(self._create_trades(strategy.legs, date, brokerage_per_lot))
-                    if strategy.config.mode == StrategyMode.INTRADAY:
+                strategy_exit = strategy.check_strategy_exit()
+                if strategy_exit:
+                    strategy.exit_all_legs(candle_data, ns, strategy_exit, slippage_pct)
+                    day_trades.extend(self._iter_trades(strategy.legs, date, brokerage_per_lot))
+                    if is_intraday:
                         break
                     continue
                 
                 # 5. Check time-based exit (for Intraday only - BTST exits pending legs above)
-                if strategy.config.mode == StrategyMode.INTRADAY and strategy.should_exit_time(current_time):
-                    strategy.exit_all_legs(candle_data, timestamp, "TIME_EXIT", slippage_pct)
-                    day_trades.extend(self._create_trades(strategy.legs, date, brokerage_per_lot))
+                if is_intraday and exit_due:
+                    strategy.exit_all_legs(candle_data, ns, "TIME_EXIT", slippage_pct)
+                    day_trades.extend(self._iter_trades(strategy.legs, date, brokerage_per_lot))
                     break
                 
                 # 6. Update legs and check individual exits
-                exits = strategy.update_legs(candle_data, timestamp, slippage_pct)
+                exits = strategy.update_legs(candle_data, ns, slippage_pct)
                 
                 # If all legs exited, we're done for the day (for intraday)
-                if not strategy.get_active_legs() and strategy.config.mode == StrategyMode.INTRADAY:
-                    day_trades.extend(self._create_trades(strategy.legs, date, brokerage_per_lot))
+                if not strategy.has_active_legs() and is_intraday:
+                    day_trades.extend(self._iter_trades(strategy.legs, date, brokerage_per_lot))
                     break
         
         # Force exit any remaining positions at end of day (for intraday)
-        if strategy.get_active_legs() and strategy.config.mode == StrategyMode.INTRADAY:
-            last_timestamp = timestamps[-1]
+        if strategy.has_active_legs() and is_intraday:
             last_candles = {}
             for leg_id, dt_idx in leg_datetime_idx.items():
-                if last_timestamp in dt_idx:
-                    last_candles[leg_id] = dt_idx[last_timestamp]
+                i = dt_idx.get(all_ns[-1])
+                if i is not None:
+                    last_candles[leg_id] = _candle_at(leg_columns[leg_id], i)
             if last_candles:
-                strategy.exit_all_legs(last_candles, last_timestamp, "EOD_EXIT", slippage_pct)
-                day_trades.extend(self._create_trades(strategy.legs, date, brokerage_per_lot))
+                strategy.exit_all_legs(last_candles, all_ns[-1], "EOD_EXIT", slippage_pct)
+                day_trades.extend(self._iter_trades(strategy.legs, date, brokerage_per_lot))
         
+        return self._day_result(date, day_trades)
+    
+    def _day_result(self, date: str, day_trades: List[Trade]) -> Optional[DayResult]:
+        """Summarize a day's trades (None if it had none)"""
         if not day_trades:
             return None
         
@@ -253,11 +506,337 @@ class OptimizedBacktestEngine:
             trades=day_trades
         )
     
-    def _create_trades(self, legs: List[Leg], date: str, 
-                       brokerage_per_lot: float) -> List[Trade]:
-        """Create trade records from exited legs"""
-        trades = []
+    def _run_params(self, strategy: Strategy) -> _RunParams:
+        """This run's _RunParams for the strategy's config and legs, built once"""
+        key = (id(strategy.config),) + tuple((id(leg.config), leg.lot_size) for leg in strategy.legs)
+        params = self._params.get(key)
+        if params is None:
+            params = self._params[key] = _run_params(strategy)
+        return params
+    
+    @staticmethod
+    def _kernel_eligible(strategy: Strategy, leg_columns: Dict[int, Tuple[np.ndarray, ...]]) -> bool:
+        """
+        Whether a day can run through kernels.simulate_day
+        
+        INTRADAY strategies starting the day with fresh legs and float64
+        prices; BTST/Positional (legs carried across days) use _scan_day or
+        kernels.simulate_carry_day.
+        """
+        if strategy.config.mode != StrategyMode.INTRADAY:
+            return False
+        if any(leg.state != LegState.CREATED for leg in strategy.legs):
+            return False
+        return all(col.dtype == np.float64
+                   for columns in leg_columns.values() for col in columns[1:4])
+    
+    @staticmethod
+    def _scan_eligible(strategy: Strategy, leg_columns: Dict[int, Tuple[np.ndarray, ...]]) -> bool:
+        """
+        Whether a day can run through _scan_day
+        
+        BTST/Positional strategies without strategy-level limits and with
+        float64 prices: no leg's exit then depends on another leg.
+        """
+        if strategy.config.mode == StrategyMode.INTRADAY:
+            return False
+        if strategy.config.max_loss is not None or strategy.config.max_profit is not None:
+            return False
+        return all(col.dtype == np.float64
+                   for columns in leg_columns.values() for col in columns[1:4])
+    
+    @staticmethod
+    def _carry_eligible(strategy: Strategy, leg_columns: Dict[int, Tuple[np.ndarray, ...]]) -> bool:
+        """
+        Whether a day can run through kernels.simulate_carry_day
+        
+        BTST/Positional strategies with float64 prices, whose pending BTST
+        legs (if any) share their configs with the strategy's legs.
+        """
+        if strategy.config.mode == StrategyMode.INTRADAY:
+            return False
+        configs = {id(leg.config) for leg in strategy.legs}
+        if any(id(leg.config) not in configs for leg in strategy.pending_exit_legs):
+            return False
+        return all(col.dtype == np.float64
+                   for columns in leg_columns.values() for col in columns[1:4])
+    
+    def _scan_day(self, strategy: Strategy, date: str,
+                  leg_ns: Dict[int, np.ndarray],
+                  leg_columns: Dict[int, Tuple[np.ndarray, ...]],
+                  timeline: np.ndarray, entry_window: np.ndarray, exit_window: np.ndarray,
+                  slippage_pct: float, brokerage_per_lot: float) -> List[Trade]:
+        """
+        Run a BTST/Positional day event by event instead of candle by candle
+        
+        With the conditions of _scan_eligible, only the entry, the BTST exit
+        of yesterday's legs and each leg's own SL/target hit change any
+        state, so those candles are found with array searches and sent
+        through the same Strategy calls as the loop. Hits are found by
+        Leg.scan_exit, or by kernels.scan_leg for trailing-SL legs.
+        
+        Returns:
+            The day's trades
+        """
+        def candles_at(t: int) -> Tuple[int, Dict[int, Candle]]:
+            ns = int(timeline[t])
+            candle_data: Dict[int, Candle] = {}
+            for leg_id, ns_arr in leg_ns.items():
+                i = ns_arr.searchsorted(ns)
+                if i < len(ns_arr) and ns_arr[i] == ns:
+                    candle_data[leg_id] = _candle_at(leg_columns[leg_id], i)
+            return ns, candle_data
+        
+        # Legs active at the open are updated from their first candle
+        scans = [(leg, 0) for leg in strategy.get_active_legs()]
+        
+        # 1. Entry on the first in-window candle any CREATED leg has
+        if strategy.is_active and not strategy.entered_today:
+            firsts = []
+            for leg in strategy.legs:
+                if leg.state == LegState.CREATED and leg.config.leg_id in leg_ns:
+                    pos = timeline.searchsorted(leg_ns[leg.config.leg_id])
+                    firsts.extend(pos[entry_window[pos]][:1].tolist())
+            if firsts:
+                ns, candle_data = candles_at(min(firsts))
+                strategy.enter_all_legs(candle_data, ns, slippage_pct)
+                scans.extend((leg, int(leg_ns[leg.config.leg_id].searchsorted(ns)))
+                             for leg in strategy.get_active_legs()
+                             if leg.entry_time == ns and not any(leg is s for s, _ in scans))
+        
+        day_trades: List[Trade] = []
+        
+        # 2. BTST: yesterday's legs exit on the first candle past exit time
+        if (strategy.config.mode == StrategyMode.BTST and strategy.has_pending_exit()
+                and exit_window.any()):
+            ns, candle_data = candles_at(int(exit_window.argmax()))
+            strategy.exit_pending_legs(candle_data, ns, "TIME_EXIT", slippage_pct)
+            day_trades.extend(self._iter_trades(strategy.get_pending_exit_legs(), date, brokerage_per_lot))
+            strategy.clear_pending_exit()
+        
+        # 3. Each active leg runs to its SL/target hit, else to its last candle
+        for leg, start in scans:
+            leg_id = leg.config.leg_id
+            if leg_id not in leg_ns:
+                continue
+            columns = leg_columns[leg_id]
+            _, high, low, close, _ = columns
+            config = leg.config
+            # Without an SL/target, the leg's infinities never hit here either
+            if leg._trails:
+                i, has_sl, current_sl, peak_profit = kernels.scan_leg(
+                    high[start:], low[start:], close[start:], leg._is_buy,
+                    float(leg.entry_price), leg.has_sl(), float(leg.current_sl),
+                    float(leg.target_price), True,
+                    float(config.trail_activate_points), float(config.trail_lock_points),
+                    float(leg.peak_profit)
+                )
+                leg.current_sl = leg._sl_price(current_sl if has_sl else None)
+                leg.peak_profit = peak_profit
+            else:
+                i, _ = Leg.scan_exit(high[start:], low[start:], leg.current_sl,
+                                     leg.target_price, config.action)
+            if i < 0:
+                leg.current_price = close[-1]
+            else:
+                row = start + i
+                strategy.update_legs({leg_id: _candle_at(columns, row)},
+                                     int(leg_ns[leg_id][row]), slippage_pct)
+        
+        return day_trades
+    
+    def _simulate_intraday(self, strategy: Strategy, date: str,
+                           leg_ns: Dict[int, np.ndarray],
+                           leg_columns: Dict[int, Tuple[np.ndarray, ...]],
+                           timeline: np.ndarray, tod_us: np.ndarray,
+                           slippage_pct: float, brokerage_per_lot: float) -> List[Trade]:
+        """
+        Run an INTRADAY day through the compiled candle loop
+        
+        Lays each leg's candles out on the day's timeline, runs
+        kernels.simulate_day, then writes its entries and exits back to the
+        Leg objects so trades are built exactly as in the Python loop.
+        
+        Returns:
+            The day's trades
+        """
+        params = self._run_params(strategy)
+        can_enter = bool(strategy.is_active and not strategy.entered_today)
+        if not can_enter or not ((tod_us >= params.entry_us) & (tod_us <= params.no_entry_us)).any():
+            # Fresh legs and no candle to enter on: nothing can trade today
+            return []
+        
+        legs = strategy.legs
+        legs_n = len(legs)
+        high, low, close, has, rows = _leg_grid(legs, leg_ns, leg_columns, timeline)
+        
+        state = np.full(legs_n, kernels.CREATED, dtype=np.int64)
+        current_price = np.array([leg.current_price for leg in legs], dtype=np.float64)
+        current_sl = np.zeros(legs_n)
+        has_sl = np.zeros(legs_n, dtype=np.bool_)
+        peak_profit = np.array([leg.peak_profit for leg in legs], dtype=np.float64)
+        entry_price = np.zeros(legs_n)
+        entry_t = np.full(legs_n, -1, dtype=np.int64)
+        exit_t = np.full(legs_n, -1, dtype=np.int64)
+        exit_price = np.zeros(legs_n)
+        exit_code = np.zeros(legs_n, dtype=np.int64)
+        exit_seq = np.full(legs_n, -1, dtype=np.int64)
+        flush_seq = np.full(2, -1, dtype=np.int64)
+        
+        flushes = kernels.simulate_day(
+            high, low, close, has, tod_us,
+            params.entry_us, params.no_entry_us, params.exit_us, can_enter,
+            float(slippage_pct), params.max_loss, params.max_profit,
+            params.is_buy, params.lots, params.lot_size,
+            params.sl_kind, params.sl_value, params.target_kind, params.target_value,
+            params.trail, params.trail_activate, params.trail_lock,
+            state, current_price, current_sl, has_sl, peak_profit, entry_price,
+            entry_t, exit_t, exit_price, exit_code, exit_seq, flush_seq
+        )
+        
+        # Write the kernel's fills back to the legs. Slippage was applied to
+        # every leg in the kernel, so this only assigns (no Leg.enter/exit math)
+        entry_ns = timeline[np.maximum(entry_t, 0)].tolist()
+        exit_ns = timeline[np.maximum(exit_t, 0)].tolist()
+        for k, leg in enumerate(legs):
+            if entry_t[k] < 0:
+                continue
+            strike = leg_columns[leg.config.leg_id][4]
+            leg.actual_strike_price = None if strike is None else int(strike[rows[k, entry_t[k]]])
+            leg.entry_price = entry_price[k]
+            leg.target_price = leg._target_price(leg.config.get_target_price(leg.entry_price))
+            leg.entry_time = entry_ns[k]
+            leg.state = LegState.ACTIVE
+            leg.current_price = current_price[k]
+            leg.current_sl = leg._sl_price(current_sl[k] if has_sl[k] else None)
+            leg.peak_profit = peak_profit[k]
+            if exit_seq[k] >= 0:
+                leg.exit_price = exit_price[k]
+                leg.exit_time = exit_ns[k]
+                leg.exit_reason = kernels.EXIT_REASONS[exit_code[k]]
+                leg.state = LegState.EXITED
+        
+        strategy.refresh_active_legs()
+        if (entry_t >= 0).any():
+            strategy.entered_today = True
+        if (exit_code >= kernels.STRATEGY_SL).any():
+            # Exits by Strategy.exit_all_legs
+            strategy.exited_today = True
+            strategy.day_pnl = strategy.get_total_realized_pnl()
+        
+        # Trades are recorded at the day's break and again at the EOD exit,
+        # each time for every leg exited so far
+        day_trades: List[Trade] = []
+        for seq in flush_seq[:flushes]:
+            exited = [leg for k, leg in enumerate(legs) if 0 <= exit_seq[k] < seq]
+            day_trades.extend(self._iter_trades(exited, date, brokerage_per_lot))
+        return day_trades
+    
+    def _simulate_carry(self, strategy: Strategy, date: str,
+                        leg_ns: Dict[int, np.ndarray],
+                        leg_columns: Dict[int, Tuple[np.ndarray, ...]],
+                        timeline: np.ndarray, tod_us: np.ndarray,
+                        slippage_pct: float, brokerage_per_lot: float) -> List[Trade]:
+        """
+        Run a BTST/Positional day through the compiled candle loop
+        
+        The strategy's legs (in whatever state the previous day left them)
+        and, for BTST, yesterday's legs pending exit are laid out as rows of
+        one grid for kernels.simulate_carry_day; its entries, updates and
+        exits are then written back to the Leg objects, as in
+        _simulate_intraday.
+        
+        Returns:
+            The day's trades
+        """
+        params = self._run_params(strategy)
+        legs = strategy.legs
+        pending = strategy.pending_exit_legs if strategy.config.mode == StrategyMode.BTST else []
+        row_legs = legs + pending
+        legs_n, rows_n = len(legs), len(row_legs)
         
+        if pending:
+            # Pending legs take the per-leg config of the leg they were reset from
+            index = {id(leg.config): k for k, leg in enumerate(legs)}
+            idx = np.array([*range(legs_n), *(index[id(leg.config)] for leg in pending)])
+            params = params._replace(**{name: getattr(params, name)[idx]
+                                        for name in _RunParams._fields[5:]})
+        
+        high, low, close, has, rows = _leg_grid(row_legs, leg_ns, leg_columns, timeline)
+        
+        state = np.array([leg.state for leg in row_legs], dtype=np.int64)
+        current_price = np.array([leg.current_price for leg in row_legs], dtype=np.float64)
+        has_sl = np.array([leg.has_sl() for leg in row_legs], dtype=np.bool_)
+        current_sl = np.array([leg.current_sl if sl else 0.0 for leg, sl in zip(row_legs, has_sl)],
+                              dtype=np.float64)
+        peak_profit = np.array([leg.peak_profit for leg in row_legs], dtype=np.float64)
+        entry_price = np.array([0.0 if leg.entry_price is None else leg.entry_price
+                                for leg in row_legs], dtype=np.float64)
+        exit_price = np.array([0.0 if leg.exit_price is None else leg.exit_price
+                               for leg in row_legs], dtype=np.float64)
+        entry_t = np.full(rows_n, -1, dtype=np.int64)
+        exit_t = np.full(rows_n, -1, dtype=np.int64)
+        exit_code = np.zeros(rows_n, dtype=np.int64)
+        # Legs exited on earlier days count as exited before any of today's
+        exit_seq = np.where(state == kernels.EXITED, 0, -1)
+        flush_seq = np.zeros(len(timeline) + 1, dtype=np.int64)
+        
+        flushes = kernels.simulate_carry_day(
+            high, low, close, has, tod_us, legs_n,
+            params.entry_us, params.no_entry_us, params.exit_us,
+            bool(strategy.is_active and not strategy.entered_today),
+            float(slippage_pct), params.max_loss, params.max_profit,
+            params.is_buy, params.lots, params.lot_size,
+            params.sl_kind, params.sl_value, params.target_kind, params.target_value,
+            params.trail, params.trail_activate, params.trail_lock,
+            state, current_price, current_sl, has_sl, peak_profit, entry_price,
+            entry_t, exit_t, exit_price, exit_code, exit_seq, flush_seq
+        )
+        
+        # Write the kernel's fills back to the legs (only assigns, as in
+        # _simulate_intraday); legs EXITED before today are left as they are
+        entry_ns = timeline[np.maximum(entry_t, 0)].tolist()
+        exit_ns = timeline[np.maximum(exit_t, 0)].tolist()
+        for k, leg in enumerate(row_legs):
+            if entry_t[k] >= 0:
+                strike = leg_columns[leg.config.leg_id][4]
+                leg.actual_strike_price = None if strike is None else int(strike[rows[k, entry_t[k]]])
+                leg.entry_price = entry_price[k]
+                leg.target_price = leg._target_price(leg.config.get_target_price(leg.entry_price))
+                leg.entry_time = entry_ns[k]
+                leg.state = LegState.ACTIVE
+            if leg.state != LegState.ACTIVE:
+                continue
+            leg.current_price = current_price[k]
+            leg.current_sl = leg._sl_price(current_sl[k] if has_sl[k] else None)
+            leg.peak_profit = peak_profit[k]
+            if exit_t[k] >= 0:
+                leg.exit_price = exit_price[k]
+                leg.exit_time = exit_ns[k]
+                leg.exit_reason = kernels.EXIT_REASONS[exit_code[k]]
+                leg.state = LegState.EXITED
+        
+        strategy.refresh_active_legs()
+        if (entry_t[:legs_n] >= 0).any():
+            strategy.entered_today = True
+        
+        # Trades in the order the loop records them: the pending legs once
+        # they exit, and every exited leg at each strategy-level exit
+        day_trades: List[Trade] = []
+        for seq in flush_seq[:flushes].tolist():
+            strategy.exited_today = True
+            if seq == kernels.PENDING_FLUSH:
+                day_trades.extend(self._iter_trades(pending, date, brokerage_per_lot))
+                strategy.clear_pending_exit()
+                continue
+            exited = [leg for k, leg in enumerate(legs) if 0 <= exit_seq[k] < seq]
+            day_trades.extend(self._iter_trades(exited, date, brokerage_per_lot))
+            strategy.day_pnl = sum(leg.get_realized_pnl() for leg in exited)
+        return day_trades
+    
+    def _iter_trades(self, legs: List[Leg], date: str, 
+                     brokerage_per_lot: float) -> Iterator[Trade]:
+        """Yield trade records for exited legs"""
         for leg in legs:
             if leg.state == LegState.EXITED and leg.exit_time:
                 # Brokerage for entry + exit
@@ -270,17 +849,17 @@ class OptimizedBacktestEngine:
                 else:
                     instrument = f"NIFTY {leg.config.strike} {leg.config.option_type}"
                 
-                trade = Trade(
+                yield Trade(
                     date=date,
                     leg_id=leg.config.leg_id,
                     instrument=instrument,
                     strike=leg.config.strike,
                     option_type=leg.config.option_type,
-                    action=leg.config.action.value,
+                    action=leg.config.action.name,
                     lots=leg.config.lots,
-                    entry_time=str(leg.entry_time),
+                    entry_time=_time_str(leg.entry_time),
                     entry_price=leg.entry_price,
-                    exit_time=str(leg.exit_time),
+                    exit_time=_time_str(leg.exit_time),
                     exit_price=leg.exit_price,
                     exit_reason=leg.exit_reason,
                     pnl_points=leg.get_realized_pnl_points(),
@@ -288,6 +867,3 @@ class OptimizedBacktestEngine:
                     brokerage=brokerage,
                     net_pnl=leg.get_realized_pnl() - brokerage
                 )
-                trades.append(trade)
-        
-        return trades
@@ -0,0 +1,143 @@
+"""
+Batch Runner - Backtest many strategy variations across worker processes
+
+Each config is a plain dict so it can be pickled to a worker:
+    {
+        "name": str,
+        "strategy": {mode, entry_time, exit_time, no_entry_after,
+                     max_loss, max_profit},
+        "legs": [LegConfig fields as a dict, action by name],
+        "start_date": 'YYYY-MM-DD',
+        "end_date": 'YYYY-MM-DD',
+        "slippage_pct": float,
+        "brokerage_per_lot": float
+    }
+"""
+
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import List, Dict, Any, Optional
+import multiprocessing
+import os
+import numpy as np
+import pandas as pd
+from pathlib import Path
+import sys
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+from data.loader import DataLoader
+from .leg import LegConfig, LegAction
+from .strategy import Strategy, StrategyConfig, StrategyMode
+from .backtest_optimized import OptimizedBacktestEngine
+
+
+# Per-process loader, so a worker reuses its parquet cache across configs
+_worker_loader: Optional[DataLoader] = None
+
+
+def build_strategy(strategy_settings: Dict[str, Any],
+                   leg_dicts: List[Dict[str, Any]],
+                   name: str = "Custom Strategy") -> Strategy:
+    """
+    Build a Strategy from plain settings and leg dicts
+
+    Args:
+        strategy_settings: Mode, timings and strategy-level risk limits
+        leg_dicts: LegConfig fields per leg, with action given by name
+        name: Strategy name
+
+    Returns:
+        Strategy with all legs added
+    """
+    strategy_config = StrategyConfig(
+        name=name,
+        mode=StrategyMode[strategy_settings["mode"]],
+        entry_time=strategy_settings["entry_time"],
+        exit_time=strategy_settings["exit_time"],
+        no_entry_after=strategy_settings["no_entry_after"],
+        max_loss=strategy_settings["max_loss"],
+        max_profit=strategy_settings["max_profit"]
+    )
+
+    strategy = Strategy(config=strategy_config)
+    for leg in leg_dicts:
+        strategy.add_leg(LegConfig(**{**leg, "action": LegAction[leg["action"]]}))
+    return strategy
+
+
+def run_backtest_config(config: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Run one batch config and summarize it (top-level for pickling)
+
+    Args:
+        config: Batch config dict (see module docstring)
+
+    Returns:
+        Summary row for the batch results table
+    """
+    global _worker_loader
+    if _worker_loader is None:
+        _worker_loader = DataLoader()
+
+    strategy = build_strategy(config["strategy"], config["legs"], config["name"])
+    engine = OptimizedBacktestEngine(_worker_loader)
+    result = engine.run(
+        strategy,
+        config["start_date"],
+        config["end_date"],
+        slippage_pct=config["slippage_pct"],
+        brokerage_per_lot=config["brokerage_per_lot"]
+    )
+
+    daily_pnl = [d.net_pnl for d in result.daily_results]
+    equity = result.equity_curve
+    max_drawdown = float((np.maximum.accumulate(equity) - equity).max()) if len(equity) else 0.0
+
+    return {
+        "name": config["name"],
+        "net_pnl": result.net_pnl,
+        "gross_pnl": result.total_pnl,
+        "brokerage": result.total_brokerage,
+        "num_trades": result.num_trades,
+        "num_days": result.num_days,
+        "win_days": sum(1 for p in daily_pnl if p > 0),
+        "max_drawdown": max_drawdown
+    }
+
+
+def run_batch(configs: List[Dict[str, Any]],
+              max_workers: Optional[int] = None,
+              progress_callback=None) -> pd.DataFrame:
+    """
+    Run batch configs in parallel worker processes
+
+    Args:
+        configs: Batch config dicts (see module docstring)
+        max_workers: Worker processes (default: CPU count, capped at len(configs))
+        progress_callback: Optional callback(done, total, name) as configs finish
+
+    Returns:
+        Summary DataFrame, one row per config in input order
+    """
+    if not configs:
+        return pd.DataFrame()
+
+    max_workers = min(max_workers or os.cpu_count() or 1, len(configs))
+
+    rows = [None] * len(configs)
+    # Spawn workers: callers (e.g. the Streamlit server) may be multi-threaded
+    with ProcessPoolExecutor(
+        max_workers=max_workers,
+        mp_context=multiprocessing.get_context("spawn")
+    ) as executor:
+        futures = {
+            executor.submit(run_backtest_config, config): idx
+            for idx, config in enumerate(configs)
+        }
+        for done, future in enumerate(as_completed(futures), start=1):
+            idx = futures[future]
+            rows[idx] = future.result()
+            if progress_callback:
+                progress_callback(done, len(configs), configs[idx]["name"])
+
+    return pd.DataFrame(rows)
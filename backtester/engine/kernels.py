@@ -0,0 +1,406 @@
+"""
+Numba kernels for the candle loop
+
+Mirror OptimizedBacktestEngine's per-candle logic (entry window,
+strategy SL/target, time exit, leg SL/target/trailing SL, EOD exit) over
+per-leg arrays aligned to the day's timeline, all legs of a candle in
+one pass. Prices are computed with the same float operations in the same
+order as Leg/Strategy, so results match the Python loop exactly.
+"""
+
+import numpy as np
+from numba import njit, types
+
+
+# Leg states, same values as LegState.CREATED / ACTIVE / EXITED
+CREATED = 0
+ACTIVE = 2
+EXITED = 3
+
+# Exit reason codes, indexed into EXIT_REASONS
+EXIT_REASONS = ("", "SL", "TARGET", "STRATEGY_SL", "STRATEGY_TARGET", "TIME_EXIT", "EOD_EXIT")
+SL, TARGET, STRATEGY_SL, STRATEGY_TARGET, TIME_EXIT, EOD_EXIT = 1, 2, 3, 4, 5, 6
+
+# Price rules (LegConfig.get_sl_price / get_target_price)
+NONE = 0
+POINTS = 1
+PERCENT = 2
+
+
+@njit(cache=True)
+def _slip(price, is_buy, slippage_pct, entering):
+    """Leg.enter / Leg.exit slippage: always the worse price for us"""
+    if is_buy == entering:
+        return price * (1 + slippage_pct / 100)
+    return price * (1 - slippage_pct / 100)
+
+
+@njit(cache=True)
+def _offset_price(entry, kind, value, is_buy, above):
+    """SL/target price from entry: points or percent, above or below entry"""
+    if kind == POINTS:
+        return entry + value if above else entry - value
+    return entry * (1 + value / 100) if above else entry * (1 - value / 100)
+
+
+@njit(cache=True)
+def _exit_all(code, t, legs_n, has, close, is_buy, slippage_pct, state,
+              exit_t, exit_price, exit_code, exit_seq, seq):
+    """Strategy.exit_all_legs: exit active legs that have a candle at t"""
+    for k in range(legs_n):
+        if state[k] == ACTIVE and has[k, t]:
+            state[k] = EXITED
+            exit_t[k] = t
+            exit_price[k] = _slip(close[k, t], is_buy[k], slippage_pct, False)
+            exit_code[k] = code
+            exit_seq[k] = seq
+            seq += 1
+    return seq
+
+
+@njit(cache=True)
+def _enter_legs(t, legs_n, has, close, is_buy, slippage_pct, sl_kind, sl_value,
+                state, current_sl, has_sl, entry_price, entry_t):
+    """Strategy.enter_all_legs: enter CREATED legs that have a candle at t"""
+    entered = False
+    for k in range(legs_n):
+        if state[k] == CREATED and has[k, t]:
+            entry_t[k] = t
+            entry_price[k] = _slip(close[k, t], is_buy[k], slippage_pct, True)
+            state[k] = ACTIVE
+            has_sl[k] = sl_kind[k] != NONE
+            if has_sl[k]:
+                current_sl[k] = _offset_price(entry_price[k], sl_kind[k], sl_value[k],
+                                              is_buy[k], not is_buy[k])
+            entered = True
+    return entered
+
+
+@njit(cache=True)
+def _total_pnl(legs_n, state, is_buy, lots, lot_size, entry_price, exit_price, current_price):
+    """Strategy.get_total_pnl: realized (exited legs) + unrealized (active legs)"""
+    realized = 0.0
+    unrealized = 0.0
+    for k in range(legs_n):
+        if state[k] == EXITED:
+            points = exit_price[k] - entry_price[k] if is_buy[k] else entry_price[k] - exit_price[k]
+            realized += points * lots[k] * lot_size[k]
+    for k in range(legs_n):
+        if state[k] == ACTIVE:
+            points = current_price[k] - entry_price[k] if is_buy[k] else entry_price[k] - current_price[k]
+            unrealized += points * lots[k] * lot_size[k]
+    return realized + unrealized
+
+
+@njit(cache=True)
+def _update_legs(t, legs_n, high, low, close, has, is_buy, slippage_pct,
+                 target_kind, target_value, trail, trail_activate, trail_lock,
+                 state, current_price, current_sl, has_sl, peak_profit, entry_price,
+                 exit_t, exit_price, exit_code, exit_seq, seq):
+    """
+    Strategy.update_legs: leg SL/target (BUY checks low first, SELL high
+    first), then trailing SL, for active legs that have a candle at t
+    """
+    for k in range(legs_n):
+        if state[k] != ACTIVE or not has[k, t]:
+            continue
+        current_price[k] = close[k, t]
+        code = 0
+        price = 0.0
+        sl_set = has_sl[k] and current_sl[k] != 0.0
+        target = 0.0
+        if target_kind[k] != NONE:
+            target = _offset_price(entry_price[k], target_kind[k], target_value[k],
+                                   is_buy[k], is_buy[k])
+        if is_buy[k]:
+            if sl_set and low[k, t] <= current_sl[k]:
+                code = SL
+            elif target != 0.0 and high[k, t] >= target:
+                code = TARGET
+        else:
+            if sl_set and high[k, t] >= current_sl[k]:
+                code = SL
+            elif target != 0.0 and low[k, t] <= target:
+                code = TARGET
+        
+        if code != 0:
+            price = current_sl[k] if code == SL else target
+            state[k] = EXITED
+            exit_t[k] = t
+            exit_price[k] = _slip(price, is_buy[k], slippage_pct, False)
+            exit_code[k] = code
+            exit_seq[k] = seq
+            seq += 1
+        elif trail[k]:
+            points = current_price[k] - entry_price[k] if is_buy[k] else entry_price[k] - current_price[k]
+            if points > peak_profit[k]:
+                peak_profit[k] = points
+            if peak_profit[k] >= trail_activate[k]:
+                new_sl = entry_price[k] + trail_lock[k] if is_buy[k] else entry_price[k] - trail_lock[k]
+                if (not has_sl[k] or (new_sl > current_sl[k] if is_buy[k]
+                                      else new_sl < current_sl[k])):
+                    current_sl[k] = new_sl
+                    has_sl[k] = True
+    return seq
+
+
+@njit(cache=True)
+def _any_candle(t, legs_n, has):
+    for k in range(legs_n):
+        if has[k, t]:
+            return True
+    return False
+
+
+@njit(cache=True)
+def _any_active(legs_n, state):
+    for k in range(legs_n):
+        if state[k] == ACTIVE:
+            return True
+    return False
+
+
+# Explicit signature: compiled (or loaded from the on-disk cache) once at
+# import. Serial - see data/kernels.py on numba's parallel threading layer.
+@njit("int64(float64[:, :], float64[:, :], float64[:, :], boolean[:, :], int64[:], "
+      "int64, int64, int64, boolean, float64, float64, float64, "
+      "boolean[:], float64[:], float64[:], int64[:], float64[:], int64[:], float64[:], "
+      "boolean[:], float64[:], float64[:], "
+      "int64[:], float64[:], float64[:], boolean[:], float64[:], float64[:], "
+      "int64[:], int64[:], float64[:], int64[:], int64[:], int64[:])", cache=True)
+def simulate_day(high, low, close, has, tod_us,
+                 entry_us, no_entry_us, exit_us, can_enter,
+                 slippage_pct, max_loss, max_profit,
+                 is_buy, lots, lot_size, sl_kind, sl_value, target_kind, target_value,
+                 trail, trail_activate, trail_lock,
+                 state, current_price, current_sl, has_sl, peak_profit, entry_price,
+                 entry_t, exit_t, exit_price, exit_code, exit_seq, flush_seq):
+    """
+    Run one INTRADAY day over a (legs x timeline) grid
+    
+    Args:
+        high, low, close: Per-leg prices aligned to the timeline
+        has: Whether a leg has a candle at each timeline position
+        tod_us: Time of day of each timeline position, in microseconds
+        entry_us, no_entry_us, exit_us: Strategy entry window and exit time
+        can_enter: Strategy is active and has not entered today
+        max_loss, max_profit: Strategy-level limits (NaN if not set)
+        is_buy ... trail_lock: Per-leg config; trail is trailing SL with
+            both activate and lock points set
+        state ... entry_price: Per-leg state, updated in place
+        entry_t: Entry position (-1 if not entered)
+        exit_t, exit_price, exit_code: Exit position, price after slippage, reason
+        exit_seq: Order in which legs exited (-1 if not exited)
+        flush_seq: Trade records are created twice at most; each entry
+            is the exit count at that point (legs with exit_seq below it)
+    
+    Returns:
+        Number of flush_seq entries written
+    """
+    legs_n, times_n = close.shape
+    seq = 0
+    flushes = 0
+    entered_today = not can_enter
+    
+    for t in range(times_n):
+        if not _any_candle(t, legs_n, has):
+            continue
+        
+        # 1. Entry
+        if not entered_today and entry_us <= tod_us[t] <= no_entry_us:
+            if _enter_legs(t, legs_n, has, close, is_buy, slippage_pct, sl_kind, sl_value,
+                           state, current_sl, has_sl, entry_price, entry_t):
+                entered_today = True
+        
+        # 3. Skip until entered with active legs
+        if not entered_today or not _any_active(legs_n, state):
+            continue
+        
+        # 4. Strategy-level exits on realized + unrealized P&L
+        total = _total_pnl(legs_n, state, is_buy, lots, lot_size,
+                           entry_price, exit_price, current_price)
+        
+        if not np.isnan(max_loss) and total <= -abs(max_loss):
+            seq = _exit_all(STRATEGY_SL, t, legs_n, has, close, is_buy, slippage_pct, state,
+                            exit_t, exit_price, exit_code, exit_seq, seq)
+            flush_seq[flushes] = seq
+            flushes += 1
+            break
+        if not np.isnan(max_profit) and total >= max_profit:
+            seq = _exit_all(STRATEGY_TARGET, t, legs_n, has, close, is_buy, slippage_pct, state,
+                            exit_t, exit_price, exit_code, exit_seq, seq)
+            flush_seq[flushes] = seq
+            flushes += 1
+            break
+        
+        # 5. Time exit
+        if tod_us[t] >= exit_us:
+            seq = _exit_all(TIME_EXIT, t, legs_n, has, close, is_buy, slippage_pct, state,
+                            exit_t, exit_price, exit_code, exit_seq, seq)
+            flush_seq[flushes] = seq
+            flushes += 1
+            break
+        
+        # 6. Leg SL/target, then trailing SL
+        seq = _update_legs(t, legs_n, high, low, close, has, is_buy, slippage_pct,
+                           target_kind, target_value, trail, trail_activate, trail_lock,
+                           state, current_price, current_sl, has_sl, peak_profit, entry_price,
+                           exit_t, exit_price, exit_code, exit_seq, seq)
+        
+        if not _any_active(legs_n, state):
+            flush_seq[flushes] = seq
+            flushes += 1
+            break
+    
+    # Force exit at the last candle (legs without one there stay open)
+    if times_n > 0:
+        last = times_n - 1
+        if _any_active(legs_n, state) and _any_candle(last, legs_n, has):
+            seq = _exit_all(EOD_EXIT, last, legs_n, has, close, is_buy, slippage_pct, state,
+                            exit_t, exit_price, exit_code, exit_seq, seq)
+            flush_seq[flushes] = seq
+            flushes += 1
+    
+    return flushes
+
+
+# flush_seq entry of simulate_carry_day for the BTST exit of pending legs
+PENDING_FLUSH = -1
+
+
+@njit("int64(float64[:, :], float64[:, :], float64[:, :], boolean[:, :], int64[:], int64, "
+      "int64, int64, int64, boolean, float64, float64, float64, "
+      "boolean[:], float64[:], float64[:], int64[:], float64[:], int64[:], float64[:], "
+      "boolean[:], float64[:], float64[:], "
+      "int64[:], float64[:], float64[:], boolean[:], float64[:], float64[:], "
+      "int64[:], int64[:], float64[:], int64[:], int64[:], int64[:])", cache=True)
+def simulate_carry_day(high, low, close, has, tod_us, legs_n,
+                       entry_us, no_entry_us, exit_us, can_enter,
+                       slippage_pct, max_loss, max_profit,
+                       is_buy, lots, lot_size, sl_kind, sl_value, target_kind, target_value,
+                       trail, trail_activate, trail_lock,
+                       state, current_price, current_sl, has_sl, peak_profit, entry_price,
+                       entry_t, exit_t, exit_price, exit_code, exit_seq, flush_seq):
+    """
+    Run one BTST/Positional day over a (legs x timeline) grid
+    
+    Same steps as simulate_day with the carry-over rules of the Python
+    loop: legs may start the day ACTIVE or EXITED, there is no time or EOD
+    exit, and a strategy-level exit doesn't end the day. Rows from legs_n
+    on are yesterday's BTST legs pending exit; they only exit, at close on
+    the first candle past exit time, and count toward nothing else.
+    
+    Args:
+        legs_n: Number of strategy legs (rows before the pending ones)
+        exit_seq: Order in which legs exited (-1 if not exited; legs
+            already EXITED at the start of the day must be 0)
+        flush_seq: Trade records created during the day, in order: the
+            exit count for a strategy-level exit (every strategy leg with
+            exit_seq below it), or PENDING_FLUSH for the pending legs' exit
+        (others as in simulate_day)
+    
+    Returns:
+        Number of flush_seq entries written
+    """
+    rows_n, times_n = close.shape
+    seq = 1
+    flushes = 0
+    entered_today = not can_enter
+    pending = rows_n > legs_n
+    
+    for t in range(times_n):
+        if not _any_candle(t, legs_n, has):
+            continue
+        
+        # 1. Entry
+        if not entered_today and entry_us <= tod_us[t] <= no_entry_us:
+            if _enter_legs(t, legs_n, has, close, is_buy, slippage_pct, sl_kind, sl_value,
+                           state, current_sl, has_sl, entry_price, entry_t):
+                entered_today = True
+        
+        # 2. BTST: yesterday's legs exit on the first candle past exit time
+        if pending and tod_us[t] >= exit_us:
+            for k in range(legs_n, rows_n):
+                if state[k] == ACTIVE and has[k, t]:
+                    state[k] = EXITED
+                    exit_t[k] = t
+                    exit_price[k] = _slip(close[k, t], is_buy[k], slippage_pct, False)
+                    exit_code[k] = TIME_EXIT
+                    exit_seq[k] = seq
+                    seq += 1
+            flush_seq[flushes] = PENDING_FLUSH
+            flushes += 1
+            pending = False
+        
+        # 3. Nothing to check without active legs
+        if not _any_active(legs_n, state):
+            continue
+        
+        # 4. Strategy-level exits on realized + unrealized P&L
+        total = _total_pnl(legs_n, state, is_buy, lots, lot_size,
+                           entry_price, exit_price, current_price)
+        
+        code = 0
+        if not np.isnan(max_loss) and total <= -abs(max_loss):
+            code = STRATEGY_SL
+        elif not np.isnan(max_profit) and total >= max_profit:
+            code = STRATEGY_TARGET
+        if code != 0:
+            seq = _exit_all(code, t, legs_n, has, close, is_buy, slippage_pct, state,
+                            exit_t, exit_price, exit_code, exit_seq, seq)
+            flush_seq[flushes] = seq
+            flushes += 1
+            continue
+        
+        # 6. Leg SL/target, then trailing SL
+        seq = _update_legs(t, legs_n, high, low, close, has, is_buy, slippage_pct,
+                           target_kind, target_value, trail, trail_activate, trail_lock,
+                           state, current_price, current_sl, has_sl, peak_profit, entry_price,
+                           exit_t, exit_price, exit_code, exit_seq, seq)
+    
+    return flushes
+
+
+# Read-only arrays accepted too: the loader hands out read-only day views
+_PRICES = types.Array(types.float64, 1, 'A', readonly=True)
+
+
+@njit(types.Tuple((types.int64, types.boolean, types.float64, types.float64))(
+          _PRICES, _PRICES, _PRICES, types.boolean, types.float64, types.boolean,
+          types.float64, types.float64, types.boolean, types.float64, types.float64,
+          types.float64), cache=True)
+def scan_leg(high, low, close, is_buy, entry_price, has_sl, current_sl, target,
+             trail, trail_activate, trail_lock, peak_profit):
+    """
+    Leg.update over one leg's bars until its SL or target is hit
+    
+    Args:
+        high, low, close: The leg's bars, from the first one to update
+        has_sl, current_sl: Current SL (has_sl False if the leg has none)
+        target: Target price (0.0 if none)
+        trail: Trailing SL with both activate and lock points set
+        peak_profit: Peak profit in points so far
+    
+    Returns:
+        (index of the bar that hits, or -1, has_sl, current_sl, peak_profit),
+        the SL state being the one that bar is checked against
+    """
+    for t in range(len(close)):
+        sl_set = has_sl and current_sl != 0.0
+        if is_buy:
+            if (sl_set and low[t] <= current_sl) or (target != 0.0 and high[t] >= target):
+                return t, has_sl, current_sl, peak_profit
+        else:
+            if (sl_set and high[t] >= current_sl) or (target != 0.0 and low[t] <= target):
+                return t, has_sl, current_sl, peak_profit
+        
+        if trail:
+            points = close[t] - entry_price if is_buy else entry_price - close[t]
+            if points > peak_profit:
+                peak_profit = points
+            if peak_profit >= trail_activate:
+                new_sl = entry_price + trail_lock if is_buy else entry_price - trail_lock
+                if not has_sl or (new_sl > current_sl if is_buy else new_sl < current_sl):
+                    current_sl = new_sl
+                    has_sl = True
+    return -1, has_sl, current_sl, peak_profit
@@ -2,28 +2,98 @@
 Leg Engine - State machine for individual option legs
 """
 
-from enum import Enum
+from enum import IntEnum
 from dataclasses import dataclass, field
-from typing import Optional, Dict, Any
-from datetime import datetime
-import pandas as pd
+from typing import Optional, Dict, Any, NamedTuple, Tuple, Callable
+from datetime import datetime, timedelta
+import math
+import numpy as np
 
 
-class LegState(Enum):
-    """Leg lifecycle states"""
-    CREATED = "created"       # Leg defined but not entered
-    ENTERED = "entered"       # Entry order placed
-    ACTIVE = "active"         # Position is live
-    EXITED = "exited"         # Position closed
+_EPOCH = datetime(1970, 1, 1)
 
 
-class LegAction(Enum):
-    """Buy or Sell"""
-    BUY = "BUY"
-    SELL = "SELL"
+def _time_str(value) -> str:
+    """str() of a leg's entry/exit time; int ns (as the engines pass) prints as its Timestamp"""
+    if isinstance(value, int):
+        seconds, ns = divmod(value, 1_000_000_000)
+        if ns % 1000:
+            # As pd.Timestamp prints it (all nine digits), without pandas
+            return str(np.datetime64(value, "ns")).replace("T", " ")
+        # Whole microseconds: datetime prints the same text, without
+        # building a Timestamp
+        return str(_EPOCH + timedelta(seconds=seconds, microseconds=ns // 1000))
+    return str(value)
 
 
-@dataclass
+class LegState(IntEnum):
+    """Leg lifecycle states (ints, so per-candle state checks are plain int compares)"""
+    CREATED = 0       # Leg defined but not entered
+    ENTERED = 1       # Entry order placed
+    ACTIVE = 2        # Position is live
+    EXITED = 3        # Position closed
+
+
+# LegState names as reported in to_dict, indexed by state
+_STATE_NAMES = ("created", "entered", "active", "exited")
+
+
+class LegAction(IntEnum):
+    """Buy or Sell (reported by name: "BUY" / "SELL")"""
+    BUY = 0
+    SELL = 1
+
+
+class Candle(NamedTuple):
+    """One leg's OHLC bar, read by field (a plain tuple - no Series overhead)"""
+    open: float
+    high: float
+    low: float
+    close: float
+    strike_price: Optional[float] = None  # Actual strike, when the data has it
+
+
+# SL/target price rules, (entry price, points or percent) -> price; module
+# level so a LegConfig holding one still pickles
+def _no_price(entry_price: float, value: Optional[float]) -> None:
+    return None
+
+
+def _points_below(entry_price: float, points: float) -> float:
+    return entry_price - points
+
+
+def _points_above(entry_price: float, points: float) -> float:
+    return entry_price + points
+
+
+def _percent_below(entry_price: float, percent: float) -> float:
+    return entry_price * (1 - percent / 100)
+
+
+def _percent_above(entry_price: float, percent: float) -> float:
+    return entry_price * (1 + percent / 100)
+
+
+# (points rule, percent rule) by whether the price sits above entry
+_PRICE_RULES = {
+    False: (_points_below, _percent_below),
+    True: (_points_above, _percent_above),
+}
+
+
+def _price_rule(points: Optional[float], percent: Optional[float],
+                above: bool) -> Tuple[Callable, Optional[float]]:
+    """Rule and value for an SL/target: points win over percent, else no price"""
+    points_rule, percent_rule = _PRICE_RULES[above]
+    if points is not None:
+        return points_rule, points
+    if percent is not None:
+        return percent_rule, percent
+    return _no_price, None
+
+
+@dataclass(slots=True)
 class LegConfig:
     """Configuration for a leg"""
     # Identity
@@ -56,33 +126,25 @@ class LegConfig:
     trail_lock_points: Optional[float] = None      # Profit to lock (points)
     trail_lock_percent: Optional[float] = None     # Profit to lock (percent)
     
+    # SL/target price rules, resolved once from the fields above
+    _sl_rule: Tuple[Callable, Optional[float]] = field(init=False, repr=False, compare=False)
+    _target_rule: Tuple[Callable, Optional[float]] = field(init=False, repr=False, compare=False)
+    
+    def __post_init__(self):
+        is_buy = self.action == LegAction.BUY
+        # BUY: SL below entry, target above; SELL the other way round
+        self._sl_rule = _price_rule(self.sl_points, self.sl_percent, not is_buy)
+        self._target_rule = _price_rule(self.target_points, self.target_percent, is_buy)
+    
     def get_sl_price(self, entry_price: float) -> Optional[float]:
         """Calculate SL price based on option premium"""
-        if self.sl_points is not None:
-            if self.action == LegAction.BUY:
-                return entry_price - self.sl_points
-            else:
-                return entry_price + self.sl_points
-        elif self.sl_percent is not None:
-            if self.action == LegAction.BUY:
-                return entry_price * (1 - self.sl_percent / 100)
-            else:
-                return entry_price * (1 + self.sl_percent / 100)
-        return None
+        rule, value = self._sl_rule
+        return rule(entry_price, value)
     
     def get_target_price(self, entry_price: float) -> Optional[float]:
         """Calculate target price based on option premium"""
-        if self.target_points is not None:
-            if self.action == LegAction.BUY:
-                return entry_price + self.target_points
-            else:
-                return entry_price - self.target_points
-        elif self.target_percent is not None:
-            if self.action == LegAction.BUY:
-                return entry_price * (1 + self.target_percent / 100)
-            else:
-                return entry_price * (1 - self.target_percent / 100)
-        return None
+        rule, value = self._target_rule
+        return rule(entry_price, value)
     
     def has_underlying_sl(self) -> bool:
         """Check if SL is based on underlying movement"""
@@ -93,7 +155,7 @@ class LegConfig:
         return self.target_underlying_points is not None or self.target_underlying_percent is not None
 
 
-@dataclass
+@dataclass(slots=True)
 class Leg:
     """
     Represents a single option leg in a strategy.
@@ -107,19 +169,69 @@ class Leg:
     
     # Entry details  
     entry_price: Optional[float] = None
-    entry_time: Optional[datetime] = None
+    entry_time: Optional[datetime] = None  # Or int ns since epoch, from the engines
     actual_strike_price: Optional[int] = None  # Actual strike (e.g., 13000) resolved at entry
     
     # Exit details
     exit_price: Optional[float] = None
-    exit_time: Optional[datetime] = None
+    exit_time: Optional[datetime] = None  # Or int ns since epoch, from the engines
     exit_reason: Optional[str] = None
     
     # Current position tracking
     current_price: float = 0.0
+    # SL and target may be passed as None (or 0) for "not set"; __post_init__
+    # turns that into an infinity on the side the price can never reach, so
+    # after construction they are always floats and the per-bar checks are a
+    # single compare
     current_sl: Optional[float] = None
+    target_price: Optional[float] = None  # Fixed at entry
     peak_profit: float = 0.0  # For trailing SL
     
+    # config.action == BUY, and whether the trailing SL can ever move
+    # (trailing_sl with activate and lock points set), resolved once rather
+    # than on every bar
+    _is_buy: bool = field(init=False, repr=False, compare=False)
+    _trails: bool = field(init=False, repr=False, compare=False)
+    # "Not set" values of current_sl / target_price for this leg's side
+    _no_sl: float = field(init=False, repr=False, compare=False)
+    _no_target: float = field(init=False, repr=False, compare=False)
+    
+    def __post_init__(self):
+        config = self.config
+        self._is_buy = config.action == LegAction.BUY
+        self._trails = bool(config.trailing_sl and config.trail_activate_points
+                            and config.trail_lock_points)
+        self._no_sl = -math.inf if self._is_buy else math.inf
+        self._no_target = -self._no_sl
+        self.current_sl = self._sl_price(self.current_sl)
+        self.target_price = self._target_price(self.target_price)
+    
+    def _sl_price(self, price: Optional[float]) -> float:
+        """current_sl for an SL price (None or 0 means no SL)"""
+        return price if price else self._no_sl
+    
+    def _target_price(self, price: Optional[float]) -> float:
+        """target_price for a target price (None or 0 means no target)"""
+        return price if price else self._no_target
+    
+    def has_sl(self) -> bool:
+        """Check if the leg has an SL set"""
+        return self.current_sl != self._no_sl
+    
+    def reset(self):
+        """Return the leg to a fresh CREATED state in place (config and lot size kept)"""
+        self.state = LegState.CREATED
+        self.entry_price = None
+        self.entry_time = None
+        self.actual_strike_price = None
+        self.exit_price = None
+        self.exit_time = None
+        self.exit_reason = None
+        self.current_price = 0.0
+        self.current_sl = self._no_sl
+        self.target_price = self._no_target
+        self.peak_profit = 0.0
+    
     def enter(self, price: float, timestamp: datetime, slippage_pct: float = 0.0,
               actual_strike_price: int = None):
         """
@@ -127,7 +239,7 @@ class Leg:
         
         Args:
             price: Entry price
-            timestamp: Entry time
+            timestamp: Entry time (datetime or int ns)
             slippage_pct: Slippage percentage to apply
             actual_strike_price: The resolved strike price (e.g., 13000)
         """
@@ -135,7 +247,7 @@ class Leg:
             raise ValueError(f"Cannot enter leg in state {self.state}")
         
         # Apply slippage (worse price for us)
-        if self.config.action == LegAction.BUY:
+        if self._is_buy:
             self.entry_price = price * (1 + slippage_pct / 100)
         else:
             self.entry_price = price * (1 - slippage_pct / 100)
@@ -144,8 +256,9 @@ class Leg:
         self.actual_strike_price = actual_strike_price
         self.state = LegState.ACTIVE
         
-        # Set initial SL
-        self.current_sl = self.config.get_sl_price(self.entry_price)
+        # Set initial SL; the target doesn't move, so it's resolved once here
+        self.current_sl = self._sl_price(self.config.get_sl_price(self.entry_price))
+        self.target_price = self._target_price(self.config.get_target_price(self.entry_price))
     
     def exit(self, price: float, timestamp: datetime, reason: str, 
              slippage_pct: float = 0.0):
@@ -154,7 +267,7 @@ class Leg:
         
         Args:
             price: Exit price
-            timestamp: Exit time
+            timestamp: Exit time (datetime or int ns)
             reason: Why exited (SL, TARGET, TIME, STRATEGY_SL, etc.)
             slippage_pct: Slippage percentage
         """
@@ -162,7 +275,7 @@ class Leg:
             raise ValueError(f"Cannot exit leg in state {self.state}")
         
         # Apply slippage (worse price for us)
-        if self.config.action == LegAction.BUY:
+        if self._is_buy:
             self.exit_price = price * (1 - slippage_pct / 100)
         else:
             self.exit_price = price * (1 + slippage_pct / 100)
@@ -171,33 +284,43 @@ class Leg:
         self.exit_reason = reason
         self.state = LegState.EXITED
     
-    def update(self, candle: pd.Series) -> Optional[str]:
+    def update(self, candle: Candle) -> Optional[str]:
         """
         Update leg with current candle and check for exits.
         
         Args:
             candle: Current candle with OHLC data
         
+        Returns:
+            Exit reason if should exit, None otherwise
+        """
+        _, high, low, close, _ = candle
+        return self.update_prices(high, low, close)
+    
+    def update_prices(self, high: float, low: float, close: float) -> Optional[str]:
+        """
+        update() for a bar given as plain floats
+        
         Returns:
             Exit reason if should exit, None otherwise
         """
         if self.state != LegState.ACTIVE:
             return None
         
-        self.current_price = candle['close']
+        self.current_price = close
         
         # Check SL and Target using OHLC
-        exit_reason = self._check_sl_target(candle)
+        exit_reason = self._check_sl_target(high, low)
         if exit_reason:
             return exit_reason
         
         # Update trailing SL if enabled
-        if self.config.trailing_sl:
+        if self._trails:
             self._update_trailing_sl()
         
         return None
     
-    def _check_sl_target(self, candle: pd.Series) -> Optional[str]:
+    def _check_sl_target(self, high: float, low: float) -> Optional[str]:
         """
         Check if SL or Target hit using OHLC logic.
         
@@ -205,27 +328,62 @@ class Leg:
         - BUY: Check Low first (SL), then High (Target)
         - SELL: Check High first (SL), then Low (Target)
         """
-        target_price = self.config.get_target_price(self.entry_price)
-        
-        if self.config.action == LegAction.BUY:
+        if self._is_buy:
             # BUY: SL below entry, Target above
             # Check SL first (price going down)
-            if self.current_sl and candle['low'] <= self.current_sl:
+            if low <= self.current_sl:
                 return "SL"
             # Then check Target (price going up)
-            if target_price and candle['high'] >= target_price:
+            if high >= self.target_price:
                 return "TARGET"
         else:
             # SELL: SL above entry, Target below
             # Check SL first (price going up)
-            if self.current_sl and candle['high'] >= self.current_sl:
+            if high >= self.current_sl:
                 return "SL"
             # Then check Target (price going down)
-            if target_price and candle['low'] <= target_price:
+            if low <= self.target_price:
                 return "TARGET"
         
         return None
     
+    @staticmethod
+    def scan_exit(highs: np.ndarray, lows: np.ndarray, sl: Optional[float],
+                  target: Optional[float], action: LegAction) -> Tuple[int, Optional[str]]:
+        """
+        Find the first bar where a fixed SL or target is hit
+        
+        _check_sl_target over a run of bars in one array comparison each,
+        for legs whose SL doesn't move (no trailing SL). Same checks and
+        order: SL wins over target on the same bar.
+        
+        Args:
+            highs, lows: The bars' highs and lows, from the first bar to check
+            sl, target: SL and target prices (None, 0 or an infinity disables either)
+            action: BUY or SELL
+        
+        Returns:
+            (bar index, "SL" or "TARGET"), or (-1, None) if neither is hit
+        """
+        bars = len(highs)
+        # A leg's "not set" infinities can't hit; skip their comparisons
+        sl = sl if sl is None or math.isfinite(sl) else None
+        target = target if target is None or math.isfinite(target) else None
+        if action == LegAction.BUY:
+            sl_hits = lows <= sl if sl else None
+            target_hits = highs >= target if target else None
+        else:
+            sl_hits = highs >= sl if sl else None
+            target_hits = lows <= target if target else None
+        
+        sl_idx = int(sl_hits.argmax()) if sl_hits is not None and sl_hits.any() else bars
+        target_idx = int(target_hits.argmax()) if target_hits is not None and target_hits.any() else bars
+        if sl_idx == bars and target_idx == bars:
+            return -1, None
+        if sl_idx <= target_idx:
+            return sl_idx, "SL"
+        return target_idx, "TARGET"
+    
     def _update_trailing_sl(self):
         """Update trailing stop loss"""
         if not self.config.trailing_sl:
@@ -245,25 +403,25 @@ class Leg:
             # Calculate new SL to lock in profit
             lock_points = self.config.trail_lock_points
             
-            if self.config.action == LegAction.BUY:
+            if self._is_buy:
                 new_sl = self.entry_price + lock_points
             else:
                 new_sl = self.entry_price - lock_points
             
-            # Only move SL in favorable direction
-            if self.config.action == LegAction.BUY:
-                if self.current_sl is None or new_sl > self.current_sl:
-                    self.current_sl = new_sl
+            # Only move SL in favorable direction (any SL beats none)
+            if self._is_buy:
+                if new_sl > self.current_sl:
+                    self.current_sl = self._sl_price(new_sl)
             else:
-                if self.current_sl is None or new_sl < self.current_sl:
-                    self.current_sl = new_sl
+                if new_sl < self.current_sl:
+                    self.current_sl = self._sl_price(new_sl)
     
     def get_unrealized_pnl_points(self) -> float:
         """Get unrealized P&L in points"""
         if self.entry_price is None:
             return 0.0
         
-        if self.config.action == LegAction.BUY:
+        if self._is_buy:
             return self.current_price - self.entry_price
         else:
             return self.entry_price - self.current_price
@@ -278,7 +436,7 @@ class Leg:
         if self.state != LegState.EXITED:
             return 0.0
         
-        if self.config.action == LegAction.BUY:
+        if self._is_buy:
             return self.exit_price - self.entry_price
         else:
             return self.entry_price - self.exit_price
@@ -295,13 +453,13 @@ class Leg:
             "strike": self.config.strike,
             "option_type": self.config.option_type,
             "expiry_type": self.config.expiry_type,
-            "action": self.config.action.value,
+            "action": self.config.action.name,
             "lots": self.config.lots,
-            "state": self.state.value,
+            "state": _STATE_NAMES[self.state],
             "entry_price": self.entry_price,
-            "entry_time": str(self.entry_time) if self.entry_time else None,
+            "entry_time": _time_str(self.entry_time) if self.entry_time else None,
             "exit_price": self.exit_price,
-            "exit_time": str(self.exit_time) if self.exit_time else None,
+            "exit_time": _time_str(self.exit_time) if self.exit_time else None,
             "exit_reason": self.exit_reason,
             "pnl_points": self.get_realized_pnl_points() if self.state == LegState.EXITED else self.get_unrealized_pnl_points(),
             "pnl": self.get_realized_pnl() if self.state == LegState.EXITED else self.get_unrealized_pnl()
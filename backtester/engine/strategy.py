@@ -4,11 +4,12 @@ Strategy Engine - Multi-leg strategy coordinator
 
 from enum import Enum
 from dataclasses import dataclass, field
+from functools import lru_cache
 from typing import List, Optional, Dict, Any
 from datetime import datetime, time
-import pandas as pd
+import math
 
-from .leg import Leg, LegState, LegConfig
+from .leg import Leg, LegState, LegConfig, Candle
 
 
 class StrategyMode(Enum):
@@ -18,7 +19,13 @@ class StrategyMode(Enum):
     POSITIONAL = "POSITIONAL"   # Hold for multiple days
 
 
-@dataclass
+@lru_cache(maxsize=None)
+def _parse_hhmm(value: str) -> time:
+    """Parse an "HH:MM" string, once per distinct string (time is immutable)"""
+    return datetime.strptime(value, "%H:%M").time()
+
+
+@dataclass(slots=True)
 class StrategyConfig:
     """Strategy-level configuration"""
     name: str = "Unnamed Strategy"
@@ -40,16 +47,16 @@ class StrategyConfig:
     reentry_on_target: int = 0  # Number of re-entries after target
     
     def get_entry_time(self) -> time:
-        return datetime.strptime(self.entry_time, "%H:%M").time()
+        return _parse_hhmm(self.entry_time)
     
     def get_exit_time(self) -> time:
-        return datetime.strptime(self.exit_time, "%H:%M").time()
+        return _parse_hhmm(self.exit_time)
     
     def get_no_entry_after_time(self) -> time:
-        return datetime.strptime(self.no_entry_after, "%H:%M").time()
+        return _parse_hhmm(self.no_entry_after)
 
 
-@dataclass 
+@dataclass(slots=True)
 class Strategy:
     """
     Multi-leg strategy coordinator.
@@ -74,24 +81,71 @@ class Strategy:
     day_pnl: float = 0.0
     total_pnl: float = 0.0
     
+    # ACTIVE legs of self.legs in leg order, kept in step with entries and
+    # exits so per-candle checks don't rescan the legs
+    _active_legs: List[Leg] = field(default_factory=list, init=False, repr=False)
+    # Realized P&L of self.legs, recomputed only when a leg exits
+    _realized_pnl: float = field(default=0.0, init=False, repr=False)
+    # Strategy SL/target as P&L thresholds, resolved once from the config
+    # (-inf / +inf when not set, so neither can trigger)
+    _has_limits: bool = field(default=False, init=False, repr=False)
+    _sl_threshold: float = field(default=-math.inf, init=False, repr=False)
+    _target_threshold: float = field(default=math.inf, init=False, repr=False)
+    
+    def __post_init__(self):
+        max_loss = self.config.max_loss
+        max_profit = self.config.max_profit
+        self._has_limits = max_loss is not None or max_profit is not None
+        if max_loss is not None:
+            self._sl_threshold = -abs(max_loss)
+        if max_profit is not None:
+            self._target_threshold = max_profit
+        self.refresh_active_legs()
+    
     def add_leg(self, leg_config: LegConfig) -> Leg:
         """Add a leg to the strategy"""
         leg = Leg(config=leg_config)
         self.legs.append(leg)
         return leg
     
+    def refresh_active_legs(self):
+        """Rebuild the active-legs and realized P&L caches (after changing leg states directly)"""
+        self._active_legs = [leg for leg in self.legs if leg.state == LegState.ACTIVE]
+        self._refresh_realized_pnl()
+    
+    def _refresh_realized_pnl(self):
+        """Re-sum realized P&L of exited legs (in leg order, as the scan did)"""
+        self._realized_pnl = sum(leg.get_realized_pnl() for leg in self.legs 
+                                 if leg.state == LegState.EXITED)
+    
+    def _prune_active(self):
+        """Drop exited legs from the active-legs cache after a round of exits"""
+        self._active_legs = [leg for leg in self._active_legs if leg.state == LegState.ACTIVE]
+        self._refresh_realized_pnl()
+    
+    def _drop_active(self, leg: Leg):
+        """Remove an exited leg from the active-legs cache (by identity)"""
+        for i, active in enumerate(self._active_legs):
+            if active is leg:
+                del self._active_legs[i]
+                self._refresh_realized_pnl()
+                return
+    
     def get_active_legs(self) -> List[Leg]:
         """Get all active legs"""
-        return [leg for leg in self.legs if leg.state == LegState.ACTIVE]
+        return list(self._active_legs)
+    
+    def has_active_legs(self) -> bool:
+        """Check if any leg is active"""
+        return bool(self._active_legs)
     
     def get_total_unrealized_pnl(self) -> float:
         """Get combined unrealized P&L of all active legs"""
-        return sum(leg.get_unrealized_pnl() for leg in self.get_active_legs())
+        return sum(leg.get_unrealized_pnl() for leg in self._active_legs)
     
     def get_total_realized_pnl(self) -> float:
         """Get combined realized P&L of all exited legs"""
-        return sum(leg.get_realized_pnl() for leg in self.legs 
-                   if leg.state == LegState.EXITED)
+        return self._realized_pnl
     
     def get_total_pnl(self) -> float:
         """Get total P&L (realized + unrealized)"""
@@ -109,40 +163,57 @@ class Strategy:
             return False
         return True
     
-    def should_exit_time(self, current_time: time) -> bool:
-        """Check if time-based exit should trigger"""
+    def uses_time_exit(self) -> bool:
+        """Check if a time-based exit applies once exit time is reached"""
         # Positional doesn't use time-based exit
         if self.config.mode == StrategyMode.POSITIONAL:
             return False
-        # BTST: Check if we have pending_exit_legs that need to exit
+        # BTST: Only when we have pending_exit_legs that need to exit
         if self.config.mode == StrategyMode.BTST:
-            # Only return True if we have pending exit legs AND it's exit time
-            if self.pending_exit_legs:
-                return current_time >= self.config.get_exit_time()
-            return False
+            return bool(self.pending_exit_legs)
         # Intraday: exit at exit_time same day
-        return current_time >= self.config.get_exit_time()
+        return True
+    
+    def should_exit_time(self, current_time: time) -> bool:
+        """Check if time-based exit should trigger"""
+        return self.uses_time_exit() and current_time >= self.config.get_exit_time()
     
     def check_strategy_sl(self) -> bool:
         """Check if strategy-level SL hit"""
         if self.config.max_loss is None:
             return False
-        return self.get_total_pnl() <= -abs(self.config.max_loss)
+        return self.get_total_pnl() <= self._sl_threshold
     
     def check_strategy_target(self) -> bool:
         """Check if strategy-level target hit"""
         if self.config.max_profit is None:
             return False
-        return self.get_total_pnl() >= self.config.max_profit
+        return self.get_total_pnl() >= self._target_threshold
     
-    def enter_all_legs(self, candle_data: Dict[str, pd.Series], 
+    def check_strategy_exit(self) -> Optional[str]:
+        """
+        Check strategy-level SL, then target, on a single P&L evaluation
+        
+        Returns:
+            "STRATEGY_SL", "STRATEGY_TARGET" or None
+        """
+        if not self._has_limits:
+            return None
+        pnl = self.get_total_pnl()
+        if pnl <= self._sl_threshold:
+            return "STRATEGY_SL"
+        if pnl >= self._target_threshold:
+            return "STRATEGY_TARGET"
+        return None
+    
+    def enter_all_legs(self, candle_data: Dict[int, Candle], 
                        timestamp: datetime, slippage_pct: float = 0.0):
         """
         Enter all legs at current prices
         
         Args:
             candle_data: Dict mapping leg_id to current candle
-            timestamp: Entry time
+            timestamp: Entry time (datetime or int ns)
             slippage_pct: Slippage percentage
         """
         legs_entered = 0
@@ -150,20 +221,23 @@ class Strategy:
             if leg.state == LegState.CREATED:
                 candle = candle_data.get(leg.config.leg_id)
                 if candle is not None:
-                    entry_price = candle['close']  # Enter at close of entry candle
+                    entry_price = candle.close  # Enter at close of entry candle
                     # Get actual strike price from candle data if available
                     actual_strike = None
-                    if 'strike_price' in candle:
-                        actual_strike = int(candle['strike_price'])
+                    if candle.strike_price is not None:
+                        actual_strike = int(candle.strike_price)
                     leg.enter(entry_price, timestamp, slippage_pct, actual_strike)
                     legs_entered += 1
         
+        if legs_entered:
+            self.refresh_active_legs()
+        
         # Only mark as entered if at least one leg actually entered
         # This is important for BTST where legs may already be active from previous day
         if legs_entered > 0:
             self.entered_today = True
     
-    def exit_all_legs(self, candle_data: Dict[str, pd.Series],
+    def exit_all_legs(self, candle_data: Dict[int, Candle],
                       timestamp: datetime, reason: str,
                       slippage_pct: float = 0.0):
         """
@@ -171,27 +245,28 @@ class Strategy:
         
         Args:
             candle_data: Dict mapping leg_id to current candle
-            timestamp: Exit time
+            timestamp: Exit time (datetime or int ns)
             reason: Exit reason
             slippage_pct: Slippage percentage
         """
-        for leg in self.get_active_legs():
+        for leg in self._active_legs:
             candle = candle_data.get(leg.config.leg_id)
             if candle is not None:
-                exit_price = candle['close']
+                exit_price = candle.close
                 leg.exit(exit_price, timestamp, reason, slippage_pct)
+        self._prune_active()
         
         self.exited_today = True
         self.day_pnl = self.get_total_realized_pnl()
     
-    def update_legs(self, candle_data: Dict[str, pd.Series],
+    def update_legs(self, candle_data: Dict[int, Candle],
                     timestamp: datetime, slippage_pct: float = 0.0) -> List[tuple]:
         """
         Update all legs with current candles and process exits
         
         Args:
             candle_data: Dict mapping leg_id to current candle
-            timestamp: Current time
+            timestamp: Current time (datetime or int ns)
             slippage_pct: Slippage percentage
         
         Returns:
@@ -199,22 +274,26 @@ class Strategy:
         """
         exits = []
         
-        for leg in self.get_active_legs():
+        # Iterates the cache itself; exited legs are pruned after the loop
+        for leg in self._active_legs:
             candle = candle_data.get(leg.config.leg_id)
             if candle is not None:
-                exit_reason = leg.update(candle)
+                _, high, low, close, _ = candle
+                exit_reason = leg.update_prices(high, low, close)
                 if exit_reason:
                     # Determine exit price based on reason
                     if exit_reason == "SL":
                         exit_price = leg.current_sl
                     elif exit_reason == "TARGET":
-                        exit_price = leg.config.get_target_price(leg.entry_price)
+                        exit_price = leg.target_price
                     else:
-                        exit_price = candle['close']
+                        exit_price = candle.close
                     
                     leg.exit(exit_price, timestamp, exit_reason, slippage_pct)
                     exits.append((leg, exit_reason))
         
+        if exits:
+            self._prune_active()
         return exits
     
     def reset_for_new_day(self):
@@ -223,15 +302,8 @@ class Strategy:
         self.exited_today = False
         self.day_pnl = 0.0
         
-        # Reset legs for new day (create fresh copies)
-        new_legs = []
-        for leg in self.legs:
-            new_leg = Leg(
-                config=leg.config,
-                lot_size=leg.lot_size
-            )
-            new_legs.append(new_leg)
-        self.legs = new_legs
+        # Reset legs for new day
+        self._reset_legs_to_created()
     
     def reset_daily_flags(self):
         """
@@ -247,7 +319,7 @@ class Strategy:
         
         if self.config.mode == StrategyMode.BTST:
             # Move active legs to pending exit (will exit at exit_time today)
-            active_legs = [leg for leg in self.legs if leg.state == LegState.ACTIVE]
+            active_legs = list(self._active_legs)
             if active_legs:
                 self.pending_exit_legs = active_legs
                 # Create fresh legs for today's entry
@@ -263,7 +335,7 @@ class Strategy:
             return
         
         # If we have active legs from yesterday, move them to pending exit
-        active_legs = [leg for leg in self.legs if leg.state == LegState.ACTIVE]
+        active_legs = self._active_legs
         if active_legs:
             self.pending_exit_legs = list(active_legs)  # Copy reference
             # Create fresh legs for today's entry
@@ -279,8 +351,9 @@ class Strategy:
             if leg.state == LegState.ACTIVE:
                 candle = candle_data.get(leg.config.leg_id)
                 if candle is not None:
-                    exit_price = candle['close']
+                    exit_price = candle.close
                     leg.exit(exit_price, timestamp, reason, slippage_pct)
+                    self._drop_active(leg)
         self.exited_today = True
     
     def get_pending_exit_legs(self) -> List[Leg]:
@@ -292,15 +365,23 @@ class Strategy:
         self.pending_exit_legs = []
     
     def _reset_legs_to_created(self):
-        """Reset all legs to CREATED state for re-entry"""
+        """
+        Reset all legs to CREATED state for re-entry
+        
+        Legs are reset in place; only legs just moved to pending_exit_legs
+        (still open from yesterday) are replaced with fresh Legs.
+        """
+        pending = {id(leg) for leg in self.pending_exit_legs}
         new_legs = []
         for leg in self.legs:
-            new_leg = Leg(
-                config=leg.config,
-                lot_size=leg.lot_size
-            )
-            new_legs.append(new_leg)
+            if id(leg) in pending:
+                leg = Leg(config=leg.config, lot_size=leg.lot_size)
+            else:
+                leg.reset()
+            new_legs.append(leg)
         self.legs = new_legs
+        self._active_legs = []
+        self._realized_pnl = 0
     
     def can_reenter_sl(self) -> bool:
         """Check if re-entry on SL is allowed"""
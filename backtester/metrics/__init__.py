@@ -1,5 +1,13 @@
 # Metrics module
 from .calculator import MetricsCalculator
-from .monte_carlo import MonteCarloSimulator
 
 __all__ = ["MetricsCalculator", "MonteCarloSimulator"]
+
+
+def __getattr__(name):
+    # Monte Carlo compiles (or loads) its numba kernel at import, so load it
+    # only when first requested
+    if name == "MonteCarloSimulator":
+        from .monte_carlo import MonteCarloSimulator
+        return MonteCarloSimulator
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -3,7 +3,7 @@ Metrics Calculator - AlgoTest-equivalent metrics
 """
 
 from dataclasses import dataclass
-from typing import List, Dict, Any
+from typing import Dict, Any, Tuple
 import pandas as pd
 import numpy as np
 from pathlib import Path
@@ -166,9 +166,9 @@ class MetricsCalculator:
             avg_trades_per_day=avg_trades_per_day
         )
     
-    def _calculate_drawdown(self, equity: List[float]) -> Dict[str, Any]:
+    def _calculate_drawdown(self, equity: np.ndarray) -> Dict[str, Any]:
         """Calculate drawdown metrics"""
-        if not equity:
+        if len(equity) == 0:
             return {
                 'max_drawdown': 0,
                 'max_drawdown_pct': 0,
@@ -176,7 +176,7 @@ class MetricsCalculator:
                 'max_trades_during_dd': 0
             }
         
-        equity_arr = np.array(equity)
+        equity_arr = np.asarray(equity, dtype=np.float64)
         peak = np.maximum.accumulate(equity_arr)
         drawdown = peak - equity_arr
         
@@ -251,36 +251,35 @@ class MetricsCalculator:
             num_trading_days=0, avg_trades_per_day=0
         )
     
-    def get_monthly_pnl(self, result: BacktestResult) -> pd.DataFrame:
-        """Get monthly P&L breakdown"""
+    def get_period_pnl(self, result: BacktestResult) -> Tuple[pd.DataFrame, pd.DataFrame]:
+        """
+        Get yearly and monthly P&L breakdowns from one aggregation pass
+        
+        Returns:
+            (yearly, monthly) DataFrames
+        """
         daily_df = result.to_daily_df()
         if daily_df.empty:
-            return pd.DataFrame()
+            return pd.DataFrame(), pd.DataFrame()
         
-        daily_df['date'] = pd.to_datetime(daily_df['date'])
-        daily_df['month'] = daily_df['date'].dt.to_period('M')
+        month = pd.to_datetime(daily_df['date']).dt.to_period('M')
         
-        monthly = daily_df.groupby('month').agg({
+        monthly = daily_df.groupby(month.rename('month')).agg({
             'net_pnl': 'sum',
             'num_trades': 'sum'
-        }).reset_index()
+        })
+        yearly = monthly.groupby(monthly.index.year.rename('year')).sum()
         
+        monthly = monthly.reset_index()
         monthly.columns = ['Month', 'P&L', 'Trades']
-        return monthly
+        yearly = yearly.reset_index()
+        yearly.columns = ['Year', 'P&L', 'Trades']
+        return yearly, monthly
+    
+    def get_monthly_pnl(self, result: BacktestResult) -> pd.DataFrame:
+        """Get monthly P&L breakdown"""
+        return self.get_period_pnl(result)[1]
     
     def get_yearly_pnl(self, result: BacktestResult) -> pd.DataFrame:
         """Get yearly P&L breakdown"""
-        daily_df = result.to_daily_df()
-        if daily_df.empty:
-            return pd.DataFrame()
-        
-        daily_df['date'] = pd.to_datetime(daily_df['date'])
-        daily_df['year'] = daily_df['date'].dt.year
-        
-        yearly = daily_df.groupby('year').agg({
-            'net_pnl': 'sum',
-            'num_trades': 'sum'
-        }).reset_index()
-        
-        yearly.columns = ['Year', 'P&L', 'Trades']
-        return yearly
+        return self.get_period_pnl(result)[0]
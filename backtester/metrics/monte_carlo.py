@@ -6,6 +6,7 @@ from dataclasses import dataclass
 from typing import List, Dict, Any
 import numpy as np
 import pandas as pd
+from numba import njit
 from pathlib import Path
 import sys
 sys.path.append(str(Path(__file__).parent.parent))
@@ -56,6 +57,66 @@ class MonteCarloResult:
         }
 
 
+# Explicit signature: compiled (or loaded from the on-disk cache) once at
+# import, so the first simulation never pays JIT latency
+@njit("float64[:, :](float64[:], int64, int64, float64, float64)", cache=True)
+def _mc_kernel(returns: np.ndarray, num_simulations: int, seed: int,
+               initial_capital: float, ruin_level: float) -> np.ndarray:
+    """
+    Bootstrap trade returns and summarize each resampled path.
+    
+    Each simulation reseeds from seed + index, so a given seed reproduces
+    the same paths however the simulations are batched.
+    
+    Returns:
+        (num_simulations, 4) array of max drawdown, max losing streak,
+        final P&L and a 1.0/0.0 ruin flag per path
+    """
+    n = returns.size
+    out = np.empty((num_simulations, 4))
+    
+    for s in range(num_simulations):
+        np.random.seed(seed + s)
+        
+        equity = 0.0
+        peak = -np.inf
+        max_dd = 0.0
+        low = np.inf
+        streak = 0
+        max_streak = 0
+        
+        for _ in range(n):
+            ret = returns[np.random.randint(0, n)]
+            equity += ret
+            
+            value = initial_capital + equity
+            if value > peak:
+                peak = value
+            if peak - value > max_dd:
+                max_dd = peak - value
+            if value < low:
+                low = value
+            
+            if ret < 0:
+                streak += 1
+                if streak > max_streak:
+                    max_streak = streak
+            else:
+                streak = 0
+        
+        out[s, 0] = max_dd
+        out[s, 1] = max_streak
+        out[s, 2] = equity
+        out[s, 3] = 1.0 if low < ruin_level else 0.0
+    
+    return out
+
+
+def _kernel_returns(trade_returns) -> np.ndarray:
+    """Trade returns as the contiguous float64 array _mc_kernel is compiled for"""
+    return np.ascontiguousarray(trade_returns, dtype=np.float64)
+
+
 class MonteCarloSimulator:
     """
     Monte Carlo simulation for risk analysis.
@@ -83,48 +144,40 @@ class MonteCarloSimulator:
         Returns:
             MonteCarloResult with statistics
         """
-        trades_df = result.to_trades_df()
-        
-        if trades_df.empty or len(trades_df) < 10:
-            return self._empty_result(ruin_threshold_pct)
+        return self.simulate_returns(
+            result.trade_pnl_np(), result.num_days,
+            initial_capital=initial_capital,
+            ruin_threshold_pct=ruin_threshold_pct
+        )
+    
+    def simulate_returns(self, trade_returns: np.ndarray, num_days: int,
+                         initial_capital: float = 100000,
+                         ruin_threshold_pct: float = 50) -> MonteCarloResult:
+        """
+        Run Monte Carlo simulation on raw trade P&L
         
-        # Get trade returns
-        trade_returns = trades_df['net_pnl'].values
-        num_trades = len(trade_returns)
+        Args:
+            trade_returns: Net P&L per trade
+            num_days: Trading days covered by the backtest
+            initial_capital: Starting capital for simulations
+            ruin_threshold_pct: % loss considered as "ruin"
         
-        # Storage for simulation results
-        all_max_drawdowns = []
-        all_max_losing_streaks = []
-        all_final_pnls = []
-        ruin_count = 0
+        Returns:
+            MonteCarloResult with statistics
+        """
+        if len(trade_returns) < 10:
+            return self._empty_result(ruin_threshold_pct)
         
         ruin_threshold = initial_capital * (ruin_threshold_pct / 100)
         
-        for _ in range(self.num_simulations):
-            # Resample trades with replacement
-            resampled = self.rng.choice(trade_returns, size=num_trades, replace=True)
-            
-            # Calculate equity curve
-            equity = np.cumsum(resampled)
-            equity_with_capital = initial_capital + equity
-            
-            # Calculate max drawdown
-            peak = np.maximum.accumulate(equity_with_capital)
-            drawdown = peak - equity_with_capital
-            max_dd = drawdown.max()
-            all_max_drawdowns.append(max_dd)
-            
-            # Calculate losing streak
-            losing_streak = self._calculate_max_losing_streak(resampled)
-            all_max_losing_streaks.append(losing_streak)
-            
-            # Final P&L
-            final_pnl = equity[-1]
-            all_final_pnls.append(final_pnl)
-            
-            # Check for ruin
-            if equity_with_capital.min() < (initial_capital - ruin_threshold):
-                ruin_count += 1
+        paths = _mc_kernel(
+            _kernel_returns(trade_returns), self.num_simulations, self._kernel_seed(),
+            initial_capital, initial_capital - ruin_threshold
+        )
+        all_max_drawdowns = paths[:, 0]
+        all_max_losing_streaks = paths[:, 1]
+        all_final_pnls = paths[:, 2]
+        ruin_count = paths[:, 3].sum()
         
         # Calculate statistics
         max_dd_95 = np.percentile(all_max_drawdowns, 95)
@@ -139,17 +192,12 @@ class MonteCarloSimulator:
         final_pnl_95 = np.percentile(all_final_pnls, 95)
         
         # CAGR (simplified - assuming 1 year of trading)
-        num_days = result.num_days
         years = max(num_days / 252, 0.1)  # At least 0.1 years
         
-        cagr_values = []
-        for final_pnl in all_final_pnls:
-            total_return = (initial_capital + final_pnl) / initial_capital
-            if total_return > 0:
-                cagr = (total_return ** (1/years) - 1) * 100
-                cagr_values.append(cagr)
-            else:
-                cagr_values.append(-100)
+        total_returns = (initial_capital + all_final_pnls) / initial_capital
+        cagr_values = np.full(total_returns.shape, -100.0)
+        positive = total_returns > 0
+        cagr_values[positive] = (total_returns[positive] ** (1/years) - 1) * 100
         
         cagr_median = np.percentile(cagr_values, 50)
         cagr_5 = np.percentile(cagr_values, 5)
@@ -173,19 +221,9 @@ class MonteCarloSimulator:
             ruin_threshold_pct=ruin_threshold_pct
         )
     
-    def _calculate_max_losing_streak(self, returns: np.ndarray) -> int:
-        """Calculate maximum consecutive losing trades"""
-        max_streak = 0
-        current_streak = 0
-        
-        for ret in returns:
-            if ret < 0:
-                current_streak += 1
-                max_streak = max(max_streak, current_streak)
-            else:
-                current_streak = 0
-        
-        return max_streak
+    def _kernel_seed(self) -> int:
+        """Base seed for the simulation kernel, drawn from this simulator's RNG"""
+        return int(self.rng.integers(0, 2**31 - 1))
     
     def _empty_result(self, ruin_threshold: float) -> MonteCarloResult:
         """Return empty result for insufficient data"""
@@ -200,28 +238,22 @@ class MonteCarloSimulator:
     
     def get_distribution_data(self, result: BacktestResult) -> Dict[str, np.ndarray]:
         """Get raw distribution data for plotting"""
-        trades_df = result.to_trades_df()
+        trade_returns = result.trade_pnl_np()
         
-        if trades_df.empty:
+        if len(trade_returns) == 0:
             return {}
         
-        trade_returns = trades_df['net_pnl'].values
-        num_trades = len(trade_returns)
-        
-        final_pnls = []
-        max_drawdowns = []
-        
-        for _ in range(self.num_simulations):
-            resampled = self.rng.choice(trade_returns, size=num_trades, replace=True)
-            equity = np.cumsum(resampled)
-            
-            final_pnls.append(equity[-1])
-            
-            peak = np.maximum.accumulate(equity)
-            drawdown = peak - equity
-            max_drawdowns.append(drawdown.max())
+        paths = _mc_kernel(_kernel_returns(trade_returns), self.num_simulations,
+                           self._kernel_seed(), 0.0, -np.inf)
         
         return {
-            'final_pnls': np.array(final_pnls),
-            'max_drawdowns': np.array(max_drawdowns)
+            'final_pnls': paths[:, 2],
+            'max_drawdowns': paths[:, 0]
         }
+
+
+def run_monte_carlo(trade_returns: np.ndarray, num_days: int,
+                    num_simulations: int) -> MonteCarloResult:
+    """Top-level entry point so simulations can run in a worker process"""
+    simulator = MonteCarloSimulator(num_simulations=num_simulations)
+    return simulator.simulate_returns(trade_returns, num_days)
@@ -0,0 +1,132 @@
+"""
+Backtest engine tests on a small synthetic dataset
+
+Run from backtester/: python -m unittest discover -s tests
+"""
+
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+# Add backtester to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from data.loader import DataLoader
+from engine.leg import LegConfig, LegAction
+from engine.strategy import Strategy, StrategyConfig, StrategyMode
+from engine.backtest import BacktestEngine
+from engine.backtest_optimized import OptimizedBacktestEngine
+
+
+DAYS = ["2024-01-01", "2024-01-02", "2024-01-03"]
+
+
+def _write_week_file(data_dir: Path, strike: str, option_type: str, strike_price: float):
+    """One WEEK parquet file of 1-minute candles, 09:15-15:30 IST stored as UTC (as downloader.py saves them)"""
+    rng = np.random.default_rng(7)
+    frames = []
+    for day in DAYS:
+        ts = pd.date_range(f"{day} 03:45", f"{day} 10:00", freq="1min")
+        close = np.maximum(1.0, 100 + np.cumsum(rng.normal(0, 1.5, len(ts))))
+        open_ = np.r_[close[0], close[:-1]]
+        frames.append(pd.DataFrame({
+            "datetime": ts,
+            "date": [t.date() for t in ts],
+            "open": open_,
+            "high": np.maximum(open_, close) + 1.0,
+            "low": np.minimum(open_, close) - 1.0,
+            "close": close,
+            "volume": np.full(len(ts), 100),
+            "strike_price": strike_price,
+        }))
+    week_dir = data_dir / "NIFTY" / "WEEK"
+    week_dir.mkdir(parents=True, exist_ok=True)
+    pd.concat(frames, ignore_index=True).to_parquet(
+        week_dir / f"{strike}_{option_type}.parquet", index=False
+    )
+
+
+def _strategy() -> Strategy:
+    """Intraday short straddle: sell ATM CE and PE with a 30% SL"""
+    # Entry stays open until late in the day, so a position is always
+    # taken whichever part of the session the engines see
+    strategy = Strategy(config=StrategyConfig(
+        name="Test Strategy",
+        mode=StrategyMode.INTRADAY,
+        entry_time="09:20",
+        exit_time="15:25",
+        no_entry_after="15:20"
+    ))
+    for leg_id, option_type in enumerate(("CE", "PE"), 1):
+        strategy.add_leg(LegConfig(
+            leg_id=leg_id, strike="ATM", option_type=option_type,
+            expiry_type="WEEK", action=LegAction.SELL, lots=1, sl_percent=30
+        ))
+    return strategy
+
+
+class BacktestEngineTest(unittest.TestCase):
+    """Original candle-by-candle engine, checked against the optimized engine"""
+    
+    @classmethod
+    def setUpClass(cls):
+        cls._tmp = tempfile.TemporaryDirectory()
+        data_dir = Path(cls._tmp.name)
+        _write_week_file(data_dir, "ATM", "CE", 21000.0)
+        _write_week_file(data_dir, "ATM", "PE", 21000.0)
+        cls.loader = DataLoader(data_dir=data_dir)
+    
+    @classmethod
+    def tearDownClass(cls):
+        cls._tmp.cleanup()
+    
+    def _run(self, engine_class):
+        return engine_class(self.loader).run(
+            _strategy(), DAYS[0], DAYS[-1],
+            slippage_pct=0.05, brokerage_per_lot=20
+        )
+    
+    def test_run_produces_trades(self):
+        result = self._run(BacktestEngine)
+        
+        self.assertGreaterEqual(result.num_trades, 1)
+        self.assertEqual(result.num_days, len(DAYS))
+        for trade in result.trades:
+            self.assertEqual(trade.instrument, f"NIFTY 21000 {trade.option_type}")
+            self.assertAlmostEqual(trade.net_pnl, trade.pnl - trade.brokerage)
+    
+    def test_matches_optimized_engine(self):
+        original = self._run(BacktestEngine)
+        optimized = self._run(OptimizedBacktestEngine)
+        
+        self.assertEqual([repr(t) for t in original.trades],
+                         [repr(t) for t in optimized.trades])
+        self.assertEqual(original.net_pnl, optimized.net_pnl)
+    
+    def test_day_results_keep_their_trades(self):
+        for engine_class in (BacktestEngine, OptimizedBacktestEngine):
+            result = self._run(engine_class)
+    
+            day_trades = [t for d in result.daily_results for t in d.trades]
+            self.assertEqual([d.num_trades for d in result.daily_results],
+                             [len(d.trades) for d in result.daily_results])
+            self.assertEqual(day_trades, list(result.trades))
+    
+    def test_trades_df_is_a_copy(self):
+        result = self._run(OptimizedBacktestEngine)
+        first_pnl = result.trades[0].net_pnl
+    
+        df = result.to_trades_df()
+        df["net_pnl"] = 0.0
+        df.loc[0, "entry_price"] = -1.0
+    
+        self.assertEqual(result.trades[0].net_pnl, first_pnl)
+        self.assertNotEqual(result.trades[0].entry_price, -1.0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,54 @@
+"""
+Import-path checks: the numba kernels load only when an engine is used
+
+Run from backtester/: python -m unittest discover -s tests
+"""
+
+import subprocess
+import sys
+import unittest
+from pathlib import Path
+
+
+BACKTESTER_DIR = Path(__file__).parent.parent
+
+# Modules that compile (or load) numba kernels at import
+KERNEL_MODULES = ("numba", "engine.kernels", "engine.backtest_optimized",
+                  "metrics.monte_carlo", "data.kernels")
+
+
+def _loaded_after(statement: str) -> list:
+    """Kernel modules in sys.modules after running statement in a fresh interpreter"""
+    code = (f"import sys\n{statement}\n"
+            f"print(','.join(m for m in {KERNEL_MODULES!r} if m in sys.modules))")
+    output = subprocess.run(
+        [sys.executable, "-c", code], cwd=BACKTESTER_DIR,
+        capture_output=True, text=True, check=True
+    ).stdout.strip()
+    return output.split(",") if output else []
+
+
+class ImportPathTest(unittest.TestCase):
+    """What the app imports before first paint must not load the kernels"""
+    
+    def test_app_imports_skip_kernels(self):
+        # app.py, ui/components.py and metrics/calculator.py import these
+        self.assertEqual(_loaded_after(
+            "from data.loader import DataLoader\n"
+            "from engine.leg import LegConfig, LegAction\n"
+            "from engine.backtest import ENGINE_VERSION\n"
+            "from metrics.calculator import MetricsCalculator"
+        ), [])
+    
+    def test_lazy_exports(self):
+        loaded = _loaded_after(
+            "import engine, metrics\n"
+            "assert engine.OptimizedBacktestEngine.__name__ == 'OptimizedBacktestEngine'\n"
+            "assert metrics.MonteCarloSimulator.__name__ == 'MonteCarloSimulator'"
+        )
+        self.assertIn("engine.kernels", loaded)
+        self.assertIn("metrics.monte_carlo", loaded)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,123 @@
+"""
+Repacker round trip: a repacked file must read back exactly like the original
+
+Run from backtester/: python -m unittest discover -s tests
+"""
+
+import shutil
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+
+# Add backtester to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from data.loader import DataLoader
+from data.repack import LAYOUT_VERSION, layout_version, tick_columns, repack_file
+
+
+DAYS = ["2024-01-01", "2024-01-02", "2024-01-03"]
+
+
+def _write_utc_file(path: Path):
+    """
+    1-minute candles, 09:15-15:30 IST stored as UTC (as downloader.py saves them)
+
+    open/high/low are whole paise, so they repack to int32 ticks; close has
+    sub-paisa noise and must stay float64.
+    """
+    rng = np.random.default_rng(11)
+    frames = []
+    for day in DAYS:
+        ts = pd.date_range(f"{day} 03:45", f"{day} 10:00", freq="1min")
+        close = np.maximum(1.0, 100 + np.cumsum(rng.normal(0, 1.5, len(ts))))
+        open_ = np.round(np.r_[close[0], close[:-1]], 2)
+        frames.append(pd.DataFrame({
+            "datetime": ts,
+            "date": [t.date() for t in ts],
+            "open": open_,
+            "high": np.round(np.maximum(open_, close) + 1.0, 2),
+            "low": np.round(np.minimum(open_, close) - 1.0, 2),
+            "close": close,
+            "volume": rng.integers(0, 5000, len(ts)),
+            "strike_price": 21000.0,
+        }))
+    path.parent.mkdir(parents=True, exist_ok=True)
+    pd.concat(frames, ignore_index=True).to_parquet(path, index=False)
+
+
+class RepackRoundTripTest(unittest.TestCase):
+    """Loader reads of an original UTC file vs. the same file repacked in place"""
+    
+    @classmethod
+    def setUpClass(cls):
+        cls._tmp = tempfile.TemporaryDirectory()
+        root = Path(cls._tmp.name)
+        original = root / "original" / "NIFTY" / "WEEK" / "ATM_CE.parquet"
+        repacked = root / "repacked" / "NIFTY" / "WEEK" / "ATM_CE.parquet"
+        _write_utc_file(original)
+        repacked.parent.mkdir(parents=True)
+        shutil.copy(original, repacked)
+    
+        cls.rewritten = repack_file(repacked)
+        cls.rewritten_again = repack_file(repacked)
+        cls.schema = pq.read_schema(repacked)
+        cls.original = DataLoader(data_dir=root / "original")
+        cls.repacked = DataLoader(data_dir=root / "repacked")
+    
+    @classmethod
+    def tearDownClass(cls):
+        cls._tmp.cleanup()
+    
+    def test_layout(self):
+        self.assertTrue(self.rewritten)
+        self.assertFalse(self.rewritten_again)
+        self.assertEqual(layout_version(self.schema), LAYOUT_VERSION)
+        # close is not a whole number of paise, so it falls back to float64
+        self.assertEqual(sorted(tick_columns(self.schema)), ["high", "low", "open"])
+        self.assertEqual(str(self.schema.field("close").type), "double")
+    
+    def test_load(self):
+        columns = ["datetime", "date", "open", "high", "low", "close", "volume", "strike_price"]
+        for date_range in (None, (DAYS[1], DAYS[1])):
+            with self.subTest(date_range=date_range):
+                original = self.original.load("ATM", "CE", "WEEK", date_range=date_range)
+                repacked = self.repacked.load("ATM", "CE", "WEEK", date_range=date_range)
+                pd.testing.assert_frame_equal(
+                    original[columns].reset_index(drop=True),
+                    repacked[columns].reset_index(drop=True),
+                    check_dtype=False, check_categorical=False
+                )
+    
+    def test_get_day_data(self):
+        columns = ["datetime", "open", "high", "low", "close", "strike_price"]
+        for date in DAYS:
+            for window in (("09:15", "15:30"), ("15:00", "15:20")):
+                with self.subTest(date=date, window=window):
+                    original = self.original.get_day_data("ATM", "CE", "WEEK", date, *window)
+                    repacked = self.repacked.get_day_data("ATM", "CE", "WEEK", date, *window)
+                    self.assertGreater(len(repacked), 0)
+                    pd.testing.assert_frame_equal(
+                        original[columns].reset_index(drop=True),
+                        repacked[columns].reset_index(drop=True),
+                        check_dtype=False
+                    )
+    
+    def test_get_day_arrays(self):
+        for date in DAYS:
+            with self.subTest(date=date):
+                original = self.original.get_day_arrays("ATM", "CE", "WEEK", date)
+                repacked = self.repacked.get_day_arrays("ATM", "CE", "WEEK", date)
+                self.assertGreater(len(repacked[0]), 0)
+                for expected, actual in zip(original, repacked):
+                    np.testing.assert_array_equal(expected, actual)
+                    self.assertEqual(actual.dtype, expected.dtype)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,8 +1,15 @@
 # UI module
 from .components import render_metrics_dashboard, render_leg_builder
-from .charts import create_equity_chart, create_drawdown_chart
 
 __all__ = [
     "render_metrics_dashboard", "render_leg_builder",
     "create_equity_chart", "create_drawdown_chart"
 ]
+
+
+def __getattr__(name):
+    # Charts pull in plotly, so load them only when first requested
+    if name in ("create_equity_chart", "create_drawdown_chart"):
+        from . import charts
+        return getattr(charts, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")